@@ -0,0 +1,54 @@
+"""Time of window boxes of polygons: `get_divided_polygon` per polygon(before vectorized) vs `get_divided_polygons`.
+
+    python -m sub_module.benchmarks.bench_divided_polygons --num-polygons 300 --num-points 400
+"""
+import argparse
+import time
+import numpy as np
+
+from sub_module.mmdet.eval import get_divided_polygons, divide_polygon, get_box_from_pol
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-polygons', type = int, default = 300)
+    parser.add_argument('--num-points', type = int, default = 400)
+    parser.add_argument('--window-num', type = int, default = 3)
+    parser.add_argument('--repeat', type = int, default = 5)
+    return parser.parse_args()
+
+
+def scalar_divided_polygon(polygon, window_num, min_num_points = 10):
+    # `get_divided_polygon` before it was vectorized
+    if len(polygon) < min_num_points or len(polygon) // window_num < min_num_points: return None
+    piece_point = int(len(polygon)/window_num)
+    polygon_xsort = sorted(polygon, key=lambda x: x[0])
+    polygon_ysort = sorted(polygon, key=lambda x: x[1])
+    return [[get_box_from_pol(pol) for pol in divide_polygon(polygon_xsort, window_num, piece_point)],
+            [get_box_from_pol(pol) for pol in divide_polygon(polygon_ysort, window_num, piece_point)]]
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    rng = np.random.RandomState(0)
+    # polygons of masks are int coordinates
+    polygons = [rng.randint(0, 1000, (args.num_points, 2)).tolist() for _ in range(args.num_polygons)]
+
+    array_polygons = [np.array(polygon) for polygon in polygons]
+
+    scalar = best_time(lambda: [scalar_divided_polygon(polygon, args.window_num) for polygon in polygons], args.repeat)
+    batch = best_time(lambda: get_divided_polygons(polygons, args.window_num), args.repeat)
+    batch_array = best_time(lambda: get_divided_polygons(array_polygons, args.window_num), args.repeat)
+    print(f"{args.num_polygons} polygons x {args.num_points} points, window_num = {args.window_num}")
+    print(f"scalar              : {scalar * 1000:8.2f} ms")
+    print(f"batch (list input)  : {batch * 1000:8.2f} ms   ({scalar / batch:.1f}x)")
+    print(f"batch (array input) : {batch_array * 1000:8.2f} ms   ({scalar / batch_array:.1f}x)")
@@ -0,0 +1,93 @@
+"""Time of `Get_info.get_board_info`: containment by `check_in_bbox` per pair(before vectorized) vs `check_in_bboxes`.
+
+    python -m sub_module.benchmarks.bench_get_info --num-plates 20 --num-noise 100
+"""
+import argparse
+import time
+import numpy as np
+
+from sub_module.mmdet.get_info_algorithm import Get_info
+
+
+CLASSES = ['r_board', 'l_board', 'r_m_n', 'r_s_n', 'l_m_n', 'l_s_n'] + [str(i) for i in range(10)] + ['a', 'b', 'c']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-plates', type = int, default = 20)
+    parser.add_argument('--num-noise', type = int, default = 100, help = "boxes of random labels at random positions")
+    parser.add_argument('--repeat', type = int, default = 20)
+    return parser.parse_args()
+
+
+class ScalarGetInfo(Get_info):
+    # `get_numberboard_info` before containment was vectorized
+    def get_numberboard_info(self, board_idx_list, number_box_idx_list, text_idx_list, check = False, with_box = False):
+        number_board_list = []
+        for board_idx in board_idx_list:
+            board_bbox = self.bboxes_list[board_idx]
+            board_dict = dict(type = self.labels_list[board_idx],
+                              board_center_p = self.compute_center_point(board_bbox),
+                              width = self.compute_width_height(board_bbox)[0],
+                              height = self.compute_width_height(board_bbox)[1])
+            for number_box_idx in number_box_idx_list:
+                number_box_bbox = self.bboxes_list[number_box_idx]
+                if not self.check_in_bbox(board_bbox, number_box_bbox): continue
+                text_list = []
+                for text_idx in text_idx_list:
+                    text_bbox = self.bboxes_list[text_idx]
+                    if self.check_in_bbox(number_box_bbox, text_bbox):
+                        x_center, _ = self.compute_center_point(text_bbox)
+                        text_list.append([text_bbox, self.labels_list[text_idx], x_center])
+                text_list.sort(key = lambda x: x[-1])
+                if self.labels_list[number_box_idx] in ['l_s_n', 'r_s_n']:
+                    if len(text_list) != 3 or text_list[-1][1].isdigit(): continue
+                    board_dict['sub_text'] = [i[1] for i in text_list]
+                elif self.labels_list[number_box_idx] in ['l_m_n', 'r_m_n']:
+                    if len(text_list) != 4: continue
+                    board_dict['main_text'] = [i[1] for i in text_list]
+            if board_dict.get('main_text', None) is not None and board_dict.get('sub_text', None):
+                number_board_list.append(board_dict)
+        return number_board_list
+
+
+def random_scene(rng, num_plates, num_noise):
+    bboxes, labels = [], []
+    for _ in range(num_plates):
+        x0, y0 = rng.uniform(0, 1500), rng.uniform(0, 900)
+        boxes = [((x0, y0, x0 + 300, y0 + 120), 'r_board'),
+                 ((x0 + 10, y0 + 60, x0 + 290, y0 + 115), 'r_m_n'),
+                 ((x0 + 10, y0 + 5, x0 + 200, y0 + 55), 'r_s_n')]
+        boxes += [((x0 + 15 + 55 * i, y0 + 62, x0 + 60 + 55 * i, y0 + 112), str(i)) for i in range(4)]
+        boxes += [((x0 + 15 + 60 * i, y0 + 8, x0 + 65 + 60 * i, y0 + 52), label) for i, label in enumerate(['1', '2', 'a'])]
+        for box, label in boxes:
+            bboxes.append(list(box) + [1.0])
+            labels.append(CLASSES.index(label))
+    for _ in range(num_noise):
+        x0, y0 = rng.uniform(0, 1800), rng.uniform(0, 1000)
+        bboxes.append([x0, y0, x0 + rng.uniform(5, 400), y0 + rng.uniform(5, 200), 1.0])
+        labels.append(rng.randint(len(CLASSES)))
+    return np.array(bboxes, dtype = np.float32).reshape(-1, 5), np.array(labels, dtype = np.int64)
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    bboxes, labels = random_scene(np.random.RandomState(0), args.num_plates, args.num_noise)
+
+    scalar_info, batch_info = ScalarGetInfo(bboxes, labels, CLASSES), Get_info(bboxes, labels, CLASSES)
+    assert scalar_info.get_board_info() == batch_info.get_board_info()
+
+    scalar = best_time(scalar_info.get_board_info, args.repeat)
+    batch = best_time(batch_info.get_board_info, args.repeat)
+    print(f"{args.num_plates} plates + {args.num_noise} noise boxes = {len(bboxes)} boxes")
+    print(f"scalar : {scalar * 1000:8.2f} ms")
+    print(f"batch  : {batch * 1000:8.2f} ms   ({scalar / batch:.1f}x)")
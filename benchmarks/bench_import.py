@@ -0,0 +1,45 @@
+"""Import time of `sub_module.mmdet` modules with `python -X importtime`.
+
+`lazy` imports only the module. `eager` also touches every name of `__all__` of the packages,
+which is what importing the packages cost before attributes were loaded lazily.
+
+    python -m sub_module.benchmarks.bench_import sub_module.mmdet.data.sampler sub_module.mmdet.eval
+"""
+import argparse
+import subprocess
+import sys
+
+
+PACKAGES = ['sub_module.mmdet', 'sub_module.mmdet.data', 'sub_module.mmdet.modules']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs = '*', default = ['sub_module.mmdet', 'sub_module.mmdet.data.sampler'])
+    parser.add_argument('--repeat', type = int, default = 3)
+    return parser.parse_args()
+
+
+def import_time(code, repeat):
+    """best total(us) of top level imports and the number of imported modules"""
+    times = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output = True, text = True)
+        stderr = process.stderr
+        if process.returncode != 0:
+            raise RuntimeError(f"failed to run `{code}`:\n{stderr.splitlines()[-1]}")
+        # "import time: self [us] | cumulative | imported package". top level imports have no indent
+        lines = [line.split('|') for line in stderr.splitlines() if line.startswith('import time:') and 'self [us]' not in line]
+        times.append((sum(int(cumulative) for _, cumulative, name in lines if not name.startswith('  ')), len(lines)))
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    eager = "; ".join(f"import {package}; [getattr({package}, name) for name in {package}.__all__]" for package in PACKAGES)
+    for module in args.modules:
+        lazy_us, lazy_num = import_time(f"import {module}", args.repeat)
+        eager_us, eager_num = import_time(f"{eager}; import {module}", args.repeat)
+        print(f"{module}")
+        print(f"  lazy  : {lazy_us / 1000:8.1f} ms   {lazy_num:5d} modules")
+        print(f"  eager : {eager_us / 1000:8.1f} ms   {eager_num:5d} modules")
@@ -0,0 +1,85 @@
+"""Time of drawing inference results on 1080p and 4K frames: 
+full-frame layers(before `composite_layers`) vs layers within the region of instances(`draw_to_img`).
+
+    python -m sub_module.benchmarks.bench_overlay --num-instances 3
+"""
+import argparse
+import random
+import time
+import cv2
+import numpy as np
+
+from sub_module.mmdet.visualization import draw_to_img, get_colors, put_text
+
+
+CLASS_NAMES = ['plate', 'number', 'text']
+RESOLUTIONS = dict(fhd = (1080, 1920), uhd = (2160, 3840))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-instances', type = int, default = 3)
+    parser.add_argument('--repeat', type = int, default = 10)
+    return parser.parse_args()
+
+
+def full_frame_draw(img, bboxes, labels, polygons):
+    # `draw_to_img` before `composite_layers`: three full-frame layers are blended over the whole image
+    scores, bboxes = bboxes[:, -1], bboxes[:, :4]
+    object_labels = [f"{CLASS_NAMES[label]} {int(round(score, 2)*100)}%" for label, score in zip(labels, scores)]
+    org_img = img.astype(np.uint8)
+    colors = get_colors(len(object_labels))
+    img_dict = dict(box = np.zeros_like(org_img), polygon = np.zeros_like(org_img), mask = np.zeros_like(org_img))
+    for bbox, color in zip(bboxes, colors):
+        cv2.rectangle(img_dict['box'], (int(bbox[0]), int(bbox[1])), (int(bbox[2]), int(bbox[3])),
+                      color, lineType = cv2.LINE_4, thickness = 2)
+    for polygon, color in zip(polygons, colors):
+        cv2.polylines(img_dict['polygon'], [polygon], isClosed = True, color = color, thickness = 2)
+        cv2.fillPoly(img_dict['mask'], [polygon], color = color)
+    for key, (beta_1, beta_2) in [('box', (0.35, 0.5)), ('polygon', (0.4, 0.4)), ('mask', (0.3, 0.4))]:
+        tmp_img = org_img.copy()
+        tmp_img[img_dict[key] == 0] = 0
+        org_img[img_dict[key] != 0] = 0
+        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = tmp_img, beta = beta_1, gamma = 0)
+        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = img_dict[key], beta = beta_2, gamma = 0)
+    return put_text(org_img, object_labels, bboxes, colors)
+
+
+def make_instances(rng, height, width, num_instances):
+    # license plates: small rectangles in the lower half of frame
+    bboxes, polygons = [], []
+    for _ in range(num_instances):
+        w, h = width // 12, height // 25
+        x0, y0 = rng.randint(0, width - w), rng.randint(height // 2, height - h)
+        bboxes.append([x0, y0, x0 + w, y0 + h, 0.9])
+        polygons.append(np.array([[x0 + 2, y0 + 2], [x0 + w - 2, y0 + 2], [x0 + w - 2, y0 + h - 2], [x0 + 2, y0 + h - 2]],
+                                 dtype = np.int32))
+    return np.array(bboxes, dtype = np.float32), rng.randint(0, len(CLASS_NAMES), num_instances), polygons
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    rng = np.random.RandomState(0)
+    for name, (height, width) in RESOLUTIONS.items():
+        img = rng.randint(0, 256, (height, width, 3), dtype = np.uint8)
+        bboxes, labels, polygons = make_instances(rng, height, width, args.num_instances)
+
+        random.seed(0)      # colors
+        expected = full_frame_draw(img, bboxes, labels, polygons)
+        random.seed(0)
+        result = draw_to_img(img, bboxes, labels, None, CLASS_NAMES, score_thr = 0, polygons = polygons)
+        assert np.array_equal(result, expected)
+        full = best_time(lambda: full_frame_draw(img, bboxes, labels, polygons), args.repeat)
+        roi = best_time(lambda: draw_to_img(img, bboxes, labels, None, CLASS_NAMES, score_thr = 0, polygons = polygons),
+                        args.repeat)
+        print(f"{name} {width}x{height}, {args.num_instances} instances: "
+              f"full frame {full * 1000:7.2f} ms, roi {roi * 1000:7.2f} ms ({full / roi:.1f}x)")
@@ -0,0 +1,99 @@
+"""Read time of encoded images: one file per image vs `ShardReader` of shards made by `pack_dataset`.
+
+Images are read in random order as the sampler does. With `--drop-cache`, pages of all files are
+dropped by `posix_fadvise` before each pass, so the reads go to the disk (or network file system).
+
+    python -m sub_module.benchmarks.bench_shard --num-images 2000 --work-dir /data/bench_shard --drop-cache
+"""
+import argparse
+import os, os.path as osp
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from sub_module.mmdet.data.dataset import CustomDataset
+from sub_module.mmdet.data.shard import pack_dataset, ShardDataset
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-images', type = int, default = 1000)
+    parser.add_argument('--img-size', type = int, nargs = 2, default = [480, 640], help = "height, width")
+    parser.add_argument('--work-dir', default = None, help = "images and shards are written here. default: temporary directory")
+    parser.add_argument('--drop-cache', action = 'store_true')
+    parser.add_argument('--repeat', type = int, default = 3)
+    return parser.parse_args()
+
+
+class JpegDataset(CustomDataset):
+    # random jpeg files without annotation file
+    CLASSES = ('board', )
+
+    def __init__(self, img_dir, num_images, img_size):
+        super().__init__()
+        rng = np.random.RandomState(0)
+        self.img_prefix = img_dir
+        self.data_infos = []
+        base = rng.randint(0, 256, (img_size[0], img_size[1], 3), dtype = np.uint8)
+        for i in range(num_images):
+            file_name = f"{i:06d}.jpg"
+            if not osp.isfile(osp.join(img_dir, file_name)):
+                cv2.imwrite(osp.join(img_dir, file_name), np.roll(base, i, axis = 1))
+            self.data_infos.append(dict(id = i, file_name = file_name, height = img_size[0], width = img_size[1]))
+
+    def get_ann_info(self, idx):
+        return dict(bboxes = np.zeros((0, 4), dtype = np.float32), labels = np.zeros(0, dtype = np.int64), masks = [])
+
+
+def drop_cache(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def read_files(paths, order):
+    for idx in order:
+        with open(paths[idx], 'rb') as f:
+            f.read()
+
+
+def read_shards(reader, order):
+    for idx in order:
+        reader.read(idx)
+
+
+def best_time(func, repeat, cached_paths = None):
+    times = []
+    for _ in range(repeat):
+        if cached_paths is not None:
+            drop_cache(cached_paths)
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    work_dir = args.work_dir if args.work_dir is not None else tempfile.mkdtemp()
+    img_dir, shard_dir = osp.join(work_dir, 'images'), osp.join(work_dir, 'shards')
+    os.makedirs(img_dir, exist_ok = True)
+
+    dataset = JpegDataset(img_dir, args.num_images, args.img_size)
+    shard_dataset = ShardDataset(pack_dataset(dataset, shard_dir), pipeline = [])
+    reader = shard_dataset.file_client
+
+    file_paths = [osp.join(img_dir, info['file_name']) for info in dataset.data_infos]
+    shard_paths = [osp.join(shard_dir, shard) for shard in reader.shards]
+    order = np.random.RandomState(1).permutation(len(dataset))
+    total_bytes = sum(osp.getsize(path) for path in file_paths)
+
+    files = best_time(lambda: read_files(file_paths, order), args.repeat, file_paths if args.drop_cache else None)
+    shards = best_time(lambda: read_shards(reader, order), args.repeat, shard_paths if args.drop_cache else None)
+    print(f"{len(dataset)} images, {total_bytes / 1024**2:.1f} MiB, {len(shard_paths)} shards, drop cache: {args.drop_cache}")
+    print(f"files  : {files * 1000:8.1f} ms   {len(dataset) / files:8.0f} images/s")
+    print(f"shards : {shards * 1000:8.1f} ms   {len(dataset) / shards:8.0f} images/s   ({files / shards:.1f}x)")
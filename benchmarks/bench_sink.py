@@ -0,0 +1,46 @@
+"""Throughput of ResultSink (rows/s) against batch_size, on a local sqlite database.
+
+    python -m sub_module.benchmarks.bench_sink --num-rows 20000 --batch-sizes 1 10 100 500 2000
+"""
+import argparse
+import functools
+import os.path as osp
+import sqlite3
+import tempfile
+import time
+
+from sub_module.database.sink import ConnectionPool, ResultSink
+
+
+SCHEMA = "CREATE TABLE plate_result (file_name TEXT, main_text TEXT, sub_text TEXT)"
+COLUMNS = ['file_name', 'main_text', 'sub_text']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-rows', type = int, default = 20000)
+    parser.add_argument('--batch-sizes', type = int, nargs = '+', default = [1, 10, 100, 500, 2000])
+    return parser.parse_args()
+
+
+def bench(batch_size, num_rows, db_dir):
+    db_path = osp.join(db_dir, f"bench_{batch_size}.db")
+    pool = ConnectionPool(functools.partial(sqlite3.connect, db_path, check_same_thread = False))
+    rows = [(f"{i}.jpg", f"main_{i}", f"sub_{i}") for i in range(num_rows)]
+
+    start = time.perf_counter()
+    with ResultSink(pool, 'plate_result', COLUMNS, schema = SCHEMA, batch_size = batch_size,
+                    flush_interval = 60, dialect = 'sqlite') as sink:
+        for row in rows:
+            sink.write(row)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return num_rows / elapsed
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as db_dir:
+        print(f"{'batch_size':>10} {'rows/s':>12}")
+        for batch_size in args.batch_sizes:
+            print(f"{batch_size:>10} {bench(batch_size, args.num_rows, db_dir):>12.0f}")
@@ -0,0 +1,57 @@
+"""Latency of `inference_detector` with and without the mask branch (`with_mask`).
+
+Needs a trained Mask R-CNN and a CUDA device, same as `inference_detector`.
+
+    python -m sub_module.benchmarks.bench_with_mask --cfg config.py --model model.pth --imgs a.jpg b.jpg --batch-size 2
+"""
+import argparse
+import time
+import numpy as np
+import torch
+
+from sub_module.configs.config import Config
+from sub_module.mmdet.inference import build_detector, inference_detector
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cfg', required = True, help = "config with `test_pipeline` (and `model` if the checkpoint has no `model_cfg`)")
+    parser.add_argument('--model', required = True, help = "checkpoint path")
+    parser.add_argument('--imgs', nargs = '+', required = True)
+    parser.add_argument('--batch-size', type = int, default = 1)
+    parser.add_argument('--repeat', type = int, default = 10)
+    parser.add_argument('--device', default = 'cuda:0')
+    return parser.parse_args()
+
+
+def best_time(func, repeat):
+    func()      # warm up: cudnn benchmark, memory allocation
+    times = []
+    for _ in range(repeat):
+        torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    cfg = Config.fromfile(args.cfg)
+    model = build_detector(cfg, args.model, device = args.device)
+    model.cfg = cfg
+    model.eval()
+
+    imgs = args.imgs[:args.batch_size]
+    with_mask_results = inference_detector(model, imgs, with_mask = True)
+    without_mask_results = inference_detector(model, imgs, with_mask = False)
+    # bbox results do not depend on the mask branch
+    for (bbox_result, _), result in zip(with_mask_results, without_mask_results):
+        assert all(np.array_equal(a, b) for a, b in zip(bbox_result, result))
+
+    with_mask = best_time(lambda: inference_detector(model, imgs, with_mask = True), args.repeat)
+    without_mask = best_time(lambda: inference_detector(model, imgs, with_mask = False), args.repeat)
+    print(f"batch of {len(imgs)} images, {sum(len(b) for b in without_mask_results[0])} detections in the first image")
+    print(f"with_mask = True  : {with_mask * 1000:8.2f} ms")
+    print(f"with_mask = False : {without_mask * 1000:8.2f} ms   ({with_mask / without_mask:.2f}x)")
@@ -1,4 +1,5 @@
 from .storage import *
 from .dvc import *
 __all__ = ['get_client_secrets', "get_client_secrets", "set_gs_credentials_dvc", "dvc_pull", "dvc_push",
-           "set_gs_credentials", "convert_to_linebreak"]
\ No newline at end of file
+           "set_gs_credentials", "convert_to_linebreak",
+           "DatasetCache", "LocalRemote", "GSRemote"]
\ No newline at end of file
@@ -3,6 +3,13 @@ import json
 import subprocess
 import platform
 import re
+import hashlib
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
 from dvc.config import Config
 
 
@@ -119,7 +126,8 @@ def set_gs_credentials_dvc(remote: str, bucket_name: str, client_secrets: dict,
     return client_secrets_path
 
 
-def dvc_pull(remote: str, bucket_name: str, client_secrets: dict, data_root: str, dvc_path = osp.join(os.getcwd(), ".dvc")):
+def dvc_pull(remote: str, bucket_name: str, client_secrets: dict, data_root: str, dvc_path = osp.join(os.getcwd(), ".dvc"),
+             cache_dir: str = None, num_workers = 8):
     """ run dvc pull from google cloud storage
 
     Args:
@@ -127,6 +135,10 @@ def dvc_pull(remote: str, bucket_name: str, client_secrets: dict, data_root: str
         bucket_name (str): bucket name of google storage
         client_secrets (dict): credentials info to access google storage
         data_root (str): name of folder where located dataset(images)
+        cache_dir (str, optional): If given, the dataset is materialized by `DatasetCache` in `cache_dir`
+            instead of `dvc pull`. only missing objects are fetched, and nothing is fetched 
+            if `data_root` is already the version of `{data_root}.dvc`
+        num_workers (int): number of threads to fetch objects. used with `cache_dir`
 
     Returns:
         dataset_dir_path (str): path of dataset directory
@@ -138,6 +150,17 @@ def dvc_pull(remote: str, bucket_name: str, client_secrets: dict, data_root: str
     dvc_file_path = f'{data_root}.dvc'          
     assert osp.isfile(dvc_file_path), f"Path: {dvc_file_path} is not exist!" 
 
+    if cache_dir is not None:
+        dataset_cache = DatasetCache(cache_dir, GSRemote(bucket_name, client_secrets), num_workers = num_workers)
+        stats = dataset_cache.materialize(dvc_file_path, data_root)
+        if stats['skipped']:
+            print(f"`{data_root}` is already the version of `{dvc_file_path}`. skip pull.")
+        else:
+            print(f"Materialized `{data_root}`: fetched {stats['num_fetched']}/{stats['num_files']} files, "
+                  f"{stats['bytes_fetched']} bytes in {stats['time']:.1f}s"
+                  + (f", saved about {stats['time_saved']:.1f}s by cache" if stats['time_saved'] is not None else ""))
+        return osp.abspath(data_root)
+    
     client_secrets_path = set_gs_credentials_dvc(remote, bucket_name, client_secrets, dvc_path)
     
     # download dataset from GS by dvc 
@@ -189,3 +212,221 @@ def dvc_push(remote: str, bucket_name: str, client_secrets: dict, dvc_path = osp
     print(f"Run `$ dvc push`") 
     subprocess.call(["dvc push"], shell=True)          
     os.remove(client_secrets_path)
+
+
+
+def get_file_md5(path, chunk_size = 1024 * 1024, dos2unix = False):
+    """
+    Args:
+        dos2unix (bool): If True, CRLF is converted to LF before hashing, as dvc < 3.0 does for text files.
+    """
+    hash_md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        if dos2unix:
+            hash_md5.update(f.read().replace(b"\r\n", b"\n"))
+            return hash_md5.hexdigest()
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+class LocalRemote:
+    """dvc remote on local file system. e.g. `dvc remote add local_remote /path/to/remote`
+
+    Args:
+        root (str): path of remote
+    """
+    def __init__(self, root: str):
+        self.root = root
+    
+    def fetch(self, md5: str, dst_path: str):
+        """copy object of `md5` to `dst_path`, and return the number of bytes"""
+        for object_path in [osp.join(self.root, "files", "md5", md5[:2], md5[2:]),      # dvc >= 3.0
+                            osp.join(self.root, md5[:2], md5[2:])]:                     # dvc < 3.0
+            if osp.isfile(object_path):
+                shutil.copyfile(object_path, dst_path)
+                return osp.getsize(dst_path)
+        raise FileNotFoundError(f"Object: {md5} is not exist in remote: {self.root}")
+        
+        
+class GSRemote:
+    """dvc remote on google storage. credentials are used in memory, not written to disk.
+
+    Args:
+        bucket_name (str): bucket name of google storage
+        client_secrets (dict): credentials info to access google storage
+        prefix (str): path of remote in bucket. e.g. 'dvc' for `gs://bucket_name/dvc`
+    """
+    def __init__(self, bucket_name: str, client_secrets: dict, prefix: str = ""):
+        from google.cloud import storage
+        self.bucket = storage.Client.from_service_account_info(client_secrets).bucket(bucket_name)
+        self.prefix = prefix.strip("/")
+    
+    def fetch(self, md5: str, dst_path: str):
+        from google.api_core.exceptions import NotFound
+        for object_name in [f"files/md5/{md5[:2]}/{md5[2:]}", f"{md5[:2]}/{md5[2:]}"]:
+            try:
+                self.bucket.blob(osp.join(self.prefix, object_name)).download_to_filename(dst_path)
+            except NotFound:
+                continue
+            return osp.getsize(dst_path)
+        raise FileNotFoundError(f"Object: {md5} is not exist in bucket: {self.bucket.name}/{self.prefix}")
+        
+        
+
+class DatasetCache:
+    """Local content-addressed cache of dataset tracked by dvc.
+
+    Objects are stored as `cache_dir/objects/ab/cdef...` by their md5, same as dvc cache.
+    Each fetched object is verified with its md5 before it is put in the cache.
+    The dataset is materialized in `data_root` by hard-linking cached objects
+    (copied if `cache_dir` and `data_root` are on different devices), so only missing objects are fetched.
+    Files in tracked directories which are not in the version are removed, as `dvc checkout` does.
+
+    Args:
+        cache_dir (str): path of cache directory. must be kept between pipeline steps (e.g. on a pvc)
+        remote (LocalRemote or GSRemote): where to fetch missing objects
+        num_workers (int): number of threads to fetch objects in parallel
+    """
+    def __init__(self, cache_dir: str, remote, num_workers = 8):
+        self.cache_dir = cache_dir
+        self.remote = remote
+        self.num_workers = num_workers
+        os.makedirs(osp.join(cache_dir, "objects"), exist_ok = True)
+    
+    def object_path(self, md5: str):
+        return osp.join(self.cache_dir, "objects", md5[:2], md5[2:])
+    
+    def get_object(self, md5: str):
+        """fetch object of `md5` if it is not in cache.
+
+        Returns:
+            int: fetched bytes. 0 if cached
+        """
+        object_path = self.object_path(md5)
+        if osp.isfile(object_path): return 0
+        
+        os.makedirs(osp.dirname(object_path), exist_ok = True)
+        # rename after fetching, so that a broken file never stays in cache
+        tmp_path = f"{object_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            num_bytes = self.remote.fetch(md5, tmp_path)
+            self._verify(md5, tmp_path)
+            os.replace(tmp_path, object_path)
+        finally:
+            if osp.isfile(tmp_path): os.remove(tmp_path)
+        return num_bytes
+    
+    def _verify(self, md5: str, path: str):
+        expected = md5.split(".")[0]        # `.dir` objects are hashed in the same way
+        actual = get_file_md5(path)
+        # dvc < 3.0 hashes text files after converting CRLF to LF
+        if actual != expected and get_file_md5(path, dos2unix = True) != expected:
+            raise OSError(f"Object: {md5} fetched from remote is corrupted. md5 of the content is {actual}")
+    
+    def materialize(self, dvc_file_path: str, data_root: str):
+        """Link all files of the version of `dvc_file_path` into `data_root`.
+        
+        Files in `data_root` are hard links of cache, so they must not be modified in place.
+
+        Returns:
+            dict: `skipped` (True if `data_root` is already the version), 
+                `num_files`, `num_fetched`, `bytes_fetched`, `bytes_cached`, `time`, 
+                `num_removed` (files of other versions removed from `data_root`), 
+                `time_saved` (estimated seconds to fetch `bytes_cached` at the throughput of remote)
+        """
+        start_time = time.time()
+        version = get_file_md5(dvc_file_path)
+        stats = dict(skipped = False, num_files = 0, num_fetched = 0, bytes_fetched = 0, bytes_cached = 0, 
+                     num_removed = 0, time = 0., time_saved = None)
+        
+        # `data_root` is materialized from the same `.dvc` file
+        marker_path = f"{data_root}.materialized"
+        if osp.exists(data_root) and osp.isfile(marker_path):
+            with open(marker_path, "r") as f:
+                if f.read().strip() == version:
+                    stats['skipped'] = True
+                    stats['time'] = time.time() - start_time
+                    return stats
+        
+        files, dirs = self._get_files(dvc_file_path, data_root)       # [(md5, size, path), ...], [tracked dir, ...]
+        stats['num_files'] = len(files)
+        
+        fetch_start_time = time.time()
+        with ThreadPoolExecutor(max_workers = self.num_workers) as executor:
+            fetched_bytes = list(executor.map(self.get_object, [md5 for md5, _, _ in files]))
+        fetch_time = time.time() - fetch_start_time
+        
+        for (md5, size, path), num_bytes in zip(files, fetched_bytes):
+            if num_bytes > 0:
+                stats['num_fetched'] += 1
+                stats['bytes_fetched'] += num_bytes
+            else:
+                stats['bytes_cached'] += osp.getsize(self.object_path(md5)) if size is None else size
+            self._link(self.object_path(md5), path)
+        stats['num_removed'] = self._remove_untracked(dirs, [path for _, _, path in files])
+        
+        # throughput of remote is kept to estimate saved time when every object is cached
+        throughput = self._update_throughput(stats['bytes_fetched'], fetch_time)
+        if throughput is not None:
+            stats['time_saved'] = stats['bytes_cached'] / throughput
+        
+        with open(marker_path, "w") as f:
+            f.write(version)
+        stats['time'] = time.time() - start_time
+        return stats
+    
+    def _get_files(self, dvc_file_path, data_root):
+        with open(dvc_file_path, "r") as f:
+            outs = yaml.safe_load(f)['outs']
+        
+        files, dirs = [], []
+        for out in outs:
+            md5 = out['md5']
+            if not md5.endswith(".dir"):        # single file
+                files.append((md5, out.get('size', None), data_root))
+                continue
+            
+            self.get_object(md5)
+            dirs.append(data_root)
+            with open(self.object_path(md5), "r") as f:
+                for entry in json.load(f):
+                    files.append((entry['md5'], entry.get('size', None), osp.join(data_root, entry['relpath'])))
+        return files, dirs
+    
+    def _remove_untracked(self, dirs, paths):
+        """remove files and empty directories in `dirs` which are not in `paths`, and return the number of removed files"""
+        paths = set(osp.abspath(path) for path in paths)
+        num_removed = 0
+        for dir_path in dirs:
+            for root, _, file_names in os.walk(dir_path, topdown = False):
+                for file_name in file_names:
+                    path = osp.abspath(osp.join(root, file_name))
+                    if path not in paths:
+                        os.remove(path)
+                        num_removed += 1
+                if root != dir_path and len(os.listdir(root)) == 0:
+                    os.rmdir(root)
+        return num_removed
+    
+    def _link(self, object_path, path):
+        if osp.isfile(path):
+            if osp.samefile(object_path, path): return
+            os.remove(path)
+        os.makedirs(osp.dirname(osp.abspath(path)), exist_ok = True)
+        try:
+            os.link(object_path, path)
+        except OSError:     # on different devices
+            shutil.copyfile(object_path, path)
+    
+    def _update_throughput(self, num_bytes, seconds):
+        throughput_path = osp.join(self.cache_dir, "throughput.json")
+        if num_bytes > 0 and seconds > 0:
+            throughput = num_bytes / seconds
+            with open(throughput_path, "w") as f:
+                json.dump(dict(bytes_per_sec = throughput), f)
+            return throughput
+        if osp.isfile(throughput_path):
+            with open(throughput_path, "r") as f:
+                return json.load(f)['bytes_per_sec']
+        return None
@@ -11,6 +11,8 @@ import shutil
 import uuid
 import sys
 import ast
+import hashlib
+import pickle
 from importlib import import_module
 
 from addict import Dict
@@ -24,6 +26,8 @@ BASE_KEY = '_base_'
 DELETE_KEY = '_delete_'
 RESERVED_KEYS = ['filename', 'text', 'pretty_text']
 CONFIGDICT_NAME = 'class_config'
+CONFIG_CACHE_DIR = osp.join(osp.expanduser('~'), '.cache', 'sub_module', 'configs')
+CONFIG_CACHE_VERSION = 1        # increase when the parsing result of `_file2dict` is changed
 
 
 class ConfigDict(Dict) :
@@ -247,12 +251,91 @@ class Config:
         return other
         
     @staticmethod
-    def fromfile(filename, use_predefined_variables=True):
+    def fromfile(filename, use_predefined_variables=True, use_cache=False, cache_dir=None):
+        """
+        Args:
+            use_cache (bool): If True, the parsed config is cached in `cache_dir`, 
+                and loaded without parsing while the config file and its `_base_` files are not changed.
+            cache_dir (str, optional): default: `CONFIG_CACHE_DIR`
+        """
         if isinstance(filename, Path):
             filename = str(filename)
-        cfg_dict, cfg_text = Config._file2dict(filename, use_predefined_variables= use_predefined_variables)
+        
+        cache_path = None
+        if use_cache:
+            cache_path = Config._get_cache_path(filename, use_predefined_variables, cache_dir)
+            cached = Config._load_cache(cache_path)
+            if cached is not None:
+                cfg_dict, cfg_text = cached
+                return Config(cfg_dict, cfg_text=cfg_text, filename=filename)
+        
+        dep_files = []
+        cfg_dict, cfg_text = Config._file2dict(filename, use_predefined_variables= use_predefined_variables,
+                                               dep_files = dep_files)
+        if cache_path is not None:
+            Config._save_cache(cache_path, cfg_dict, cfg_text, dep_files)
 
         return Config(cfg_dict, cfg_text=cfg_text, filename=filename)
+    
+    
+    @staticmethod
+    def _get_file_hash(filename):
+        with open(filename, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    
+    
+    @staticmethod
+    def _get_cache_path(filename, use_predefined_variables=True, cache_dir=None):
+        """Path of cache file, named by the path and the hash of the file, and the values of predefined variables.
+        The path is a part of the key, because `_base_` and `cfg_text` depend on where the file is.
+        `_base_` files are validated when the cache is loaded."""
+        filename = osp.abspath(osp.expanduser(filename))
+        if not osp.isfile(filename):
+            raise FileNotFoundError(f'file "{filename}" does not exist')
+        
+        predefined_vars = Config._get_predefined_vars(filename) if use_predefined_variables else dict()
+        key = f"{CONFIG_CACHE_VERSION}\n{filename}\n{Config._get_file_hash(filename)}\n{sorted(predefined_vars.items())}"
+        cache_dir = CONFIG_CACHE_DIR if cache_dir is None else cache_dir
+        return osp.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pkl')
+    
+    
+    @staticmethod
+    def _load_cache(cache_path):
+        """
+        Returns:
+            tuple(dict, str) or None: (cfg_dict, cfg_text). None if there is no valid cache.
+        """
+        if not osp.isfile(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            for dep_file, file_hash in cache['dep_files'].items():
+                if not osp.isfile(dep_file) or Config._get_file_hash(dep_file) != file_hash:
+                    return None     # one of `_base_` files is changed
+        except Exception as e:      # broken cache file
+            warnings.warn(f"Failed to load config cache {cache_path}: {e}")
+            return None
+        return cache['cfg_dict'], cache['cfg_text']
+    
+    
+    @staticmethod
+    def _save_cache(cache_path, cfg_dict, cfg_text, dep_files):
+        cache = dict(cfg_dict = cfg_dict, 
+                     cfg_text = cfg_text,
+                     dep_files = {dep_file: Config._get_file_hash(dep_file) for dep_file in dep_files})
+        # write to temp file and rename it, so that other processes never read a partially written cache
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(osp.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            # config contains values that cannot be pickled, or `cache_dir` is not writable
+            warnings.warn(f"Failed to save config cache {cache_path}: {e}")
+            if osp.isfile(tmp_path):
+                os.remove(tmp_path)
         
         
     def dump(self, file=None):
@@ -294,11 +377,17 @@ class Config:
                 
     
     @staticmethod
-    def _file2dict(filename, json_dict = None, use_predefined_variables=True):
+    def _file2dict(filename, json_dict = None, use_predefined_variables=True, dep_files = None):
+        """
+        Args:
+            dep_files (list, optional): If given, paths of the file and all of its `_base_` files are appended
+        """
         filename = osp.abspath(osp.expanduser(filename))
         
         if not osp.isfile(filename):
             raise FileNotFoundError(f'file "{filename}" does not exist')
+        if dep_files is not None:
+            dep_files.append(filename)
         
         fileExtname = osp.splitext(filename)[1]
         if fileExtname != '.py':
@@ -354,7 +443,7 @@ class Config:
             cfg_dict_list = list()
             cfg_text_list = list()
             for f in base_filename:
-                _cfg_dict, _cfg_text = Config._file2dict(osp.join(cfg_dir, f))
+                _cfg_dict, _cfg_text = Config._file2dict(osp.join(cfg_dir, f), dep_files = dep_files)
                 cfg_dict_list.append(_cfg_dict)
                 cfg_text_list.append(_cfg_text)
 
@@ -455,19 +544,24 @@ class Config:
     
     @staticmethod
     def _substitute_base_vars(cfg, base_var_dict, base_cfg):
-        """Substitute variable strings to their actual values."""
-        cfg = copy.deepcopy(cfg)
-
+        """Substitute variable strings to their actual values.
+        
+        Containers are rebuilt while substituting, so `cfg` is not modified without deep copy.
+        """
         if isinstance(cfg, dict):
+            new_cfg = cfg.__class__()
             for k, v in cfg.items():
                 if isinstance(v, str) and v in base_var_dict:
                     new_v = base_cfg
                     for new_k in base_var_dict[v].split('.'):
                         new_v = new_v[new_k]
-                    cfg[k] = new_v
+                    new_cfg[k] = new_v
                 elif isinstance(v, (list, tuple, dict)):
-                    cfg[k] = Config._substitute_base_vars(
+                    new_cfg[k] = Config._substitute_base_vars(
                         v, base_var_dict, base_cfg)
+                else:
+                    new_cfg[k] = v
+            cfg = new_cfg
         elif isinstance(cfg, tuple):
             cfg = tuple(
                 Config._substitute_base_vars(c, base_var_dict, base_cfg)
@@ -507,16 +601,21 @@ class Config:
     
     
     @staticmethod
-    def _substitute_predefined_vars(filename, temp_config_name):
+    def _get_predefined_vars(filename):
         file_dirname = osp.dirname(filename)
         file_basename = osp.basename(filename)
         file_basename_no_extension = osp.splitext(file_basename)[0]
         file_extname = osp.splitext(filename)[1]
-        support_templates = dict(
+        return dict(
             fileDirname=file_dirname,
             fileBasename=file_basename,
             fileBasenameNoExtension=file_basename_no_extension,
             fileExtname=file_extname)
+    
+    
+    @staticmethod
+    def _substitute_predefined_vars(filename, temp_config_name):
+        support_templates = Config._get_predefined_vars(filename)
         with open(filename, encoding='utf-8') as f:
             # Setting encoding explicitly to resolve coding issue on windows
             config_file = f.read()
@@ -1,3 +1,5 @@
 from .mysql import *
+from .sink import ConnectionPool, ResultSink
 
-__all__ = ["check_table_exist", "create_table"]
\ No newline at end of file
+__all__ = ["check_table_exist", "create_table", "table_exist", 
+           "ConnectionPool", "ResultSink"]
@@ -1,4 +1,21 @@
 
+def table_exist(cursor, table_name: str, dialect = 'mysql'):
+    """ check whether table_name exists in current database with a single query
+
+    Args:
+        cursor : database.cursor
+        table_name (str): name of table
+        dialect (str): 'mysql' or 'sqlite'
+    """
+    if dialect == 'mysql':
+        cursor.execute("SELECT COUNT(*) FROM information_schema.tables "
+                       "WHERE table_schema = DATABASE() AND table_name = %s", (table_name, ))
+    elif dialect == 'sqlite':
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name, ))
+    else: raise ValueError(f"dialect must be one of 'mysql' and 'sqlite', but got {dialect}")
+    return cursor.fetchone()[0] > 0
+    
+
 
 def create_table(cursor, table_name: str, schema: str):
     """ create table_name if dose not exist in database 
@@ -8,23 +25,12 @@ def create_table(cursor, table_name: str, schema: str):
         table_name (str): name of table
         schema (str): schema of expected table
     """
-    cursor.execute(f"SHOW TABLES")
-    fetchs = cursor.fetchall()
+    if table_exist(cursor, table_name):
+        print(f"  mysql>> table: {table_name} is already exist!") 
+        return
     
-    tables = []
-    if len(fetchs) !=0:
-        for fetch in fetchs:
-            tables.append(fetch[0])
-    else:
-        print(f"  mysql>> create table: {table_name}")
-        cursor.execute(schema)
-    
-    if len(fetchs) !=0:
-        if table_name not in tables:
-            print(f"  mysql>> create table: {table_name}")
-            cursor.execute(schema)
-        else:
-            print(f"  mysql>> table: {table_name} is already exist!") 
+    print(f"  mysql>> create table: {table_name}")
+    cursor.execute(schema)
     
     check_table_exist(cursor, table_name)     
             
@@ -36,7 +42,6 @@ def check_table_exist(cursor, tables_cfg):
     Args:
         cursor : pymysql.connect.cursor  
         tables_cfg (dict or list or str): table names
-        after_create: whether run immediately after table creation
     """
     
     if isinstance(tables_cfg, dict):
@@ -45,21 +50,20 @@ def check_table_exist(cursor, tables_cfg):
             table_names.append(name)
     elif isinstance(tables_cfg, list):
         table_names = tables_cfg
-    elif isinstance(table_names, str):
-        table_names = [table_names]
+    elif isinstance(tables_cfg, str):
+        table_names = [tables_cfg]
         
     else: raise TypeError(f" `tables_cfg` type must be dict or list or str!")
     
-    cursor.execute(f"SHOW TABLES")
-    fetchs = cursor.fetchall()
+    if len(table_names) == 0: return
+    cursor.execute(f"SELECT table_name FROM information_schema.tables "
+                   f"WHERE table_schema = DATABASE() AND table_name IN ({', '.join(['%s'] * len(table_names))})",
+                   tuple(table_names))
+    tables = [fetch[0] for fetch in cursor.fetchall()]
     
-    tables = []
-    if len(fetchs) !=0:
-        for fetch in fetchs:
-            tables.append(fetch[0])
-    else:
+    if len(tables) == 0:
         raise AttributeError(f"Table does not exist in the database!")
 
     for table_name in table_names :
         if table_name not in tables:
-            raise AttributeError(f"Table: {table_name} is not exist in database!")
\ No newline at end of file
+            raise AttributeError(f"Table: {table_name} is not exist in database!")
@@ -0,0 +1,186 @@
+import time
+import queue
+import threading
+import warnings
+from contextlib import contextmanager
+
+from sub_module.database.mysql import table_exist
+
+
+
+class ConnectionPool:
+    """Keep opened connections and reuse them.
+
+    Args:
+        connect (callable): function to open a new connection.
+            e.g. `functools.partial(pymysql.connect, host=..., user=..., password=..., database=...)`
+        size (int): maximum number of kept connections
+    """
+    def __init__(self, connect, size = 2):
+        self._connect = connect
+        self._pool = queue.LifoQueue(maxsize = size)
+        self.checked_tables = set()     # names of tables which are checked to exist in the database
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            yield conn
+        except Exception:
+            # the connection may be broken, so it is closed instead of being reused
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            try:
+                conn.close()
+            except Exception:
+                pass
+            raise
+
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+
+class ResultSink:
+    """Buffer result rows and insert them into a table with `executemany`.
+
+    Rows are flushed when the buffer has `batch_size` rows, or by a timer thread `flush_interval` seconds
+    after the last flush. Remaining rows are flushed by `close`.
+    Since the timer thread uses the connections of the pool, sqlite connections must be opened
+    with `check_same_thread=False`.
+
+    Example:
+        >>> pool = ConnectionPool(functools.partial(pymysql.connect, **db_cfg))
+        >>> with ResultSink(pool, 'plate_result', ['file_name', 'main_text', 'sub_text']) as sink:
+        >>>     for file_name, plates in zip(file_names, batch_plates):
+        >>>         sink.write_many([dict(file_name = file_name, main_text = ''.join(plate['main_text']),
+        >>>                               sub_text = ''.join(plate['sub_text'])) for plate in plates])
+
+    Args:
+        pool (ConnectionPool):
+        table_name (str): name of table
+        columns (list[str]): columns to insert. rows are dict with these keys or sequence in this order
+        schema (str, optional): `CREATE TABLE` query. If given, the table is created when it does not exist.
+        batch_size (int): number of rows to flush at once
+        flush_interval (float): seconds
+        dialect (str): 'mysql' or 'sqlite'. decides the placeholder and the query to check table
+    """
+    def __init__(self, pool, table_name, columns, schema = None,
+                 batch_size = 500, flush_interval = 5.0, dialect = 'mysql'):
+        if dialect not in ['mysql', 'sqlite']:
+            raise ValueError(f"dialect must be one of 'mysql' and 'sqlite', but got {dialect}")
+        self.pool = pool
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dialect = dialect
+
+        placeholder = '%s' if dialect == 'mysql' else '?'
+        self.insert_query = f"INSERT INTO {table_name} ({', '.join(self.columns)}) "\
+                            f"VALUES ({', '.join([placeholder] * len(self.columns))})"
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self.num_written = 0
+
+        self._check_table(schema)
+
+    def _check_table(self, schema):
+        # check only once for each table of the database the pool connects to
+        if self.table_name in self.pool.checked_tables: return
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if not table_exist(cursor, self.table_name, dialect = self.dialect):
+                if schema is None:
+                    raise RuntimeError(f"Table: {self.table_name} does not exist in the database, "
+                                       f"and `schema` is not given to create it.")
+                print(f"  mysql>> create table: {self.table_name}")
+                cursor.execute(schema)
+                conn.commit()
+            cursor.close()
+        self.pool.checked_tables.add(self.table_name)
+
+    def write(self, row):
+        self.write_many([row])
+
+    def write_many(self, rows):
+        """
+        Args:
+            rows (list[dict or sequence]):
+        """
+        rows = [tuple(row[column] for column in self.columns) if isinstance(row, dict) else tuple(row)
+                for row in rows]
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+            elif self._timer is None and len(self._buffer) > 0:
+                self._start_timer()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _start_timer(self):
+        delay = max(self.flush_interval - (time.monotonic() - self._last_flush), 0)
+        self._timer = threading.Timer(delay, self._flush_by_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_by_timer(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self._flush()
+            except Exception as e:
+                warnings.warn(f"Failed to flush {len(self._buffer)} rows into {self.table_name}: {e}")
+                self._start_timer()         # retry after `flush_interval`
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._last_flush = time.monotonic()
+        if len(self._buffer) == 0: return
+
+        rows, self._buffer = self._buffer, []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(rows), self.batch_size):
+                    cursor.executemany(self.insert_query, rows[start:start + self.batch_size])
+                conn.commit()
+                cursor.close()
+        except Exception:
+            self._buffer = rows + self._buffer      # keep rows to retry at next flush
+            raise
+        self.num_written += len(rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,79 +1,107 @@
+import importlib
 
-from .checkpoint import load_checkpoint, save_checkpoint
-from .eval import *
-from .inference import *
-from .optimizer import *
-from .registry import Registry, build_from_cfg
-from .runner import Runner
-from .scatter import scatter_inputs
-from .utils import *
-from .visualization import mask_to_polygon
+# Submodules are imported at the first access of their attributes (PEP 562),
+# so that `import sub_module.mmdet.xxx` does not pull in torch, cv2, pycocotools, ... of all other modules.
+_submodule_attrs = {
+    '.checkpoint': ["load_checkpoint", "save_checkpoint"],
+    '.eval': ["Evaluate", "get_divided_polygon", "get_divided_polygons", "divide_polygon", "get_box_from_pol",
+              "get_render_pool", "shutdown_render_pool", "get_distance", "BOARD_RECORD_DTYPE", "get_board_records", "count_board_matchs",
+              "compute_iou_matrix", "match_detections", "average_precision"],
+    '.inference': ["build_detector", "load_state_dict", "inference_detector", "parse_inference_result"],
+    '.get_info_algorithm': ["Get_info", "read_plates"],
+    '.optimizer': ["build_optimizer", "DefaultOptimizerConstructor"],
+    '.registry': ["Registry", "build_from_cfg"],
+    '.runner': ["Runner", "build_runner"],
+    '.scatter': ["scatter_inputs"],
+    '.dist_utils': ["init_dist", "get_dist_info", "master_only", "barrier"],
+    '.utils': ["load_ext", "ensure_rng", "random_boxes", "to_2tuple", "to_tensor", "auto_scale_lr", "get_host_info",
+               "compute_sec_to_h_d", "deprecated_api_warning", "force_fp32", "multi_apply", "normalize_batch"],
+    '.visualization': ["mask_to_polygon"],
 
+    '.data.api.coco': ["COCO"],
+    '.data.datacontainer': ["DataContainer"],
+    '.data.dataloader': ["build_dataloader", "IterLoader", "measure_dataloader", "measure_pipeline"],
+    '.data.dataset': ["build_dataset", "CustomDataset"],
+    '.data.sampler': ["GroupSampler", "InfiniteGroupSampler", "DistributedGroupSampler", "ReadAheadSampler", "SeedSampler", "BatchScaleSampler"],
+    '.data.fileclient': ["build_file_client", "DiskBackend", "GSBackend", "CachedBackend"],
+    '.data.shard': ["pack_dataset", "ShardReader", "ShardDataset"],
+    '.data.decodedcache': ["DecodedCache"],
+    '.data.transforms.collect': ["Collect"],
+    '.data.transforms.compose': ["Compose"],
+    '.data.transforms.defaultformatbundle': ["DefaultFormatBundle"],
+    '.data.transforms.fusednormalizepad': ["FusedNormalizePad"],
+    '.data.transforms.loadannotations': ["LoadAnnotations"],
+    '.data.transforms.loadimagefronfile': ["LoadImageFromFile", "LoadImageFromWebcam"],
+    '.data.transforms.multiscaleflipaug': ["MultiScaleFlipAug"],
+    '.data.transforms.normalize': ["Normalize"],
+    '.data.transforms.pad': ["Pad"],
+    '.data.transforms.randomflip': ["RandomFlip"],
+    '.data.transforms.resize': ["Resize"],
+    '.data.transforms.utils': ["imrescale", "rescale_size", "imresize", "imflip"],
 
-from .data.api.coco import COCO
-from .data.datacontainer import DataContainer
-from .data.dataloader import build_dataloader
-from .data.dataset import build_dataset, CustomDataset
-from .data.sampler import GroupSampler
-from .data.transforms.collect import Collect
-from .data.transforms.compose import Compose
-from .data.transforms.defaultformatbundle import DefaultFormatBundle
-from .data.transforms.loadannotations import LoadAnnotations
-from .data.transforms.loadimagefronfile import LoadImageFromFile
-from .data.transforms.multiscaleflipaug import MultiScaleFlipAug
-from .data.transforms.normalize import Normalize
-from .data.transforms.pad import Pad
-from .data.transforms.randomflip import RandomFlip
-from .data.transforms.resize import Resize
-from .data.transforms.utils import imrescale, rescale_size, imresize, imflip
+    '.hooks.checkpoint': ["CheckpointHook"],
+    '.hooks.custom': ["Validation_Hook", "Check_Hook"],
+    '.hooks.decodedcache': ["DecodedCacheHook"],
+    '.hooks.paddingstats': ["PaddingStatsHook"],
+    '.hooks.hook': ["Hook"],
+    '.hooks.itertime': ["IterTimerHook"],
+    '.hooks.logger': ["LoggerHook"],
+    '.hooks.optimizer': ["OptimizerHook"],
+    '.hooks.steplrupdater': ["StepLrUpdaterHook"],
 
-from .hooks.checkpoint import CheckpointHook
-from .hooks.custom import Validation_Hook, Check_Hook
-from .hooks.hook import Hook
-from .hooks.itertime import IterTimerHook
-from .hooks.logger import LoggerHook
-from .hooks.optimizer import OptimizerHook
-from .hooks.steplrupdater import StepLrUpdaterHook
+    '.modules.dataparallel': ["build_dp", "build_ddp", "DataParallel", "MMDistributedDataParallel"],
+    '.modules.register_module': ["BACKBONES", "NECKS", "RPN_HEADS", "ROI_HEADS"],
+    '.modules.base.module': ["BaseModule", "ModuleList"],
+    '.modules.base.initialization.constant': ["constant_init"],
+    '.modules.base.initialization.initialize': ["initialize"],
+    '.modules.base.initialization.kaiming': ["kaiming_init"],
+    '.modules.base.initialization.normal': ["NormalInit", "trunc_normal_init"],
+    '.modules.base.initialization.utils': ["BaseInit", "update_init_info", "_no_grad_trunc_normal_"],
+    '.modules.base.initialization.xavier': ["XavierInit"],
+    '.modules.detector.maskrcnn': ["MaskRCNN"],
+}
+_attr_to_submodule = {attr: submodule for submodule, attrs in _submodule_attrs.items() for attr in attrs}
 
-from .modules.dataparallel import build_dp, DataParallel
-from .modules.register_module import *
-from .modules.base.module import BaseModule, ModuleList
-from .modules.base.initialization.constant import constant_init
-from .modules.base.initialization.initialize import initialize
-from .modules.base.initialization.kaiming import kaiming_init
-from .modules.base.initialization.normal import NormalInit, trunc_normal_init
-from .modules.base.initialization.utils import BaseInit, update_init_info, _no_grad_trunc_normal_
-from .modules.base.initialization.xavier import XavierInit
-from .modules.detector.maskrcnn import MaskRCNN
+
+def __getattr__(name):
+    if name not in _attr_to_submodule:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_attr_to_submodule[name], __name__), name)
+    globals()[name] = value         # cache. `__getattr__` is not called again for this name
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_attr_to_submodule))
 
 
 
 __all__ = [
     "load_checkpoint", "save_checkpoint",
-    "Evaluate", "compute_iou", "get_divided_polygon", "divide_polygon", "get_box_from_pol",
+    "Evaluate", "get_divided_polygon", "get_divided_polygons", "divide_polygon", "get_box_from_pol", "compute_iou_matrix", "match_detections", "average_precision",
     'parse_inference_result', "inference_detector",
+    "Get_info", "read_plates",
     "DefaultOptimizerConstructor", "build_optimizer",
-    "Registry", "build_from_cfg", 
+    "Registry", "build_from_cfg",
     "Runner", "build_runner",
     "scatter_inputs",
-    'to_2tuple', 'to_tensor', 'load_ext', "compute_sec_to_h_d", 'get_host_info', "auto_scale_lr",
+    "init_dist", "get_dist_info", "master_only", "barrier",
+    'to_2tuple', 'to_tensor', 'load_ext', "compute_sec_to_h_d", 'get_host_info', "auto_scale_lr", "normalize_batch",
     "mask_to_polygon",
-    
+
     "COCO",
-    "Collect", 'Compose', "DefaultFormatBundle", "LoadAnnotations", "LoadImageFromFile", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
+    "Collect", 'Compose', "DefaultFormatBundle", "FusedNormalizePad", "LoadAnnotations", "LoadImageFromFile", "LoadImageFromWebcam", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
     "imrescale", "rescale_size", "imresize", "imflip",
-    'DataContainer', "build_dataset", "CustomDataset", "GroupSampler", "build_dataloader",
+    'DataContainer', "build_dataset", "CustomDataset", "GroupSampler", "InfiniteGroupSampler", "DistributedGroupSampler", "ReadAheadSampler", "SeedSampler", "BatchScaleSampler", "build_dataloader", "IterLoader", "measure_dataloader", "measure_pipeline",
+    "build_file_client", "DiskBackend", "GSBackend", "CachedBackend",
+    "pack_dataset", "ShardReader", "ShardDataset", "DecodedCache",
+
+    'CheckpointHook', "Validation_Hook", "Check_Hook", "DecodedCacheHook", "Hook", "IterTimerHook", "LoggerHook", "OptimizerHook", "PaddingStatsHook", "StepLrUpdaterHook",
 
-    'CheckpointHook', "Validation_Hook", "Check_Hook", "Hook", "IterTimerHook", "LoggerHook", "OptimizerHook", "StepLrUpdaterHook",
-    
-    "build_dp", "DataParallel",
+    "build_dp", "build_ddp", "DataParallel", "MMDistributedDataParallel",
     "BaseModule", "ModuleList",
-    "initialize", 
+    "initialize",
     "NormalInit", "XavierInit", "kaiming_init", "constant_init",
     "BaseInit", "update_init_info", "_no_grad_trunc_normal_", "trunc_normal_init",
     "MaskRCNN"
 ]
-
-
-
-
@@ -1,5 +1,6 @@
 import os, os.path as osp
 import re
+import inspect
 
 import torch
 from torch.optim import Optimizer
@@ -186,7 +187,11 @@ def load_from_local(file_path: str, map_location='cpu', logger = None):
     if not osp.isfile(filename):
         raise FileNotFoundError(f'{filename} can not be found.')
 
-    checkpoint = torch.load(filename, map_location=map_location)
+    load_kwargs = dict()
+    if 'weights_only' in inspect.signature(torch.load).parameters:
+        # checkpoints to resume have random states of numpy and python
+        load_kwargs['weights_only'] = False
+    checkpoint = torch.load(filename, map_location=map_location, **load_kwargs)
     print_ = f'load checkpoint from local. path: {file_path}'
     if logger is not None:
         logger.info(print_)
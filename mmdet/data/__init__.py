@@ -1,27 +1,52 @@
-from .api.coco import COCO
-
-from .datacontainer import DataContainer
-from .dataloader import build_dataloader
-from .dataset import build_dataset, CustomDataset
-from .sampler import GroupSampler
-
-from .transforms.collect import Collect
-from .transforms.compose import Compose
-from .transforms.defaultformatbundle import DefaultFormatBundle
-from .transforms.loadannotations import LoadAnnotations
-from .transforms.loadimagefronfile import LoadImageFromFile
-from .transforms.multiscaleflipaug import MultiScaleFlipAug
-from .transforms.normalize import Normalize
-from .transforms.pad import Pad
-from .transforms.randomflip import RandomFlip
-from .transforms.resize import Resize
-from .transforms.utils import imrescale, rescale_size, imresize, imflip
+import importlib
+
+# Submodules are imported at the first access of their attributes (PEP 562). see `sub_module/mmdet/__init__.py`
+_submodule_attrs = {
+    '.api.coco': ["COCO"],
+    '.datacontainer': ["DataContainer"],
+    '.dataloader': ["build_dataloader", "IterLoader", "measure_dataloader", "measure_pipeline"],
+    '.dataset': ["build_dataset", "CustomDataset"],
+    '.sampler': ["GroupSampler", "InfiniteGroupSampler", "DistributedGroupSampler", "ReadAheadSampler", "SeedSampler", "BatchScaleSampler"],
+    '.fileclient': ["build_file_client", "DiskBackend", "GSBackend", "CachedBackend"],
+    '.shard': ["pack_dataset", "ShardReader", "ShardDataset"],
+    '.decodedcache': ["DecodedCache"],
+
+    '.transforms.collect': ["Collect"],
+    '.transforms.compose': ["Compose"],
+    '.transforms.defaultformatbundle': ["DefaultFormatBundle"],
+    '.transforms.fusednormalizepad': ["FusedNormalizePad"],
+    '.transforms.loadannotations': ["LoadAnnotations"],
+    '.transforms.loadimagefronfile': ["LoadImageFromFile", "LoadImageFromWebcam"],
+    '.transforms.multiscaleflipaug': ["MultiScaleFlipAug"],
+    '.transforms.normalize': ["Normalize"],
+    '.transforms.pad': ["Pad"],
+    '.transforms.randomflip': ["RandomFlip"],
+    '.transforms.resize': ["Resize"],
+    '.transforms.utils': ["imrescale", "rescale_size", "imresize", "imflip"],
+}
+_attr_to_submodule = {attr: submodule for submodule, attrs in _submodule_attrs.items() for attr in attrs}
+
+
+def __getattr__(name):
+    if name not in _attr_to_submodule:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_attr_to_submodule[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_attr_to_submodule))
+
+
 
 __all__ = [
     "COCO",
     
-    "Collect", 'Compose', "DefaultFormatBundle", "LoadAnnotations", "LoadImageFromFile", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
+    "Collect", 'Compose', "DefaultFormatBundle", "FusedNormalizePad", "LoadAnnotations", "LoadImageFromFile", "LoadImageFromWebcam", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
     "imrescale", "rescale_size", "imresize", "imflip",
     
-    'DataContainer', "build_dataset", "CustomDataset", "GroupSampler", "build_dataloader"
-]
\ No newline at end of file
+    'DataContainer', "build_dataset", "CustomDataset", "GroupSampler", "InfiniteGroupSampler", "DistributedGroupSampler", "ReadAheadSampler", "SeedSampler", "BatchScaleSampler", "build_dataloader", "IterLoader", "measure_dataloader", "measure_pipeline",
+    "build_file_client", "DiskBackend", "GSBackend", "CachedBackend",
+    "pack_dataset", "ShardReader", "ShardDataset", "DecodedCache"
+]
@@ -30,6 +30,8 @@ class DataContainer:
     - copy to GPU without stacking
     - leave the objects as is and pass it to the model
     - pad_dims specifies the number of last few dimensions to do padding
+    - fuse_cfg: data is an uint8 image (H, W, C) which is normalized and padded 
+      directly into the batch tensor by `collate`. dict(mean, std, to_rgb, size_divisor, pad_val, defer)
     """
     
     # 1. cpu_only = True,                   // key: 'gt_masks', 'img_metas'
@@ -41,13 +43,15 @@ class DataContainer:
                  stack=False,
                  padding_value=0,
                  cpu_only=False,
-                 pad_dims=2):
+                 pad_dims=2,
+                 fuse_cfg=None):
         self._data = data
         self._cpu_only = cpu_only               # if False: .contiguous(), .cuda()        
         self._stack = stack                    
         self._padding_value = padding_value
         assert pad_dims in [None, 1, 2, 3]
         self._pad_dims = pad_dims
+        self._fuse_cfg = fuse_cfg
                 
         
     def __repr__(self):
@@ -83,10 +87,31 @@ class DataContainer:
     def pad_dims(self):
         return self._pad_dims
 
+    @property
+    def fuse_cfg(self):
+        return self._fuse_cfg
+
     @assert_tensor_type
     def size(self, *args, **kwargs):
         return self.data.size(*args, **kwargs)
 
     @assert_tensor_type
     def dim(self):
-        return self.data.dim()
\ No newline at end of file
+        return self.data.dim()
+
+    def pin_memory(self):
+        """Called by the DataLoader when `pin_memory=True`.
+
+        Only the tensors to be copied to GPU are pinned. 
+        """
+        if self._cpu_only: return self
+        
+        def _pin(data):
+            if isinstance(data, torch.Tensor):
+                return data.pin_memory()
+            elif isinstance(data, (list, tuple)):
+                return type(data)(_pin(d) for d in data)
+            return data
+        
+        return DataContainer(_pin(self._data), self._stack, self._padding_value, 
+                             cpu_only=self._cpu_only, pad_dims=self._pad_dims, fuse_cfg=self._fuse_cfg)
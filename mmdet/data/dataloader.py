@@ -1,21 +1,23 @@
 from functools import partial
+import time
 import numpy as np
 import random
 from collections.abc import Mapping, Sequence
 
 import torch
-import torch.nn.functional as F
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, SequentialSampler, get_worker_info
 from torch.utils.data.dataloader import default_collate
 
 from sub_module.mmdet.data.datacontainer import DataContainer
-from sub_module.mmdet.data.sampler import GroupSampler
+from sub_module.mmdet.data.sampler import GroupSampler, InfiniteGroupSampler, DistributedGroupSampler, ReadAheadSampler, SeedSampler, BatchScaleSampler
+from sub_module.mmdet.dist_utils import get_dist_info
 
 
-def worker_init_fn(worker_id, num_workers, seed):
+def worker_init_fn(worker_id, num_workers, seed, rank = 0):
     # The seed of each worker equals to
-    # num_worker * rank + worker_id + user_seed
-    worker_seed = num_workers + worker_id + seed
+    # num_worker * (rank + 1) + worker_id + user_seed
+    # the random state of pipeline is seeded for each sample by `SeedSampler` of train dataloader
+    worker_seed = num_workers * (rank + 1) + worker_id + seed
     np.random.seed(worker_seed)
     random.seed(worker_seed)
     torch.manual_seed(worker_seed)
@@ -25,12 +27,50 @@ def _build_dataloader(dataset,
                       batch_size,
                       num_workers,
                       seed,
-                      shuffle = True):
+                      shuffle = True,
+                      infinite = False,
+                      pin_memory = False,
+                      persistent_workers = False,
+                      prefetch_factor = 2,
+                      readahead = 0,
+                      bucket = None,
+                      batch_scale = False,
+                      seed_samples = False,
+                      dist = False):
     if dataset is None: return None
-    sampler = GroupSampler(dataset, batch_size) if shuffle else None
+    rank, _ = get_dist_info()
+    if bucket is not None and shuffle:
+        # group images of similar padded shape instead of aspect ratio > 1
+        dataset.set_bucket_flag(batch_size, **bucket)
+    if dist:
+        # each rank loads a different shard of batches
+        assert shuffle, f"distributed sampler is only supported with shuffle"
+        assert not infinite, f"infinite sampler is not supported in distributed training"
+        sampler = DistributedGroupSampler(dataset, batch_size, seed = seed)
+    elif infinite:
+        # the iterator never ends, so workers keep prefetching across epoch boundaries
+        assert shuffle, f"infinite sampler is only supported with shuffle"
+        sampler = InfiniteGroupSampler(dataset, batch_size, seed = seed)
+    else:
+        sampler = GroupSampler(dataset, batch_size, seed = seed) if shuffle else None
+    if readahead > 0 and hasattr(dataset, 'readahead'):
+        # files of upcoming indices are read in background while workers process current batches
+        sampler = ReadAheadSampler(sampler if sampler is not None else SequentialSampler(dataset),
+                                   dataset, num_readahead = readahead)
+    if batch_scale and shuffle:
+        # multi-scale `Resize` samples one scale for each batch
+        sampler = BatchScaleSampler(sampler, batch_size, seed = seed)
+    if seed_samples and shuffle and seed is not None:
+        # augmentation of each sample is determined by (seed, epoch, position of sample), not by workers
+        sampler = SeedSampler(sampler, batch_size, seed = seed)
     batch_sampler = None
     
-    init_fn = partial(worker_init_fn, num_workers=num_workers,seed=seed) if seed is not None else None
+    init_fn = partial(worker_init_fn, num_workers=num_workers, seed=seed, rank=rank) if seed is not None else None
+    worker_kwargs = dict()
+    if num_workers > 0:
+        # only available when data is loaded by worker processes
+        worker_kwargs.update(persistent_workers = persistent_workers,   # keep workers alive after each epoch
+                             prefetch_factor = prefetch_factor)         # number of batches loaded in advance by each worker
     data_loader = DataLoader(
         dataset,
         batch_size=batch_size,
@@ -38,8 +78,9 @@ def _build_dataloader(dataset,
         num_workers=num_workers,
         batch_sampler=batch_sampler,
         collate_fn=partial(collate, samples_per_gpu=batch_size),    
-        pin_memory=False,
-        worker_init_fn=init_fn) 
+        pin_memory=pin_memory,
+        worker_init_fn=init_fn,
+        **worker_kwargs) 
     return data_loader
 
 
@@ -47,9 +88,32 @@ def _build_dataloader(dataset,
 def build_dataloader(num_workers, seed,
                      train_dataset=None, train_batch_size=None,
                      val_dataset=None, val_batch_size=None,
-                     shuffle = True):
-    train_dataloader = _build_dataloader(train_dataset, train_batch_size, num_workers, seed, shuffle = shuffle)
-    val_dataloader = _build_dataloader(val_dataset, val_batch_size, num_workers, seed, shuffle = shuffle)
+                     shuffle = True,
+                     infinite = False,
+                     train_loader_cfg = None,
+                     val_loader_cfg = None,
+                     dist = False):
+    """
+        infinite (bool): If True, train_dataloader samples endlessly. used for training in iteration units.
+        train_loader_cfg, val_loader_cfg (dict, optional): settings of each DataLoader. 
+            `num_workers` of the dict overrides the common `num_workers`.
+            e.g. dict(num_workers = 2, prefetch_factor = 2, persistent_workers = True, pin_memory = True)
+            `readahead`: number of samples whose files are read ahead by the file client of dataset.
+            `bucket`: arguments of `CustomDataset.set_bucket_flag` except batch_size. e.g. dict(min_bucket_size = 64)
+                If given, every batch is made of images of similar padded shape to reduce padding.
+            `batch_scale`: If True, multi-scale `Resize` samples the same scale for all images of each batch.
+            `persistent_workers = True` is recommended for val_dataloader, 
+            which is iterated several times at each validation.
+        dist (bool): If True, train_dataloader uses `DistributedGroupSampler`. 
+            `train_batch_size` is the batch size per process.
+            val_dataloader is not distributed, because validation runs only on rank 0.
+    """
+    train_loader_cfg = _get_loader_cfg(train_loader_cfg, num_workers)
+    val_loader_cfg = _get_loader_cfg(val_loader_cfg, num_workers)
+    train_dataloader = _build_dataloader(train_dataset, train_batch_size, seed = seed, 
+                                         shuffle = shuffle, infinite = infinite, seed_samples = True, dist = dist,
+                                         **train_loader_cfg)
+    val_dataloader = _build_dataloader(val_dataset, val_batch_size, seed = seed, shuffle = shuffle, **val_loader_cfg)
     
     if train_dataloader is not None and val_dataloader is None: return train_dataloader, None        # only train dataset
     elif val_dataloader is not None and train_dataloader is None: return None, val_dataloader          # only val dataset
@@ -58,6 +122,144 @@ def build_dataloader(num_workers, seed,
 
 
 
+def _get_loader_cfg(loader_cfg, num_workers):
+    loader_cfg = dict() if loader_cfg is None else dict(loader_cfg)
+    valid_keys = ['num_workers', 'prefetch_factor', 'persistent_workers', 'pin_memory', 'readahead', 'bucket', 'batch_scale']
+    for key in loader_cfg.keys():
+        if key not in valid_keys:
+            raise KeyError(f"Invalid key: `{key}` in config of dataloader. valid keys: {valid_keys}")
+    loader_cfg.setdefault('num_workers', num_workers)
+    return loader_cfg
+
+
+
+def measure_dataloader(dataloader, num_iters = 50, logger = None):
+    """Measure the throughput of `dataloader`.
+    
+    Args:
+        dataloader (DataLoader): 
+        num_iters (int): number of batches to load. Ends early if the dataloader is exhausted.
+        logger (logging.Logger, optional): If given, the result is written to the log.
+        
+    Returns:
+        dict: startup_time: time until the first batch is loaded(spawning workers included)
+              samples_per_sec: number of samples loaded per second after the first batch
+    """
+    batch_size = dataloader.batch_size if dataloader.batch_size is not None else 1
+    start_time = time.time()
+    data_iter = iter(dataloader)
+    next(data_iter)
+    startup_time = time.time() - start_time
+    
+    num_batches = 0
+    start_time = time.time()
+    for _ in range(num_iters - 1):
+        try:
+            next(data_iter)
+        except StopIteration:
+            break
+        num_batches +=1
+    taken_time = time.time() - start_time
+    samples_per_sec = num_batches * batch_size / taken_time if taken_time > 0 else 0.
+    
+    result = dict(startup_time = startup_time, samples_per_sec = samples_per_sec)
+    if logger is not None:
+        logger.info(f'num_workers: {dataloader.num_workers}, prefetch_factor: {dataloader.prefetch_factor}, '
+                    f'persistent_workers: {dataloader.persistent_workers}, pin_memory: {dataloader.pin_memory}   '
+                    f'startup: {startup_time:.3f}s, throughput: {samples_per_sec:.2f} samples/s')
+    return result
+
+
+
+def measure_pipeline(dataset, num_samples = 50, batch_size = 2, logger = None):
+    """Measure the time and the size of image of each transform in the pipeline of `dataset`, and of `collate`.
+    
+    Useful to compare pipelines, e.g. `Normalize` and `Pad` with `FusedNormalizePad`.
+    Transforms run in the main process without the cache of dataset.
+    
+    Args:
+        dataset (CustomDataset): 
+        num_samples (int): number of samples to process from index 0
+        batch_size (int): batch size of `collate`
+        logger (logging.Logger, optional): If given, the result is written to the log.
+        
+    Returns:
+        dict: {name of transform: dict(time: average seconds per sample, 
+                                       img_bytes: average bytes of `results['img']` after the transform)}
+              'collate' has average seconds per sample.
+    """
+    num_samples = min(num_samples, len(dataset))
+    names = [transform.__class__.__name__ for transform in dataset.pipeline.transforms]
+    times, img_bytes = np.zeros(len(names)), np.zeros(len(names))
+    samples = []
+    for idx in range(num_samples):
+        results = dict(img_info = dataset.data_infos[idx], ann_info = dataset.get_ann_info(idx))
+        dataset.pre_pipeline(results)
+        for i, transform in enumerate(dataset.pipeline.transforms):
+            start_time = time.perf_counter()
+            results = transform(results)
+            times[i] += time.perf_counter() - start_time
+            img = results['img'].data if isinstance(results.get('img', None), DataContainer) else results.get('img', None)
+            img_bytes[i] += img.nbytes if isinstance(img, np.ndarray) else \
+                            img.element_size() * img.nelement() if isinstance(img, torch.Tensor) else 0
+        samples.append(results)
+    
+    start_time = time.perf_counter()
+    for i in range(0, num_samples, batch_size):
+        collate(samples[i:i + batch_size], samples_per_gpu = batch_size)
+    collate_time = time.perf_counter() - start_time
+    
+    result = {name: dict(time = times[i] / num_samples, img_bytes = img_bytes[i] / num_samples) 
+              for i, name in enumerate(names)}
+    result['collate'] = dict(time = collate_time / num_samples)
+    if logger is not None:
+        for name, value in result.items():
+            logger.info(f"{name:<24} time: {value['time'] * 1000:.3f}ms"
+                        + (f",  img: {value['img_bytes'] / 1024**2:.2f}MB" if 'img_bytes' in value else ""))
+    return result
+
+
+
+class IterLoader:
+    """Endless iterator over a DataLoader.
+
+    The iterator of the DataLoader is created only once. 
+    If the DataLoader uses `InfiniteGroupSampler` it never raises StopIteration,
+    otherwise the iterator is rebuilt at the end of each epoch, and `set_epoch` of the sampler is called
+    so that each epoch has a different order.
+
+    Args:
+        dataloader (DataLoader): 
+        epoch (int): epoch of the sampler when the iterator is created
+    """
+    def __init__(self, dataloader, epoch = 0):
+        self._dataloader = dataloader
+        self.iter_loader = iter(self._dataloader)
+        self._epoch = epoch
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    def __next__(self):
+        try:
+            data = next(self.iter_loader)
+        except StopIteration:
+            self._epoch += 1
+            sampler = getattr(self._dataloader, 'sampler', None)
+            if hasattr(sampler, 'set_epoch'):
+                sampler.set_epoch(self._epoch)
+            time.sleep(2)  # Prevent possible deadlock during epoch transition
+            self.iter_loader = iter(self._dataloader)
+            data = next(self.iter_loader)
+
+        return data
+
+    def __len__(self):
+        return len(self._dataloader)
+
+
+
 def collate(batch, samples_per_gpu=1):
     """Puts each data field into a tensor/DataContainer with outer dimension batch size.
 
@@ -80,7 +282,7 @@ def collate(batch, samples_per_gpu=1):
         if batch[0].cpu_only:  
             # stack by batch_size
             for i in range(0, len(batch), samples_per_gpu):     # samples_per_gpu == batch size
-                stacked.append([sample.data for sample in batch[i:i + samples_per_gpu]])
+                stacked.append([share_memory(sample.data) for sample in batch[i:i + samples_per_gpu]])
             return DataContainer(stacked, batch[0].stack, batch[0].padding_value, 
                                  cpu_only=True)
         elif batch[0].stack:        # cpu_only = False, stack = True
@@ -89,8 +291,12 @@ def collate(batch, samples_per_gpu=1):
             #   len(stacked) == 1
             #   stacked[n].shape = [batch size, chennel, height, width]
             for i in range(0, len(batch), samples_per_gpu):
+                samples = batch[i:i + samples_per_gpu]
+                if batch[i].fuse_cfg is not None:
+                    stacked.append(fuse_normalize_pad([sample.data for sample in samples], batch[i].fuse_cfg))
+                    continue
+                
                 assert isinstance(batch[i].data, torch.Tensor)
-
                 if batch[i].pad_dims is not None:
                     ndim = batch[i].dim()               # dimension of image
                     assert ndim > batch[i].pad_dims     # pad_dims = 2 (w, h)
@@ -99,27 +305,25 @@ def collate(batch, samples_per_gpu=1):
                     for dim in range(1, batch[i].pad_dims + 1):
                         max_shape[dim - 1] = batch[i].size(-dim)        # max_shape = [w, h]  pedded width, height
                   
-                    for sample in batch[i:i + samples_per_gpu]:
+                    for sample in samples:
                         for dim in range(0, ndim - batch[i].pad_dims):
                             assert batch[i].size(dim) == sample.size(dim)
                         for dim in range(1, batch[i].pad_dims + 1):
                             max_shape[dim - 1] = max(max_shape[dim - 1],
                                                      sample.size(-dim))
-                            
-                    padded_samples = []                 # expected: len(padded_samples[n]): 3 = chennel
-                                                        #   size of each chennel = [height, width] 
-                    for sample in batch[i:i + samples_per_gpu]:
-                        pad = [0 for _ in range(batch[i].pad_dims * 2)]
-                        for dim in range(1, batch[i].pad_dims + 1):
-                            pad[2 * dim - 1] = max_shape[dim - 1] - sample.size(-dim)
-                        padded_samples.append(F.pad(sample.data, pad, value=sample.padding_value))
-
-                    stacked.append(default_collate(padded_samples))
+                    
+                    # copy each sample into its slot of the batch tensor, instead of padding and then stacking
+                    shape = [len(samples)] + list(batch[i].size())[:ndim - batch[i].pad_dims] + max_shape[::-1]
+                    out = new_batch_tensor(shape, batch[i].data.dtype)
+                    out.fill_(batch[i].padding_value)
+                    for j, sample in enumerate(samples):
+                        out[j][tuple(slice(0, size) for size in sample.size())].copy_(sample.data)
+                    stacked.append(out)
                 elif batch[i].pad_dims is None:
                     stacked.append(
                         default_collate([
                             sample.data
-                            for sample in batch[i:i + samples_per_gpu]
+                            for sample in samples
                         ]))
                 else:
                     raise ValueError(
@@ -143,4 +347,67 @@ def collate(batch, samples_per_gpu=1):
         return {key: collate([d[key] for d in batch], samples_per_gpu)
                              for key in batch[0] }
     else:
-        return default_collate(batch)
\ No newline at end of file
+        return default_collate(batch)
+
+
+def share_memory(data):
+    """In dataloader workers, move large arrays(e.g. `BitmapMasks`) of cpu only data to shared memory, 
+    so that they are sent to the main process as handles, not pickled copies."""
+    if get_worker_info() is not None and hasattr(data, 'share_memory_'):
+        data.share_memory_()
+    return data
+
+
+
+def new_batch_tensor(shape, dtype):
+    """Allocate an empty batch tensor. 
+    
+    In dataloader workers, it is allocated in shared memory as `default_collate` does,
+    so the batch is sent to the main process without copy.
+    """
+    if get_worker_info() is None:
+        return torch.empty(shape, dtype = dtype)
+    elem = torch.empty(0, dtype = dtype)
+    storage = elem._typed_storage() if hasattr(elem, '_typed_storage') else elem.storage()
+    return elem.new(storage._new_shared(int(np.prod(shape)))).resize_(*shape)
+
+
+
+def fuse_normalize_pad(imgs, fuse_cfg):
+    """Normalize uint8 (H, W, C) images and write them into a padded float32 batch tensor (N, C, H, W).
+
+    Each channel of image is converted, normalized and transposed into its slot of the batch tensor at once,
+    so the image is copied only once. (same result as `Normalize`, `Pad`, `DefaultFormatBundle` and stacking)
+
+    Args:
+        imgs (list[ndarray]): uint8 images of BGR order 
+        fuse_cfg (dict): mean, std, to_rgb, size_divisor, pad_val, defer. set by `FusedNormalizePad`
+            If `defer`, images are only padded and transposed into an uint8 batch tensor.
+    """
+    num_channels = imgs[0].shape[2]
+    max_h, max_w = max(img.shape[0] for img in imgs), max(img.shape[1] for img in imgs)
+    if fuse_cfg['size_divisor'] is not None:
+        max_h = int(np.ceil(max_h / fuse_cfg['size_divisor'])) * fuse_cfg['size_divisor']
+        max_w = int(np.ceil(max_w / fuse_cfg['size_divisor'])) * fuse_cfg['size_divisor']
+    
+    defer = fuse_cfg.get('defer', False)
+    out = new_batch_tensor((len(imgs), num_channels, max_h, max_w), torch.uint8 if defer else torch.float32)
+    out_np = out.numpy()        # shares memory with `out`
+    mean = np.asarray(fuse_cfg['mean'], dtype = np.float32)
+    stdinv = (1 / np.float64(fuse_cfg['std'])).astype(np.float32)
+    channel_order = range(num_channels)[::-1] if fuse_cfg['to_rgb'] else range(num_channels)
+    pad_val = 0 if defer else fuse_cfg['pad_val']       # padded area is filled again by `normalize_batch`
+    for i, img in enumerate(imgs):
+        h, w = img.shape[:2]
+        # fill only the padded area
+        out_np[i, :, h:, :] = pad_val
+        out_np[i, :, :h, w:] = pad_val
+        if defer:
+            # normalized by `normalize_batch` after sent to the device
+            out_np[i, :, :h, :w] = img.transpose(2, 0, 1)
+            continue
+        for c, src_c in enumerate(channel_order):
+            dst = out_np[i, c, :h, :w]
+            np.subtract(img[:, :, src_c], mean[c], out = dst, dtype = np.float32)
+            np.multiply(dst, stdinv[c], out = dst)
+    return out
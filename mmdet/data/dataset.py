@@ -1,15 +1,23 @@
 from torch.utils.data import Dataset
 import json
 import os, os.path as osp
+import random
 import numpy as np
 from terminaltables import AsciiTable
 
 from sub_module.mmdet.data.transforms.compose import Compose
 from sub_module.mmdet.data.api.coco import COCO
+from sub_module.mmdet.data.fileclient import build_file_client, DiskBackend
+from sub_module.mmdet.data.decodedcache import DecodedCache
+from sub_module.mmdet.data.sampler import get_bucket_flag
+from sub_module.mmdet.data.transforms.utils import rescale_size
 
 
 def _build_dataset(dataset_cfg, dataset_api):
     if dataset_cfg is None: return None
+    elif dataset_cfg.get('shard_index', None) is not None:     # packed by `pack_dataset`
+        from sub_module.mmdet.data.shard import ShardDataset
+        return ShardDataset(**dataset_cfg)
     else: return CustomDataset(dataset_api = dataset_api, **dataset_cfg)
         
 def build_dataset(train_cfg = None, val_cfg = None, dataset_api = 'coco'):
@@ -22,6 +30,16 @@ def build_dataset(train_cfg = None, val_cfg = None, dataset_api = 'coco'):
     
     
 
+def _is_deterministic(transform):
+    """Whether the transform returns the same results at every epoch."""
+    name = transform.__class__.__name__
+    if name in ['LoadImageFromFile', 'LoadAnnotations']: return True
+    if name == 'Resize':
+        return transform.img_scale is not None and len(transform.img_scale) == 1 and transform.ratio_range is None
+    return False
+    
+
+
 class CustomDataset(Dataset):
     """Custom dataset for detection.
 
@@ -57,6 +75,13 @@ class CustomDataset(Dataset):
             boxes of the dataset's classes will be filtered out. This option
             only works when `test_mode=False`, i.e., we never filter images
             during tests.
+        file_client_args (dict, optional): Arguments of `build_file_client`. 
+            If given, images are read by the file client in `LoadImageFromFile`.
+            When the backend is not 'disk', `img_prefix` is a path in the storage and not checked on local disk.
+        decoded_cache (dict, optional): Arguments of `DecodedCache`. If given, results of the deterministic 
+            transforms at the head of pipeline(`LoadImageFromFile`, `LoadAnnotations`, `Resize` with single scale) 
+            are cached in shared memory, and only the rest of pipeline runs from the second epoch.
+            e.g. dict(capacity_bytes = 8 * 1024**3, eviction = 'none')
     """
 
     CLASSES = None    
@@ -70,17 +95,24 @@ class CustomDataset(Dataset):
                  data_root=None,
                  img_prefix=None,
                  classes=None,
-                 filter_empty_gt=True):
+                 filter_empty_gt=True,
+                 file_client_args=None,
+                 decoded_cache=None):
         
         self.dataset_api = dataset_api
+        self.file_client = build_file_client(file_client_args) if file_client_args is not None else None
+        self.decoded_cache = None
         if self.confirm_return([ann_file, pipeline, data_root, img_prefix]):
             self.data_root = data_root if osp.isabs(data_root) else  osp.join(os.getcwd(), data_root) 
             self.ann_file = ann_file 
-            self.img_prefix = img_prefix if osp.isabs(img_prefix) else  osp.join(self.data_root, img_prefix)        
             self.filter_empty_gt = filter_empty_gt
             assert osp.isfile(self.ann_file), f"The file: {self.ann_file} dose not exist."
             assert osp.isdir(self.data_root), f"The directory: {self.data_root} dose not exist."
-            assert osp.isdir(self.img_prefix), f"The directory: {self.img_prefix} dose not exist."
+            if self.is_local_file_client():
+                self.img_prefix = img_prefix if osp.isabs(img_prefix) else  osp.join(self.data_root, img_prefix)        
+                assert osp.isdir(self.img_prefix), f"The directory: {self.img_prefix} dose not exist."
+            else:       # path in storage
+                self.img_prefix = img_prefix
         
             with open(self.ann_file, "r") as file:
                 self.data_ann = json.load(file)
@@ -97,10 +129,36 @@ class CustomDataset(Dataset):
             
             # set group flag for the sampler
             self._set_group_flag()  
+            self.init_decoded_cache(decoded_cache)
         else:
             pass
         
         
+    def is_local_file_client(self):
+        file_client = getattr(self.file_client, 'backend', self.file_client)     # backend of `CachedBackend`
+        return file_client is None or (isinstance(file_client, DiskBackend) and file_client.root is None)
+    
+    
+    def init_decoded_cache(self, decoded_cache = None):
+        """Split pipeline into the cached transforms and the others. Must be called after `data_infos` is set."""
+        if decoded_cache is None: return
+        num_cached = 0
+        for transform in self.pipeline.transforms:
+            if not _is_deterministic(transform): break
+            num_cached +=1
+        if num_cached == 0:
+            raise ValueError("decoded_cache needs `LoadImageFromFile` at the head of pipeline")
+        self.cached_pipeline = Compose(self.pipeline.transforms[:num_cached])
+        self.random_pipeline = Compose(self.pipeline.transforms[num_cached:])
+        self.decoded_cache = DecodedCache(len(self), **decoded_cache)
+        
+    
+    def readahead(self, indices):
+        """Read images of `indices` ahead, if the file client supports it."""
+        if not hasattr(self.file_client, 'readahead'): return
+        self.file_client.readahead([osp.join(self.img_prefix, self.data_infos[idx]['file_name']) for idx in indices])
+        
+        
     def confirm_return(self, arg_list):
         for arg in arg_list:
             if arg is None: return False
@@ -368,6 +426,48 @@ class CustomDataset(Dataset):
                 self.flag[i] = 1
 
     
+    def get_pad_shapes(self):
+        """Padded (height, width) of each image after `Resize` and `Pad` of pipeline, computed from `data_infos`.
+        
+        If `Resize` has multiple scales, the first one is used. (only the relative sizes matter for grouping)
+        """
+        pad_shapes = []
+        for img_info in self.data_infos:
+            h, w = img_info['height'], img_info['width']
+            for transform in self.pipeline.transforms:
+                name = transform.__class__.__name__
+                if name == 'Resize' and transform.img_scale is not None:
+                    if transform.keep_ratio:
+                        w, h = rescale_size((w, h), tuple(transform.img_scale[0]))
+                    else:
+                        w, h = transform.img_scale[0]
+                elif name in ['Pad', 'FusedNormalizePad']:
+                    if getattr(transform, 'pad_to_square', False):
+                        h = w = max(h, w)
+                    elif getattr(transform, 'size', None) is not None:
+                        h, w = max(h, transform.size[0]), max(w, transform.size[1])
+                    elif transform.size_divisor is not None:
+                        h = int(np.ceil(h / transform.size_divisor)) * transform.size_divisor
+                        w = int(np.ceil(w / transform.size_divisor)) * transform.size_divisor
+            pad_shapes.append((h, w))
+        return np.array(pad_shapes, dtype=np.int64).reshape(-1, 2)
+    
+    
+    def set_bucket_flag(self, batch_size, min_bucket_size=None):
+        """Replace the group flag(aspect ratio > 1) with buckets of similar padded shape.
+        
+        Samplers make every batch from one bucket, so less pixels are padded in each batch.
+        The order of batches is still shuffled across buckets.
+
+        Args:
+            batch_size (int): 
+            min_bucket_size (int, optional): minimum number of images in a bucket. default: 8 * batch_size
+        """
+        self.pad_shapes = self.get_pad_shapes()
+        min_bucket_size = min_bucket_size if min_bucket_size is not None else 8 * batch_size
+        self.flag = get_bucket_flag(self.pad_shapes, min_bucket_size)
+    
+    
     def get_classes(cls, data_ann, classes=None):
         """Get class names of current dataset.
 
@@ -390,47 +490,82 @@ class CustomDataset(Dataset):
         """Get training/test data after pipeline.
 
         Args:
-            idx (int): Index of data.
+            idx (int | tuple): Index of data. or (index, seeds) from `SeedSampler` or `BatchScaleSampler`
 
         Returns:
             dict: Training/test data (with annotation if `test_mode` is set \
                 True).
         """
-
-        while True:
-            data = self.prepare_train_img(idx) 
-            if data is None:
-                idx = self._rand_another(idx)
-                continue
-                
-            return data
+        seeds = dict()
+        if isinstance(idx, tuple):
+            idx, seeds = idx
+        sample_seed = seeds.get('sample_seed', None)
+        if sample_seed is not None:
+            # transforms use the global random state of the process. It is seeded only while loading
+            # this sample, so the random state of the process(main process if num_workers = 0) is kept
+            np_state, py_state = np.random.get_state(), random.getstate()
+            np.random.seed(sample_seed)
+            random.seed(sample_seed)
+
+        try:
+            while True:
+                data = self.prepare_train_img(idx, seeds.get('scale_seed', None)) 
+                if data is None:
+                    idx = self._rand_another(idx)
+                    continue
+                    
+                return data
+        finally:
+            if sample_seed is not None:
+                np.random.set_state(np_state)
+                random.setstate(py_state)
     
     def _rand_another(self, idx):
         """Get another random index from the same group as the given index."""
         pool = np.where(self.flag == self.flag[idx])[0]
         return np.random.choice(pool)
 
-    def prepare_train_img(self, idx):
+    def prepare_train_img(self, idx, scale_seed=None):
         """Get training data and annotations after pipeline.
 
         Args:
             idx (int): Index of data.
+            scale_seed (int, optional): random seed of `Resize` shared by all images of the batch.
 
         Returns:
             dict: Training data and annotation after pipeline with new keys \
                 introduced by pipeline.
         """
 
+        if self.decoded_cache is not None:
+            return self._prepare_cached_train_img(idx, scale_seed)
         img_info = self.data_infos[idx]
         ann_info = self.get_ann_info(idx)
         results = dict(img_info=img_info, ann_info=ann_info)
 
         self.pre_pipeline(results)
+        if scale_seed is not None:
+            results['scale_seed'] = scale_seed
         return self.pipeline(results)
+    
+    def _prepare_cached_train_img(self, idx, scale_seed=None):
+        results = self.decoded_cache.get(idx)
+        if results is None:
+            results = dict(img_info=self.data_infos[idx], ann_info=self.get_ann_info(idx))
+            self.pre_pipeline(results)
+            results = self.cached_pipeline(results)
+            if results is None: return None
+            self.decoded_cache.put(idx, results)
+        if scale_seed is not None:
+            # multi-scale `Resize` is never cached
+            results['scale_seed'] = scale_seed
+        return self.random_pipeline(results)
         
     def pre_pipeline(self, results):
         """Prepare results dict for pipeline."""
         results['img_prefix'] = self.img_prefix     # directory path where images are located
+        if self.file_client is not None:
+            results['file_client'] = self.file_client
         results['bbox_fields'] = []
         results['mask_fields'] = []
         results['seg_fields'] = []
@@ -0,0 +1,208 @@
+import os
+import pickle
+import shutil
+import warnings
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+
+EMPTY, READY = 0, 1
+SLOT_DTYPE = np.dtype([('state', np.int8), ('gen', np.int64), ('offset', np.int64),
+                       ('meta_nbytes', np.int64), ('nbytes', np.int64)])
+STAT_KEYS = ['hits', 'misses', 'inserts', 'evictions', 'rejected', 'head', 'used_bytes']
+ALIGN = 64          # images start at aligned offsets of the arena
+
+
+
+def _align(num_bytes):
+    return (num_bytes + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _shm_free_bytes():
+    """free bytes of `/dev/shm`, where `SharedMemory` is allocated on Linux. None if there is no `/dev/shm`"""
+    if not os.path.isdir('/dev/shm'): return None
+    return shutil.disk_usage('/dev/shm').free
+
+
+
+class DecodedCache:
+    """Cache decoded (and resized) images in shared memory, which is read by all dataloader workers.
+
+    The arena is allocated in the main process before workers are started. Each sample is stored as
+    pickled results of the deterministic transforms(e.g. `LoadImageFromFile`, `LoadAnnotations`, `Resize`)
+    and raw bytes of `results['img']`.
+
+    eviction:
+        'none': samples are not cached after the arena is full.
+            Cached images are returned as read-only views of the arena without copy.
+        'fifo': the arena is used as a ring buffer and the oldest samples are overwritten.
+            Cached images are copied out, because they can be overwritten by other workers while reading.
+
+    The arena is not checked for space when it is created, and writing to pages beyond the free space of
+    `/dev/shm` kills the process by SIGBUS. So `capacity_bytes` is reduced to the free space with a warning.
+    (docker gives 64MB of `/dev/shm` by default. set `--shm-size` for a larger cache)
+
+    Args:
+        num_samples (int): length of dataset
+        capacity_bytes (int): size of the arena
+        eviction (str): 'none' or 'fifo'
+    """
+    def __init__(self, num_samples, capacity_bytes = 512 * 1024**2, eviction = 'none'):
+        if eviction not in ['none', 'fifo']:
+            raise ValueError(f"eviction must be one of 'none' and 'fifo', but got {eviction}")
+        table_nbytes = SLOT_DTYPE.itemsize * num_samples + 8 * len(STAT_KEYS)
+        free_bytes = _shm_free_bytes()
+        if free_bytes is not None and capacity_bytes + table_nbytes > free_bytes:
+            available_bytes = (free_bytes - table_nbytes) // ALIGN * ALIGN
+            if available_bytes <= 0:
+                raise RuntimeError(f"No space for decoded cache in /dev/shm: {free_bytes} bytes are free")
+            warnings.warn(f"capacity_bytes of decoded cache: {capacity_bytes / 1024**2:.1f}MB is larger than "
+                          f"free space of /dev/shm: {free_bytes / 1024**2:.1f}MB. "
+                          f"Use {available_bytes / 1024**2:.1f}MB instead.")
+            capacity_bytes = available_bytes
+
+        self.num_samples = num_samples
+        self.capacity_bytes = capacity_bytes
+        self.eviction = eviction
+        self._owner_pid = os.getpid()
+        self._lock = mp.Lock()
+
+        self._arena_shm = shared_memory.SharedMemory(create = True, size = capacity_bytes)
+        self._table_shm = shared_memory.SharedMemory(create = True, size = table_nbytes)
+        self._attach()
+        self.slots[:] = np.zeros(num_samples, dtype = SLOT_DTYPE)
+        self.counts[:] = 0
+
+    def _attach(self):
+        self.slots = np.ndarray(self.num_samples, dtype = SLOT_DTYPE, buffer = self._table_shm.buf)
+        self.counts = np.ndarray(len(STAT_KEYS), dtype = np.int64, buffer = self._table_shm.buf,
+                                 offset = SLOT_DTYPE.itemsize * self.num_samples)
+        self._stat_idx = {key: i for i, key in enumerate(STAT_KEYS)}
+
+    def _count(self, key, value = 1):
+        self.counts[self._stat_idx[key]] += value
+
+    def get(self, idx):
+        """
+        Returns:
+            dict or None: results of the cached transforms. None if `idx` is not cached.
+        """
+        slot = self.slots[idx].copy()       # snapshot. the table can be updated by other workers
+        if slot['state'] != READY:
+            with self._lock: self._count('misses')
+            return None
+
+        gen, offset, meta_nbytes = int(slot['gen']), int(slot['offset']), int(slot['meta_nbytes'])
+        try:
+            shape, dtype, results = pickle.loads(self._arena_shm.buf[offset:offset + meta_nbytes])
+            if self.eviction == 'fifo' and self._overwritten(idx, gen):
+                results = None
+            else:
+                img = np.ndarray(shape, dtype = dtype, buffer = self._arena_shm.buf, offset = offset + _align(meta_nbytes))
+                if self.eviction == 'none':
+                    img.flags.writeable = False     # view of arena. shared with all workers
+                else:
+                    img = img.copy()
+        except Exception:
+            # torn read: the slot was overwritten by other worker while reading
+            results = None
+        if results is None or (self.eviction == 'fifo' and self._overwritten(idx, gen)):
+            with self._lock: self._count('misses')
+            return None
+
+        results['img'] = img
+        with self._lock: self._count('hits')
+        return results
+
+    def _overwritten(self, idx, gen):
+        return self.slots['state'][idx] != READY or int(self.slots['gen'][idx]) != gen
+
+    def put(self, idx, results):
+        """Store `results` of the cached transforms. Keys other than `img` must be picklable."""
+        img = np.ascontiguousarray(results['img'])
+        meta = pickle.dumps((img.shape, img.dtype.str,
+                             {key: value for key, value in results.items() if key not in ['img', 'file_client']}),
+                            protocol = pickle.HIGHEST_PROTOCOL)
+        nbytes = _align(len(meta)) + img.nbytes
+
+        with self._lock:
+            slots, counts, stat = self.slots, self.counts, self._stat_idx
+            if slots[idx]['state'] == READY: return          # cached by other worker
+            head = int(counts[stat['head']])
+            if head + nbytes > self.capacity_bytes:
+                if self.eviction == 'none' or nbytes > self.capacity_bytes:
+                    counts[stat['rejected']] += 1
+                    return
+                head = 0        # wrap around
+
+            if self.eviction == 'fifo':
+                overlap = (slots['state'] == READY) & (slots['offset'] < head + nbytes) & \
+                          (slots['offset'] + slots['nbytes'] > head)
+                if overlap.any():
+                    slots['state'][overlap] = EMPTY
+                    slots['gen'][overlap] += 1
+                    counts[stat['evictions']] += int(overlap.sum())
+                    counts[stat['used_bytes']] -= int(slots['nbytes'][overlap].sum())
+
+            buf = self._arena_shm.buf
+            buf[head:head + len(meta)] = meta
+            img_offset = head + _align(len(meta))
+            np.ndarray(img.shape, dtype = img.dtype, buffer = buf, offset = img_offset)[...] = img
+
+            slots['offset'][idx], slots['meta_nbytes'][idx], slots['nbytes'][idx] = head, len(meta), nbytes
+            slots['state'][idx] = READY
+            counts[stat['head']] = head + nbytes
+            counts[stat['used_bytes']] += nbytes
+            counts[stat['inserts']] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: counts of all processes. hits, misses, inserts, evictions, rejected(not cached because of capacity),
+                used_bytes, num_cached, hit_rate
+        """
+        stats = {key: int(self.counts[i]) for i, key in enumerate(STAT_KEYS) if key != 'head'}
+        stats['num_cached'] = int((self.slots['state'] == READY).sum())
+        num_access = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / num_access if num_access > 0 else 0.
+        return stats
+
+    def close(self):
+        if getattr(self, '_closed', False): return
+        self._closed = True
+        for name in ['slots', 'counts']:
+            self.__dict__.pop(name, None)
+        for shm in [self._arena_shm, self._table_shm]:
+            try:
+                shm.close()
+            except BufferError:         # cached images are still referenced
+                pass
+            if os.getpid() == self._owner_pid:
+                shm.unlink()
+
+    def __getstate__(self):
+        # workers attach to the same shared memory by name
+        state = self.__dict__.copy()
+        for name in ['slots', 'counts', '_stat_idx']:
+            state.pop(name, None)
+        state['_arena_shm'] = self._arena_shm.name
+        state['_table_shm'] = self._table_shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._arena_shm = shared_memory.SharedMemory(name = state['_arena_shm'])
+        self._table_shm = shared_memory.SharedMemory(name = state['_table_shm'])
+        if os.getpid() != self._owner_pid:
+            # only the main process unlinks the shared memory
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self._arena_shm._name, 'shared_memory')
+                resource_tracker.unregister(self._table_shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self._attach()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(capacity_bytes={self.capacity_bytes}, eviction='{self.eviction}')"
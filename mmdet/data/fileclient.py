@@ -0,0 +1,288 @@
+import os, os.path as osp
+import fcntl
+import hashlib
+import threading
+import time
+import uuid
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+
+class DiskBackend:
+    """Read files from local disk.
+
+    Also used as a stand-in of remote storage, by setting `root` to a local directory.
+
+    Args:
+        root (str, optional): If given, file paths are relative to `root`
+    """
+    def __init__(self, root = None):
+        self.root = root
+
+    def get(self, filepath):
+        if self.root is not None:
+            filepath = osp.join(self.root, filepath)
+        with open(filepath, 'rb') as f:
+            return f.read()
+
+
+
+class GSBackend:
+    """Read files from google storage.
+
+    Args:
+        bucket_name (str): bucket name of google storage
+        prefix (str): file paths are relative to `gs://bucket_name/prefix`
+        client_secrets (dict, optional): credentials info. If None, `GOOGLE_APPLICATION_CREDENTIALS` is used.
+    """
+    def __init__(self, bucket_name, prefix = "", client_secrets = None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip("/")
+        self.client_secrets = client_secrets
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        # the client is created in each process. it can not be shared with dataloader workers
+        if self._bucket is None:
+            from google.cloud import storage
+            if self.client_secrets is not None:
+                client = storage.Client.from_service_account_info(self.client_secrets)
+            else:
+                client = storage.Client()
+            self._bucket = client.bucket(self.bucket_name)
+        return self._bucket
+
+    def get(self, filepath):
+        return self.bucket.blob(osp.join(self.prefix, filepath)).download_as_bytes()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_bucket'] = None
+        return state
+
+
+
+class CachedBackend:
+    """Read files through a LRU cache on local disk, and read files ahead in background threads.
+
+    The cache is shared by all processes using the same `cache_dir` (e.g. dataloader workers),
+    so files read ahead by the main process are read from disk by workers.
+    Total size of the cache is kept in the file `.size` of `cache_dir`, which every process updates
+    under the file lock `.lock`. Least recently used files are removed when it exceeds `max_cache_bytes`.
+    A file being fetched is marked by `<cache file>.inflight`, so that other processes wait for it
+    instead of fetching the same file again.
+
+    Args:
+        backend (DiskBackend or GSBackend): where files are fetched from when they are not cached
+        cache_dir (str): directory of cache
+        max_cache_bytes (int):
+        num_readahead_workers (int): number of threads to read files ahead
+        inflight_timeout (float): seconds to wait for a file fetched by other process.
+            A marker older than this is regarded as left by a dead process.
+    """
+    def __init__(self, backend, cache_dir, max_cache_bytes = 20 * 1024**3, num_readahead_workers = 8,
+                 inflight_timeout = 60):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.num_readahead_workers = num_readahead_workers
+        self.inflight_timeout = inflight_timeout
+        os.makedirs(cache_dir, exist_ok = True)
+        self._init_process_state()
+
+    def _init_process_state(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = dict()          # filepath: future of read ahead
+
+    def _cache_path(self, filepath):
+        return osp.join(self.cache_dir, hashlib.sha1(filepath.encode('utf-8')).hexdigest())
+
+    def _read_cache(self, filepath):
+        cache_path = self._cache_path(filepath)
+        try:
+            with open(cache_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(cache_path)        # mark as recently used
+        except FileNotFoundError:       # removed by other process right after reading
+            pass
+        return content
+
+    def get(self, filepath):
+        content = self._read_cache(filepath)
+        if content is not None: return content
+
+        future = self._pending.get(filepath, None)
+        if future is not None:
+            future.exception()          # wait for reading ahead
+            content = self._read_cache(filepath)
+            if content is not None: return content
+        return self._fetch(filepath)
+
+    def _fetch(self, filepath):
+        cache_path = self._cache_path(filepath)
+        marker_path = f"{cache_path}.inflight"
+        marked = self._mark_inflight(marker_path)
+        if not marked:
+            content = self._wait_inflight(filepath, marker_path)
+            if content is not None: return content
+        try:
+            content = self._read_cache(filepath)        # fetched by other process before marking
+            if content is not None: return content
+
+            content = self.backend.get(filepath)
+            # rename after writing, so that other processes never read a partially written file
+            tmp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            self._commit(tmp_path, cache_path, len(content))
+            return content
+        finally:
+            if marked:
+                try:
+                    os.remove(marker_path)
+                except FileNotFoundError:
+                    pass
+
+    def _mark_inflight(self, marker_path):
+        """Create the marker of fetching. Return False if other process is fetching the file."""
+        for _ in range(2):
+            try:
+                os.close(os.open(marker_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(marker_path).st_mtime < self.inflight_timeout: return False
+                    os.remove(marker_path)      # left by a dead process
+                except FileNotFoundError:       # fetching has just finished
+                    pass
+        return False
+
+    def _wait_inflight(self, filepath, marker_path):
+        deadline = time.time() + self.inflight_timeout
+        while osp.exists(marker_path) and time.time() < deadline:
+            time.sleep(0.01)
+        # None if fetching of other process failed
+        return self._read_cache(filepath)
+
+    def _readahead(self, filepath):
+        try:
+            if not osp.isfile(self._cache_path(filepath)):
+                self._fetch(filepath)
+        finally:
+            with self._lock:
+                self._pending.pop(filepath, None)
+
+    def readahead(self, filepaths):
+        """Fetch files into cache in background threads."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = self.num_readahead_workers)
+        with self._lock:
+            for filepath in filepaths:
+                if filepath in self._pending: continue
+                future = self._executor.submit(self._readahead, filepath)
+                future.add_done_callback(_check_readahead_error)
+                self._pending[filepath] = future
+
+    @contextmanager
+    def _file_lock(self):
+        # `flock` excludes other processes, and other threads which open the lock file by themselves
+        with open(osp.join(self.cache_dir, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _cache_entries(self):
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and not entry.name.startswith('.')
+                and not entry.name.endswith(('.tmp', '.inflight'))]
+
+    def _commit(self, tmp_path, cache_path, num_bytes):
+        """Move the fetched file into cache and update the size of cache shared by all processes."""
+        size_path = osp.join(self.cache_dir, '.size')
+        with self._file_lock():
+            try:
+                with open(size_path, 'r') as f:
+                    cache_bytes = int(f.read())
+            except (FileNotFoundError, ValueError):
+                cache_bytes = sum(entry.stat().st_size for entry in self._cache_entries())
+            try:
+                cache_bytes -= os.stat(cache_path).st_size      # overwritten
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, cache_path)
+            cache_bytes += num_bytes
+
+            if cache_bytes > self.max_cache_bytes:
+                cache_bytes = self._evict()
+            with open(size_path, 'w') as f:
+                f.write(str(cache_bytes))
+
+    def _evict(self):
+        """Remove least recently used files until 90% of `max_cache_bytes`. Called under the file lock."""
+        entries = sorted(((entry.path, entry.stat()) for entry in self._cache_entries()),
+                         key = lambda item: item[1].st_mtime)
+        cache_bytes = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if cache_bytes <= self.max_cache_bytes * 0.9: break
+            try:
+                os.remove(path)
+            except FileNotFoundError:       # removed by hand
+                pass
+            cache_bytes -= stat.st_size
+        return cache_bytes
+
+    def __getstate__(self):
+        # threads and locks can not be sent to dataloader workers
+        state = self.__dict__.copy()
+        for key in ['_lock', '_executor', '_pending']:
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_process_state()
+
+
+
+def _check_readahead_error(future):
+    if future.exception() is not None:
+        warnings.warn(f"Failed to read ahead: {future.exception()}")
+
+
+
+def build_file_client(file_client_args = None):
+    """
+    Args:
+        file_client_args (dict, optional):
+            backend (str): 'disk' or 'gs'. other keys are arguments of the backend.
+            cache_dir (str, optional): If given, files are read through `CachedBackend`
+            max_cache_bytes, num_readahead_workers, inflight_timeout: arguments of `CachedBackend`
+            e.g. dict(backend = 'gs', bucket_name = 'dataset', prefix = 'images',
+                      cache_dir = '/tmp/image_cache', max_cache_bytes = 50 * 1024**3)
+    Returns:
+        DiskBackend or GSBackend or CachedBackend
+    """
+    file_client_args = dict(backend = 'disk') if file_client_args is None else dict(file_client_args)
+    backend = file_client_args.pop('backend', 'disk')
+    cache_args = {key: file_client_args.pop(key)
+                  for key in ['cache_dir', 'max_cache_bytes', 'num_readahead_workers', 'inflight_timeout'] if key in file_client_args}
+
+    if backend == 'disk':
+        file_client = DiskBackend(**file_client_args)
+    elif backend == 'gs':
+        file_client = GSBackend(**file_client_args)
+    else:
+        raise KeyError(f"Invalid backend: {backend}. valid backends: ['disk', 'gs']")
+
+    if cache_args.get('cache_dir', None) is not None:
+        file_client = CachedBackend(file_client, **cache_args)
+    return file_client
@@ -1,50 +1,401 @@
+import itertools
+from collections import deque
 import numpy as np
 
 from torch.utils.data import Sampler
 
+from sub_module.mmdet.dist_utils import get_dist_info
+
+
+
+def get_group_indices(flag, group_sizes, batch_size, rng = np.random):
+    """Shuffle indices in each group and shuffle the order of batches.
+
+    Args:
+        flag (ndarray): group flag of each image
+        group_sizes (ndarray): number of images in each group
+        batch_size (int):
+        rng (numpy.random.RandomState | module): random number generator
+
+    Returns:
+        list[int]: indices of one epoch. every batch contains images of only one group
+    """
+    indices = []        # will be contains each image index
+
+    for i, size in enumerate(group_sizes):
+        # image를 width, height 기준으로 나뉘어진 group
+        if size == 0:
+            continue
+        indice = np.where(flag == i)[0]
+        assert len(indice) == size
+        rng.shuffle(indice)                           # apply shuffle
+        num_extra = int(np.ceil(size / batch_size)     # remaining number for batch size
+                        ) * batch_size - len(indice)
+        indice = np.concatenate(                                # seletec image rendomly as `num_extra`
+            [indice, rng.choice(indice, num_extra)])
+        indices.append(indice)                                  # append for get lenght equal to batch size
+
+    indices = np.concatenate(indices)
+    indices = [     # list of list with length batch_size
+        indices[i * batch_size:(i + 1) * batch_size]
+        for i in rng.permutation(
+            range(len(indices) // batch_size))
+    ]
+    # len(indices) == round(number of image / batch_size, 1)
+    indices = np.concatenate(indices)
+    return indices.astype(np.int64).tolist()         # set list to 1 dimention
+
+
+
+def get_bucket_flag(pad_shapes, min_bucket_size):
+    """Group images by padded shape to reduce padding in each batch.
+
+    Images of the same padded shape are grouped, and groups are sorted by aspect ratio(in bins of 1/4 octave)
+    and area, then merged with the next ones until each bucket has at least `min_bucket_size` images.
+    Small buckets would add many repeated samples to fill the last batch of each bucket.
+
+    Args:
+        pad_shapes (ndarray): [N, 2] padded (height, width) of each image
+        min_bucket_size (int): 
+
+    Returns:
+        ndarray: bucket id of each image. used as `flag` of samplers
+    """
+    shapes, inverse, counts = np.unique(pad_shapes, axis = 0, return_inverse = True, return_counts = True)
+    ratio_bin = np.round(np.log2(shapes[:, 1] / shapes[:, 0]) * 4)
+    order = np.lexsort((shapes[:, 0] * shapes[:, 1], ratio_bin))      # by aspect ratio, then area
+
+    shape_bucket = np.zeros(len(shapes), dtype = np.int64)
+    bucket, bucket_size = 0, 0
+    for shape_idx in order:
+        if bucket_size >= min_bucket_size:
+            bucket, bucket_size = bucket + 1, 0
+        shape_bucket[shape_idx] = bucket
+        bucket_size += counts[shape_idx]
+    if bucket > 0 and bucket_size < min_bucket_size:
+        # merge the last small bucket into the previous one
+        shape_bucket[shape_bucket == bucket] = bucket - 1
+    return shape_bucket[inverse.reshape(-1)]
+
+
+
+def get_padding_stats(indices, pad_shapes, batch_size):
+    """
+    Args:
+        indices (list[int]): indices of one epoch
+        pad_shapes (ndarray): [N, 2] padded (height, width) of each image
+        batch_size (int):
+
+    Returns:
+        dict: padding_waste: ratio of padded pixels in batch tensors
+              num_repeated: number of samples repeated to fill the last batch of each group
+    """
+    num_batches = len(indices) // batch_size
+    shapes = pad_shapes[np.asarray(indices[:num_batches * batch_size], dtype = np.int64)].reshape(num_batches, batch_size, 2)
+    batch_pixels = shapes.max(axis = 1).prod(axis = 1) * batch_size
+    image_pixels = shapes.prod(axis = 2).sum(axis = 1)
+    return dict(padding_waste = float(1 - image_pixels.sum() / max(batch_pixels.sum(), 1)),
+                num_repeated = len(indices) - len(np.unique(indices)))
+
 
 
 class GroupSampler(Sampler):
-    def __init__(self, dataset, batch_size=1):
-        assert hasattr(dataset, 'flag')  
+    """Sampler that makes every batch contain images of only one group.
+
+    Args:
+        dataset: dataset that has attribute `flag`
+        batch_size (int):
+        seed (int, optional): If specified, the order of each epoch is determined by
+            `seed + epoch`. Otherwise the global numpy random state is used.
+    """
+    def __init__(self, dataset, batch_size=1, seed=None):
+        assert hasattr(dataset, 'flag')
         self.batch_size = batch_size
-        
-        # flag for the higher value between image's width and height  
+        self.seed = seed
+        self.epoch = 0
+        self.start_iter = 0                 # number of iterations to skip in the current epoch
+        self._rng_state = None              # random state used to shuffle the current epoch
+        self._resumed_rng_state = None
+
+        # flag for the higher value between image's width and height
         self.flag = dataset.flag.astype(np.int64)       # [0 or 1, 0 or 1, ... 0 or 1]  0 : width > height, 1 : width < height
+                                                        # or bucket id of padded shape. see `CustomDataset.set_bucket_flag`
+        self.pad_shapes = getattr(dataset, 'pad_shapes', None)
+        self.padding_stats = None           # statistics of padding of the current epoch
         self.group_sizes = np.bincount(self.flag)       # [count of 0, count of 1]
         self.num_samples = 0
         for size in self.group_sizes:
             self.num_samples += int(np.ceil(size / self.batch_size)) * self.batch_size
-    
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def set_start_iter(self, start_iter):
+        """Skip `start_iter` iterations of the next epoch. used when resuming at the middle of epoch."""
+        self.start_iter = start_iter
+
+    def _get_rng(self):
+        if self._resumed_rng_state is not None:
+            # replay the order of the interrupted epoch without touching the global random state
+            rng = np.random.RandomState()
+            rng.set_state(self._resumed_rng_state)
+            self._resumed_rng_state = None
+        elif self.seed is not None:
+            rng = np.random.RandomState(self.seed + self.epoch)
+        else:
+            rng = np.random
+        self._rng_state = rng.get_state()
+        return rng
+
+    def _update_padding_stats(self, indices):
+        if self.pad_shapes is not None:
+            self.padding_stats = get_padding_stats(indices, self.pad_shapes, self.batch_size)
+
     def __iter__(self):
-        indices = []        # will be contains each image index 
-        
+        indices = get_group_indices(self.flag, self.group_sizes, self.batch_size, self._get_rng())
+        assert len(indices) == self.num_samples
+        self._update_padding_stats(indices)
+
+        start, self.start_iter = self.start_iter * self.batch_size, 0
+        return iter(indices[start:])
+
+    def __len__(self):
+        return self.num_samples
+
+    def state_dict(self):
+        return dict(seed = self.seed, epoch = self.epoch, rng_state = self._rng_state)
+
+    def load_state_dict(self, state_dict):
+        self.seed = state_dict['seed']
+        self.epoch = state_dict.get('epoch', 0)
+        self._resumed_rng_state = state_dict.get('rng_state', None)
+
+
+
+class InfiniteGroupSampler(GroupSampler):
+    """Sampler that yields the indices of `GroupSampler` endlessly.
+
+    Since the iterator of the DataLoader never ends, its workers are never torn down
+    and keep prefetching across epoch boundaries.
+    The order of each epoch is determined by `seed + epoch`, so the position in the
+    stream is fully described by the number of consumed iterations.
+
+    Args:
+        dataset: dataset that has attribute `flag`
+        batch_size (int):
+        seed (int): base random seed
+        start_iter (int): number of iterations to skip. used when resuming.
+    """
+    infinite = True         # `set_start_iter` takes the number of iterations over all epochs
+
+    def __init__(self, dataset, batch_size=1, seed=0, start_iter=0):
+        super().__init__(dataset, batch_size)
+        self.seed = seed if seed is not None else 0
+        self.start_iter = start_iter
+
+    def set_start_iter(self, start_iter):
+        """Set the number of iterations already consumed.
+
+        Must be called before the iterator of the DataLoader is created.
+        """
+        self.start_iter = start_iter
+
+    def _indices_of_epoch(self, epoch):
+        rng = np.random.RandomState(self.seed + epoch)
+        return get_group_indices(self.flag, self.group_sizes, self.batch_size, rng)
+
+    def __iter__(self):
+        # `num_samples` is multiple of `batch_size`, so every batch belongs to one epoch
+        start = self.start_iter * self.batch_size
+        epoch, offset = start // self.num_samples, start % self.num_samples
+        while True:
+            indices = self._indices_of_epoch(epoch)
+            self._update_padding_stats(indices)
+            yield from indices[offset:]
+            epoch += 1
+            offset = 0
+
+    def state_dict(self):
+        return dict(seed = self.seed)
+
+    def load_state_dict(self, state_dict):
+        self.seed = state_dict['seed']
+
+
+
+class DistributedGroupSampler(GroupSampler):
+    """GroupSampler for distributed training. each rank gets a different shard of the batches.
+
+    The batches of all ranks are built from the same order, determined by `seed + epoch`,
+    so `set_epoch` must be called at the beginning of each epoch. 
+    Every batch contains images of only one group, and each group is padded to be
+    divisible by `batch_size * num_replicas`.
+
+    Args:
+        dataset: dataset that has attribute `flag`
+        batch_size (int): batch size per process
+        num_replicas (int, optional): number of processes. default: world size
+        rank (int, optional): rank of current process. default: rank of current process group
+        seed (int): base random seed. must be same for all ranks.
+    """
+    def __init__(self, dataset, batch_size=1, num_replicas=None, rank=None, seed=0):
+        _rank, _world_size = get_dist_info()
+        super().__init__(dataset, batch_size, seed = seed if seed is not None else 0)
+        self.num_replicas = num_replicas if num_replicas is not None else _world_size
+        self.rank = rank if rank is not None else _rank
+
+        self.num_samples = 0    # number of samples for each rank
+        for size in self.group_sizes:
+            self.num_samples += int(np.ceil(size / self.batch_size / self.num_replicas)) * self.batch_size
+        self.total_size = self.num_samples * self.num_replicas
+
+    def __iter__(self):
+        rng = np.random.RandomState(self.seed + self.epoch)
+        unit = self.batch_size * self.num_replicas
+
+        indices = []
         for i, size in enumerate(self.group_sizes):
-            # image를 width, height 기준으로 나뉘어진 group
             if size == 0:
                 continue
-            indice = np.where(self.flag == i)[0]        
-            assert len(indice) == size
-            np.random.shuffle(indice)                           # apply shuffle 
-            num_extra = int(np.ceil(size / self.batch_size)     # remaining number for batch size
-                            ) * self.batch_size - len(indice)
-            indice = np.concatenate(                                # seletec image rendomly as `num_extra`
-                [indice, np.random.choice(indice, num_extra)])
-            indices.append(indice)                                  # append for get lenght equal to batch size
-        
-        indices = np.concatenate(indices)
-        indices = [     # list of list with length batch_size
-            indices[i * self.batch_size:(i + 1) * self.batch_size]
-            for i in np.random.permutation(
-                range(len(indices) // self.batch_size))
-        ]
-        # len(indices) == round(number of image / batch_size, 1)
-        indices = np.concatenate(indices)
-        indices = indices.astype(np.int64).tolist()         # set list to 1 dimention 
+            indice = np.where(self.flag == i)[0]
+            indice = indice[rng.permutation(size)]
+            # repeat the group to be divisible by `batch_size * num_replicas`
+            num_extra = int(np.ceil(size / unit)) * unit - size
+            indice = np.concatenate([np.tile(indice, num_extra // size + 1), indice[:num_extra % size]])
+            indices.append(indice)
+
+        indices = np.concatenate(indices).reshape(-1, self.batch_size)     # [num_batches, batch_size]
+        indices = indices[rng.permutation(len(indices))].reshape(-1)
+        assert len(indices) == self.total_size
+
+        # subsample of current rank
+        offset = self.num_samples * self.rank
+        indices = indices[offset:offset + self.num_samples].astype(np.int64).tolist()
+        self._update_padding_stats(indices)
+
+        start, self.start_iter = self.start_iter * self.batch_size, 0
+        return iter(indices[start:])
+
+    def state_dict(self):
+        return dict(seed = self.seed, epoch = self.epoch)
+
+    def load_state_dict(self, state_dict):
+        self.seed = state_dict['seed']
+        self.epoch = state_dict.get('epoch', 0)
+
+
+
+class ReadAheadSampler(Sampler):
+    """Wrap a sampler and let the dataset read the files of upcoming indices ahead.
+
+    Other attributes (e.g. `set_epoch`, `state_dict`) are delegated to the wrapped sampler.
+
+    Args:
+        sampler (Sampler): 
+        dataset: dataset that has method `readahead(indices)`
+        num_readahead (int): number of indices to read ahead
+    """
+    def __init__(self, sampler, dataset, num_readahead = 64):
+        self.sampler = sampler
+        self.dataset = dataset
+        self.num_readahead = num_readahead
+
+    def __iter__(self):
+        iterator = iter(self.sampler)
+        upcoming = deque(itertools.islice(iterator, self.num_readahead))
+        self.dataset.readahead(list(upcoming))
+        while len(upcoming) > 0:
+            yield upcoming.popleft()
+            for idx in itertools.islice(iterator, 1):
+                upcoming.append(idx)
+                self.dataset.readahead([idx])
 
-        assert len(indices) == self.num_samples
-        return iter(indices)
-            
-    
     def __len__(self):
-        return self.num_samples
\ No newline at end of file
+        return len(self.sampler)
+
+    def __getattr__(self, name):
+        if name == 'sampler' or name.startswith('__'):       # not set yet(e.g. while unpickling)
+            raise AttributeError(name)
+        return getattr(self.sampler, name)
+
+
+
+class SeedSampler(Sampler):
+    """Wrap a sampler and give a random seed to each sample.
+
+    Yields `(index, dict(sample_seed = ...))`, and the dataset seeds the random state of the pipeline 
+    with `sample_seed` before loading the sample. So the augmentation of a sample is determined by 
+    `seed`, epoch and the position of the sample in the epoch, not by the worker which loads it, 
+    and it is reproduced when resuming at the middle of an epoch.
+    Seeds given by the wrapped sampler(e.g. `BatchScaleSampler`) are kept in the dict.
+    Other attributes (e.g. `set_epoch`, `state_dict`) are delegated to the wrapped sampler.
+
+    Args:
+        sampler (Sampler): every `batch_size` indices must be a batch.
+        batch_size (int):
+        seed (int, optional): base random seed. If None, it is drawn from global numpy random state at each epoch.
+    """
+    def __init__(self, sampler, batch_size, seed = None):
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def __iter__(self):
+        # read before iterating, because `start_iter` is reset by the wrapped sampler
+        epoch, start_iter = getattr(self.sampler, 'epoch', 0), getattr(self.sampler, 'start_iter', 0)
+        rank = getattr(self.sampler, 'rank', 0)
+        seed = self.seed if self.seed is not None else np.random.randint(2**31)
+        for i, item in enumerate(self.sampler, start = start_iter * self.batch_size):
+            idx, seeds = item if isinstance(item, tuple) else (item, dict())
+            # spawn_key keeps it apart from the scale seed of `BatchScaleSampler`
+            sample_seed = int(np.random.SeedSequence(seed, spawn_key = (epoch, rank, i)).generate_state(1)[0])
+            yield idx, dict(seeds, sample_seed = sample_seed)
+
+    def __len__(self):
+        return len(self.sampler)
+
+    def __getattr__(self, name):
+        if name == 'sampler' or name.startswith('__'):       # not set yet(e.g. while unpickling)
+            raise AttributeError(name)
+        return getattr(self.sampler, name)
+
+
+
+class BatchScaleSampler(Sampler):
+    """Wrap a sampler and give the same random seed of `Resize` to all samples of each batch.
+
+    Yields `(index, dict(scale_seed = ...))`, and the dataset passes `scale_seed` to the pipeline.
+    Multi-scale `Resize` samples the scale with it, so every image of a batch is resized to 
+    the same scale, and multi-scale training doesn't increase padding of batches.
+    The seed is determined by `seed`, epoch and the number of the batch, so it is reproduced
+    when resuming, and is same for the batches of all ranks at the same iteration.
+    Other attributes (e.g. `set_epoch`, `state_dict`) are delegated to the wrapped sampler.
+
+    Args:
+        sampler (Sampler): every `batch_size` indices must be a batch.
+        batch_size (int):
+        seed (int, optional): base random seed. If None, it is drawn from global numpy random state at each epoch.
+    """
+    def __init__(self, sampler, batch_size, seed = None):
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def __iter__(self):
+        # read before iterating, because `start_iter` is reset by the wrapped sampler
+        epoch, start_iter = getattr(self.sampler, 'epoch', 0), getattr(self.sampler, 'start_iter', 0)
+        seed = self.seed if self.seed is not None else np.random.randint(2**31)
+        for i, item in enumerate(self.sampler):
+            if i % self.batch_size == 0:
+                batch_idx = start_iter + i // self.batch_size
+                scale_seed = int(np.random.SeedSequence([seed, epoch, batch_idx]).generate_state(1)[0])
+            idx, seeds = item if isinstance(item, tuple) else (item, dict())
+            yield idx, dict(seeds, scale_seed = scale_seed)
+
+    def __len__(self):
+        return len(self.sampler)
+
+    def __getattr__(self, name):
+        if name == 'sampler' or name.startswith('__'):       # not set yet(e.g. while unpickling)
+            raise AttributeError(name)
+        return getattr(self.sampler, name)
@@ -0,0 +1,153 @@
+import os, os.path as osp
+import pickle
+import numpy as np
+import pycocotools.mask as maskUtils
+
+from sub_module.mmdet.data.dataset import CustomDataset
+from sub_module.mmdet.data.transforms.compose import Compose
+
+
+SHARD_INDEX_VERSION = 1
+SHARD_OFFSET_DTYPE = np.dtype([('shard', np.int32), ('offset', np.int64), ('length', np.int64)])
+
+
+
+def _to_rle(segmentation, height, width):
+    """Convert a polygon or uncompressed RLE to a compressed RLE."""
+    if segmentation is None or (isinstance(segmentation, dict) and not isinstance(segmentation['counts'], list)):
+        return segmentation
+    if isinstance(segmentation, list):
+        # polygon -- a single object might consist of multiple parts
+        return maskUtils.merge(maskUtils.frPyObjects(segmentation, height, width))
+    return maskUtils.frPyObjects(segmentation, height, width)
+
+
+
+def pack_dataset(dataset, out_dir, shard_bytes = 1024**3, prefix = 'shard'):
+    """Pack images and annotations of `dataset` into a few large shard files.
+
+    `out_dir` will contain `{prefix}-00000.bin, {prefix}-00001.bin, ...` of encoded image bytes,
+    and `{prefix}.index` with the offsets of images and the parsed annotations (masks as compressed RLE).
+
+    Args:
+        dataset (CustomDataset):
+        out_dir (str):
+        shard_bytes (int): a new shard is started when a shard exceeds this size
+        prefix (str):
+    Returns:
+        str: path of index file. `shard_index` of `ShardDataset`
+    """
+    os.makedirs(out_dir, exist_ok = True)
+    offsets = np.zeros(len(dataset), dtype = SHARD_OFFSET_DTYPE)
+    data_infos, anns, shards = [], [], []
+
+    shard_file = None
+    for idx in range(len(dataset)):
+        img_info = dataset.data_infos[idx]
+        file_path = osp.join(dataset.img_prefix, img_info['file_name'])
+        if dataset.file_client is not None:
+            img_bytes = dataset.file_client.get(file_path)
+        else:
+            with open(file_path, 'rb') as f:
+                img_bytes = f.read()
+
+        if shard_file is None or shard_file.tell() + len(img_bytes) > shard_bytes:
+            if shard_file is not None: shard_file.close()
+            shards.append(f"{prefix}-{len(shards):05d}.bin")
+            shard_file = open(osp.join(out_dir, shards[-1]), 'wb')
+        offsets[idx] = (len(shards) - 1, shard_file.tell(), len(img_bytes))
+        shard_file.write(img_bytes)
+
+        ann = dataset.get_ann_info(idx)
+        ann['masks'] = [_to_rle(mask, img_info['height'], img_info['width']) for mask in ann['masks']]
+        data_infos.append(img_info)
+        anns.append(ann)
+    if shard_file is not None: shard_file.close()
+
+    index_path = osp.join(out_dir, f"{prefix}.index")
+    with open(index_path, 'wb') as f:
+        pickle.dump(dict(version = SHARD_INDEX_VERSION,
+                         classes = list(dataset.CLASSES),
+                         shards = shards,
+                         offsets = offsets,
+                         data_infos = data_infos,
+                         anns = anns), f, protocol = pickle.HIGHEST_PROTOCOL)
+    return index_path
+
+
+
+class ShardReader:
+    """Read image bytes from shard files with `os.pread`.
+
+    Used as a file client of `LoadImageFromFile`: `get(file_name)` returns the encoded image.
+    File descriptors are opened in each process, so it can be sent to dataloader workers.
+    """
+    def __init__(self, shard_dir, shards, offsets, file_names):
+        self.shard_dir = shard_dir
+        self.shards = shards
+        self.offsets = offsets
+        self.name_to_idx = {file_name: idx for idx, file_name in enumerate(file_names)}
+        self._fds = dict()
+
+    def read(self, idx):
+        shard, offset, length = self.offsets[idx]
+        fd = self._fds.get(shard, None)
+        if fd is None:
+            fd = self._fds[shard] = os.open(osp.join(self.shard_dir, self.shards[shard]), os.O_RDONLY)
+        return os.pread(fd, int(length), int(offset))
+
+    def get(self, filepath):
+        return self.read(self.name_to_idx[filepath])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_fds'] = dict()
+        return state
+
+    def __del__(self):
+        for fd in getattr(self, '_fds', dict()).values():
+            os.close(fd)
+
+
+
+class ShardDataset(CustomDataset):
+    """Dataset of shard files made by `pack_dataset`.
+
+    Each sample is read by one `pread` without metadata lookups of image files,
+    and annotations are loaded from the index at once.
+    `file_path` of img_metas is the file name in the shard, so this dataset is for training only.
+
+    Args:
+        shard_index (str): path of index file
+        pipeline (list[dict]): Processing pipeline. `LoadImageFromFile` reads images from shards.
+        classes (str | Sequence[str], optional): must be same as classes of packed dataset if given
+        decoded_cache (dict, optional): same as `CustomDataset`
+    """
+    def __init__(self, shard_index, pipeline, classes = None, decoded_cache = None, **kwargs):
+        super().__init__()      # attributes are set without annotation file
+        with open(shard_index, 'rb') as f:
+            index = pickle.load(f)
+        if index['version'] != SHARD_INDEX_VERSION:
+            raise ValueError(f"Version of shard index: {index['version']} is not supported. "
+                             f"expected: {SHARD_INDEX_VERSION}")
+        if classes is not None and list(classes) != index['classes']:
+            raise ValueError(f"classes: {classes} is different from classes of shards: {index['classes']}")
+
+        self.shard_index = shard_index
+        self.CLASSES = index['classes']
+        self.PALETTE = self.get_palette()
+        self.data_infos = index['data_infos']
+        self.anns = index['anns']
+        self.img_prefix = ''        # file names are keys of `ShardReader`
+        self.file_client = ShardReader(osp.dirname(osp.abspath(shard_index)), index['shards'], index['offsets'],
+                                       [info['file_name'] for info in self.data_infos])
+        self.pipeline = Compose(pipeline)
+        self._set_group_flag()
+        self.init_decoded_cache(decoded_cache)
+
+    def get_ann_info(self, idx):
+        ann = self.anns[idx]
+        return dict(ann, masks = list(ann['masks']))    # pipeline must not change the loaded annotations
+
+    def readahead(self, indices):
+        pass
@@ -1,8 +1,9 @@
 from .collect import Collect
 from .compose import Compose
 from .defaultformatbundle import DefaultFormatBundle
+from .fusednormalizepad import FusedNormalizePad
 from .loadannotations import LoadAnnotations
-from .loadimagefronfile import LoadImageFromFile
+from .loadimagefronfile import LoadImageFromFile, LoadImageFromWebcam
 from .multiscaleflipaug import MultiScaleFlipAug
 from .normalize import Normalize
 from .pad import Pad
@@ -11,6 +12,6 @@ from .resize import Resize
 from .utils import imrescale, rescale_size, imresize, imflip
 
 __all__ = [
-    "Collect", 'Compose', "DefaultFormatBundle", "LoadAnnotations", "LoadImageFromFile", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
+    "Collect", 'Compose', "DefaultFormatBundle", "FusedNormalizePad", "LoadAnnotations", "LoadImageFromFile", "LoadImageFromWebcam", "MultiScaleFlipAug", "Normalize", "Pad", "RandomFlip", "Resize",
     "imrescale", "rescale_size", "imresize", "imflip"
 ]
\ No newline at end of file
@@ -23,7 +23,8 @@ class DefaultFormatBundle:
 
     Args:
         img_to_float (bool): Whether to force the image to be converted to
-            float type. Default: True.
+            float type. Default: True. 
+            uint8 image is kept when `Normalize` is deferred.
         pad_val (dict): A dict for padding value in batch collating,
             the default value is `dict(img=0, masks=0, seg=255)`.
             Without this argument, the padding value of "gt_semantic_seg"
@@ -54,9 +55,15 @@ class DefaultFormatBundle:
         
         
  
-        if 'img' in results:                    # cpu_only = False, stack = True
+        if 'img' in results and 'img_fuse_cfg' in results:
+            # uint8 (H, W, C) image. normalized and padded by `collate` directly into the batch tensor
+            results = self._add_default_meta_keys(results)
+            results['img'] = DC(results['img'], padding_value=self.pad_val['img'], stack=True, 
+                                fuse_cfg=results.pop('img_fuse_cfg'))
+        elif 'img' in results:                  # cpu_only = False, stack = True
             img = results['img']
-            if self.img_to_float is True and img.dtype == np.uint8:
+            deferred = results.get('img_norm_cfg', dict()).get('defer', False)      # normalized by model
+            if self.img_to_float is True and img.dtype == np.uint8 and not deferred:
                 # Normally, image is of uint8 type without normalization.
                 # At this time, it needs to be forced to be converted to
                 # flot32, otherwise the model training and inference
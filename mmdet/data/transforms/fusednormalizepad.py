@@ -0,0 +1,70 @@
+import numpy as np
+from sub_module.mmdet.data.transforms.compose import PIPELINES
+from sub_module.mmdet.data.transforms.pad import impad
+
+
+@PIPELINES.register_module()
+class FusedNormalizePad:
+    """Normalize and pad the image in `collate`, directly into the batch tensor.
+
+    Used in place of `Normalize` and `Pad`. The image is kept as uint8 (H, W, C) here,
+    and `DefaultFormatBundle` passes it to `collate` with the normalization config.
+    `collate` writes each image into its slot of the float32 batch tensor (N, C, H, W) at once,
+    instead of copying it at `Normalize`, `Pad`, `DefaultFormatBundle` and stacking.
+    Masks and semantic segmentation map are padded here as `Pad` does.
+
+    Args:
+        mean (sequence): Mean values of 3 channels.
+        std (sequence): Std values of 3 channels.
+        to_rgb (bool): Whether to convert the image from BGR to RGB.
+        size_divisor (int, optional): The divisor of padded size.
+            The batch tensor is padded to the multiple of it.
+        pad_val (dict, optional): A dict for padding value. same as `Pad`.
+            The whole padded area of the batch tensor is filled with `pad_val['img']`.
+        defer (bool): If True, `collate` only pads and transposes the image into an uint8 batch tensor,
+            and the batch is normalized on the device of model by `normalize_batch`. same as `Normalize`
+    """
+
+    def __init__(self, mean, std, to_rgb=True, size_divisor=None,
+                 pad_val=dict(img=0, masks=0, seg=255), defer=False):
+        self.mean = np.array(mean, dtype=np.float32)
+        self.std = np.array(std, dtype=np.float32)
+        self.to_rgb = to_rgb
+        self.size_divisor = size_divisor
+        self.pad_val = pad_val
+        self.defer = defer
+
+    def __call__(self, results):
+        """
+        Args:
+            results (dict): Result dict from loading pipeline.
+
+        Returns:
+            dict: 'img_norm_cfg', 'pad_shape', 'pad_fixed_size', 'pad_size_divisor' and
+                'img_fuse_cfg'(used by `DefaultFormatBundle`) keys are added into result dict.
+        """
+        img = results['img']
+        h, w = img.shape[:2]
+        if self.size_divisor is not None:
+            h = int(np.ceil(h / self.size_divisor)) * self.size_divisor
+            w = int(np.ceil(w / self.size_divisor)) * self.size_divisor
+        results['pad_shape'] = (h, w) + tuple(img.shape[2:])
+        results['pad_fixed_size'] = None
+        results['pad_size_divisor'] = self.size_divisor
+        results['img_norm_cfg'] = dict(mean=self.mean, std=self.std, to_rgb=self.to_rgb, 
+                                       defer=self.defer, pad_val=self.pad_val.get('img', 0))
+        results['img_fuse_cfg'] = dict(mean=self.mean, std=self.std, to_rgb=self.to_rgb,
+                                       size_divisor=self.size_divisor, pad_val=self.pad_val.get('img', 0),
+                                       defer=self.defer)
+
+        for key in results.get('mask_fields', []):
+            results[key] = results[key].pad((h, w), pad_val=self.pad_val.get('masks', 0))
+        for key in results.get('seg_fields', []):
+            results[key] = impad(results[key], shape=(h, w), pad_val=self.pad_val.get('seg', 255))
+        return results
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__
+        repr_str += f'(mean={self.mean}, std={self.std}, to_rgb={self.to_rgb}, '
+        repr_str += f'size_divisor={self.size_divisor}, pad_val={self.pad_val}, defer={self.defer})'
+        return repr_str
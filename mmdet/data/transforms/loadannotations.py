@@ -280,6 +280,22 @@ class BitmapMasks:
         """Number of masks."""
         return len(self.masks)
 
+    def share_memory_(self):
+        """Move masks to shared memory.
+
+        When sent to other process (e.g. from dataloader workers to the main process), 
+        only the handle of shared memory is pickled instead of masks.
+        """
+        if getattr(self, '_shared', None) is None:
+            self._shared = torch.from_numpy(np.ascontiguousarray(self.masks)).share_memory_()
+            self.masks = self._shared.numpy()
+        return self
+
+    def __reduce_ex__(self, protocol):
+        if getattr(self, '_shared', None) is not None:
+            return (_rebuild_shared_bitmap_masks, (self._shared, self.height, self.width))
+        return super().__reduce_ex__(protocol)
+
     
     def rescale(self, scale, interpolation='nearest'):
         """See :func:`BaseInstanceMasks.rescale`."""
@@ -648,6 +664,15 @@ class BitmapMasks:
     
  
  
+def _rebuild_shared_bitmap_masks(shared, height, width):
+    masks = BitmapMasks.__new__(BitmapMasks)
+    masks.height, masks.width = height, width
+    masks._shared = shared
+    masks.masks = shared.numpy()
+    return masks
+
+
+
 def imtranslate(img,
                 offset,
                 direction='horizontal',
@@ -2,6 +2,7 @@ import cv2
 import os, os.path as osp
 import numpy as np
 from sub_module.mmdet.data.transforms.compose import PIPELINES
+from sub_module.mmdet.data.fileclient import build_file_client
 
 
 @PIPELINES.register_module()
@@ -19,18 +20,20 @@ class LoadImageFromFile:
             Defaults to False.
         color_type (str): The flag argument for :func:`mmcv.imfrombytes`.
             Defaults to 'color'.
-        file_client_args (dict): Arguments to instantiate a FileClient.
-            See :class:`mmcv.fileio.FileClient` for details.
-            Defaults to ``dict(backend='disk')``.
+        file_client_args (dict, optional): Arguments of `build_file_client`.
+            If None, `results['file_client']` set by the dataset is used if exist,
+            otherwise images are read by `cv2.imread`.
     """
 
     def __init__(self,
                  to_float32=False,
                  color_type='color',
-                 channel_order='bgr'):
+                 channel_order='bgr',
+                 file_client_args=None):
         self.to_float32 = to_float32
         self.color_type = color_type
         self.channel_order = channel_order
+        self.file_client = build_file_client(file_client_args) if file_client_args is not None else None
 
     def __call__(self, results):
         """Call functions to load image and get image meta information.
@@ -48,7 +51,13 @@ class LoadImageFromFile:
         else:                                       # for inferene
             file_path = results['img_info']['file_name']
         
-        img = cv2.imread(file_path)
+        file_client = self.file_client if self.file_client is not None else results.get('file_client', None)
+        if file_client is None:
+            img = cv2.imread(file_path)
+        else:
+            # decode from bytes read by file client
+            img_bytes = file_client.get(file_path)
+            img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
         if self.to_float32:
             img = img.astype(np.float32)
 
@@ -67,3 +76,36 @@ class LoadImageFromFile:
                     f"color_type='{self.color_type}', "
                     f"channel_order='{self.channel_order}' ")
         return repr_str
+
+
+
+@PIPELINES.register_module()
+class LoadImageFromWebcam(LoadImageFromFile):
+    """Load an image from webcam.
+
+    Similar with :obj:`LoadImageFromFile`, but the image read from webcam is in
+    ``results['img']``.
+    """
+
+    def __call__(self, results):
+        """Call functions to add image meta information.
+
+        Args:
+            results (dict): Result dict with Webcam read image in
+                ``results['img']``.
+
+        Returns:
+            dict: The dict contains loaded image and meta information.
+        """
+
+        img = results['img']
+        if self.to_float32:
+            img = img.astype(np.float32)
+
+        results['file_path'] = None
+        results['filename'] = None
+        results['img'] = img
+        results['img_shape'] = img.shape
+        results['ori_shape'] = img.shape
+        results['img_fields'] = ['img']
+        return results
@@ -13,12 +13,17 @@ class Normalize:
         std (sequence): Std values of 3 channels.
         to_rgb (bool): Whether to convert the image from BGR to RGB,
             default is true.
+        defer (bool): If True, the image is kept as uint8 and only "img_norm_cfg" is added.
+            The batch is normalized on the device of model by `normalize_batch`, 
+            so 1/4 bytes are sent to the main process and the device.
+            `DefaultFormatBundle` keeps uint8 image for it.
     """
 
-    def __init__(self, mean, std, to_rgb=True):
+    def __init__(self, mean, std, to_rgb=True, defer=False):
         self.mean = np.array(mean, dtype=np.float32)
         self.std = np.array(std, dtype=np.float32)
         self.to_rgb = to_rgb
+        self.defer = defer
 
     def __call__(self, results):
         """Call function to normalize images.
@@ -30,15 +35,16 @@ class Normalize:
             dict: Normalized results, 'img_norm_cfg' key is added into
                 result dict.
         """
-        for key in results.get('img_fields', ['img']):
-            results[key] = imnormalize(results[key], self.mean, self.std, self.to_rgb)
+        if not self.defer:
+            for key in results.get('img_fields', ['img']):
+                results[key] = imnormalize(results[key], self.mean, self.std, self.to_rgb)
         results['img_norm_cfg'] = dict(
-            mean=self.mean, std=self.std, to_rgb=self.to_rgb)
+            mean=self.mean, std=self.std, to_rgb=self.to_rgb, defer=self.defer)
         return results
 
     def __repr__(self):
         repr_str = self.__class__.__name__
-        repr_str += f'(mean={self.mean}, std={self.std}, to_rgb={self.to_rgb})'
+        repr_str += f'(mean={self.mean}, std={self.std}, to_rgb={self.to_rgb}, defer={self.defer})'
         return repr_str
     
 
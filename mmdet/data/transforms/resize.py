@@ -52,7 +52,9 @@ class Resize:
     """
 
     def __init__(self,
-                 img_scale=None,     # must be tuple.
+                 img_scale=None,     # tuple or list of tuple
+                 multiscale_mode='range',
+                 ratio_range=None,
                  keep_ratio=True,
                  bbox_clip_border=True,
                  interpolation='bilinear',
@@ -62,89 +64,99 @@ class Resize:
             self.img_scale = None
         # img_scale : (width, height)
         else:
-            if isinstance(img_scale, list): 
-                self.img_scale = img_scale
+            if isinstance(img_scale[0], (list, tuple)):      # list of scales. may be tuple of lists from config
+                self.img_scale = [tuple(scale) for scale in img_scale]
             else:
-                self.img_scale = [img_scale]
+                self.img_scale = [tuple(img_scale)]
        
+        if ratio_range is not None:
+            # mode 1: given a scale and a range of image ratio
+            assert len(self.img_scale) == 1
+        else:
+            # mode 2: given multiple scales or a range of scales
+            assert multiscale_mode in ['value', 'range']
       
+        self.multiscale_mode = multiscale_mode
+        self.ratio_range = ratio_range
         self.keep_ratio = keep_ratio
         # TODO: refactor the override option in Resize
         self.interpolation = interpolation
         self.override = override
         self.bbox_clip_border = bbox_clip_border
 
-    # TODO: using this
-    # def random_select(img_scales):
-    #     """Randomly select an img_scale from given candidates.
-
-    #     Args:
-    #         img_scales (list[tuple]): Images scales for selection.
-
-    #     Returns:
-    #         (tuple, int): Returns a tuple ``(img_scale, scale_dix)``, \
-    #             where ``img_scale`` is the selected image scale and \
-    #             ``scale_idx`` is the selected index in the given candidates.
-    #     """
-
-    #     assert mmcv.is_list_of(img_scales, tuple)
-    #     scale_idx = np.random.randint(len(img_scales))
-    #     img_scale = img_scales[scale_idx]
-    #     return img_scale, scale_idx
-
-    # @staticmethod
-    # def random_sample(img_scales):
-    #     """Randomly sample an img_scale when ``multiscale_mode=='range'``.
-
-    #     Args:
-    #         img_scales (list[tuple]): Images scale range for sampling.
-    #             There must be two tuples in img_scales, which specify the lower
-    #             and upper bound of image scales.
-
-    #     Returns:
-    #         (tuple, None): Returns a tuple ``(img_scale, None)``, where \
-    #             ``img_scale`` is sampled scale and None is just a placeholder \
-    #             to be consistent with :func:`random_select`.
-    #     """
-
-    #     assert mmcv.is_list_of(img_scales, tuple) and len(img_scales) == 2
-    #     img_scale_long = [max(s) for s in img_scales]
-    #     img_scale_short = [min(s) for s in img_scales]
-    #     long_edge = np.random.randint(
-    #         min(img_scale_long),
-    #         max(img_scale_long) + 1)
-    #     short_edge = np.random.randint(
-    #         min(img_scale_short),
-    #         max(img_scale_short) + 1)
-    #     img_scale = (long_edge, short_edge)
-    #     return img_scale, None
-
-    # @staticmethod
-    # def random_sample_ratio(img_scale, ratio_range):
-    #     """Randomly sample an img_scale when ``ratio_range`` is specified.
-
-    #     A ratio will be randomly sampled from the range specified by
-    #     ``ratio_range``. Then it would be multiplied with ``img_scale`` to
-    #     generate sampled scale.
-
-    #     Args:
-    #         img_scale (tuple): Images scale base to multiply with ratio.
-    #         ratio_range (tuple[float]): The minimum and maximum ratio to scale
-    #             the ``img_scale``.
-
-    #     Returns:
-    #         (tuple, None): Returns a tuple ``(scale, None)``, where \
-    #             ``scale`` is sampled ratio multiplied with ``img_scale`` and \
-    #             None is just a placeholder to be consistent with \
-    #             :func:`random_select`.
-    #     """
-
-    #     assert isinstance(img_scale, tuple) and len(img_scale) == 2
-    #     min_ratio, max_ratio = ratio_range
-    #     assert min_ratio <= max_ratio
-    #     ratio = np.random.random_sample() * (max_ratio - min_ratio) + min_ratio
-    #     scale = int(img_scale[0] * ratio), int(img_scale[1] * ratio)
-    #     return scale, None
+    @staticmethod
+    def random_select(img_scales, rng=np.random):
+        """Randomly select an img_scale from given candidates.
+
+        Args:
+            img_scales (list[tuple]): Images scales for selection.
+            rng (numpy.random.RandomState | module): random number generator
+
+        Returns:
+            (tuple, int): Returns a tuple ``(img_scale, scale_dix)``, \
+                where ``img_scale`` is the selected image scale and \
+                ``scale_idx`` is the selected index in the given candidates.
+        """
+
+        scale_idx = rng.randint(len(img_scales))
+        img_scale = img_scales[scale_idx]
+        return img_scale, scale_idx
+
+    @staticmethod
+    def random_sample(img_scales, rng=np.random):
+        """Randomly sample an img_scale when ``multiscale_mode=='range'``.
+
+        Args:
+            img_scales (list[tuple]): Images scale range for sampling.
+                There must be two tuples in img_scales, which specify the lower
+                and upper bound of image scales.
+            rng (numpy.random.RandomState | module): random number generator
+
+        Returns:
+            (tuple, None): Returns a tuple ``(img_scale, None)``, where \
+                ``img_scale`` is sampled scale and None is just a placeholder \
+                to be consistent with :func:`random_select`.
+        """
+
+        assert len(img_scales) == 2
+        img_scale_long = [max(s) for s in img_scales]
+        img_scale_short = [min(s) for s in img_scales]
+        long_edge = rng.randint(
+            min(img_scale_long),
+            max(img_scale_long) + 1)
+        short_edge = rng.randint(
+            min(img_scale_short),
+            max(img_scale_short) + 1)
+        img_scale = (long_edge, short_edge)
+        return img_scale, None
+
+    @staticmethod
+    def random_sample_ratio(img_scale, ratio_range, rng=np.random):
+        """Randomly sample an img_scale when ``ratio_range`` is specified.
+
+        A ratio will be randomly sampled from the range specified by
+        ``ratio_range``. Then it would be multiplied with ``img_scale`` to
+        generate sampled scale.
+
+        Args:
+            img_scale (tuple): Images scale base to multiply with ratio.
+            ratio_range (tuple[float]): The minimum and maximum ratio to scale
+                the ``img_scale``.
+            rng (numpy.random.RandomState | module): random number generator
+
+        Returns:
+            (tuple, None): Returns a tuple ``(scale, None)``, where \
+                ``scale`` is sampled ratio multiplied with ``img_scale`` and \
+                None is just a placeholder to be consistent with \
+                :func:`random_select`.
+        """
+
+        assert isinstance(img_scale, tuple) and len(img_scale) == 2
+        min_ratio, max_ratio = ratio_range
+        assert min_ratio <= max_ratio
+        ratio = rng.random_sample() * (max_ratio - min_ratio) + min_ratio
+        scale = int(img_scale[0] * ratio), int(img_scale[1] * ratio)
+        return scale, None
 
     def _random_scale(self, results):
         """Randomly sample an img_scale according to ``ratio_range`` and
@@ -155,6 +167,8 @@ class Resize:
         If multiple scales are specified by ``img_scale``, a scale will be
         sampled according to ``multiscale_mode``.
         Otherwise, single scale will be used.
+        If ``results['scale_seed']`` is given(see `BatchScaleSampler`), the scale is sampled 
+        with it, so all images of a batch are resized to the same scale.
 
         Args:
             results (dict): Result dict from :obj:`dataset`.
@@ -163,9 +177,17 @@ class Resize:
             dict: Two new keys 'scale` and 'scale_idx` are added into \
                 ``results``, which would be used by subsequent pipelines.
         """
+        rng = np.random.RandomState(results['scale_seed']) if 'scale_seed' in results else np.random
      
-        if len(self.img_scale) == 1:
+        if self.ratio_range is not None:
+            scale, scale_idx = self.random_sample_ratio(
+                self.img_scale[0], self.ratio_range, rng)
+        elif len(self.img_scale) == 1:
             scale, scale_idx = self.img_scale[0], 0
+        elif self.multiscale_mode == 'range':
+            scale, scale_idx = self.random_sample(self.img_scale, rng)
+        elif self.multiscale_mode == 'value':
+            scale, scale_idx = self.random_select(self.img_scale, rng)
         else:
             raise NotImplementedError
 
@@ -282,6 +304,8 @@ class Resize:
     def __repr__(self):
         repr_str = self.__class__.__name__
         repr_str += f'(img_scale={self.img_scale}, '
+        repr_str += f'multiscale_mode={self.multiscale_mode}, '
+        repr_str += f'ratio_range={self.ratio_range}, '
         repr_str += f'keep_ratio={self.keep_ratio}, '
         repr_str += f'bbox_clip_border={self.bbox_clip_border})'
         return repr_str
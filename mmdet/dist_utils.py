@@ -0,0 +1,57 @@
+import os
+import functools
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+
+
+def init_dist(backend = 'nccl', **kwargs):
+    """Initialize the default process group.
+
+    `RANK`, `WORLD_SIZE`, `MASTER_ADDR`, `MASTER_PORT` (and `LOCAL_RANK`) must be set in
+    environment variables, as `torchrun` does.
+
+    Args:
+        backend (str): 'nccl' for GPU, 'gloo' for CPU.
+    """
+    if mp.get_start_method(allow_none=True) is None:
+        mp.set_start_method('spawn')
+
+    if backend == 'nccl':
+        rank = int(os.environ['RANK'])
+        local_rank = int(os.environ.get('LOCAL_RANK', rank % torch.cuda.device_count()))
+        torch.cuda.set_device(local_rank)
+    dist.init_process_group(backend = backend, **kwargs)
+
+
+
+def get_dist_info():
+    """
+    Returns:
+        tuple[int]: rank, world_size. (0, 1) if the process group is not initialized.
+    """
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+    return 0, 1
+
+
+
+def master_only(func):
+    """Run the decorated function only on rank 0."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rank, _ = get_dist_info()
+        if rank == 0:
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+
+def barrier():
+    """Wait until all processes reach here. do nothing if not distributed."""
+    _, world_size = get_dist_info()
+    if world_size > 1:
+        dist.barrier()
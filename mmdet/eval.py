@@ -1,12 +1,16 @@
 import numpy as np
 import math
+import atexit
 import os, os.path as osp
 import cv2
 import torch
 import warnings
 import psutil
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from sub_module.mmdet.inference import inference_detector, parse_inference_result
-from sub_module.mmdet.visualization import mask_to_polygon, draw_PR_curve, draw_to_img
+from sub_module.mmdet.visualization import mask_to_polygon, draw_PR_curve, render_result
 from sub_module.mmdet.get_info_algorithm import Get_info
 
 
@@ -14,7 +18,7 @@ def get_divided_polygon(polygon, window_num, min_num_points = 10):
     """
         divide polygon by the number of `window_num` piece by sort in x and y direction
     Args:
-        polygon (list): [[x_1, y_1], [x_2, y_2], ....]
+        polygon (list | ndarray): [[x_1, y_1], [x_2, y_2], ....]
         window_num (int): 
     
     Return 
@@ -22,31 +26,61 @@ def get_divided_polygon(polygon, window_num, min_num_points = 10):
             len(x_lt_rb_list) == `window_num`
             x_lt_rb_list[0]: [x_min, y_min, x_max, y_max]
     """
-    if isinstance(polygon, np.ndarray): polygon = polygon.tolist()
+    return get_divided_polygons([polygon], window_num, min_num_points)[0]
 
-    # return None if number of points of polygon less than `min_num_points` 
-    if len(polygon) < min_num_points: return None    
-    # return None if (number of points of polygon//window_num) less than `min_num_points`   
-    if len(polygon) // window_num < min_num_points : return None
+
+def get_divided_polygons(polygons, window_num, min_num_points = 10):
+    """`get_divided_polygon` for a batch of polygons.
+
+    Points of all polygons are packed into one flat array with offsets. 
+    Points of each polygon are sorted by x and y (stable, same as `list.sort`),
+    and the boxes of all windows are computed by `reduceat` at once.
     
-    piece_point = int(len(polygon)/window_num)
-  
-    polygon_xsort = polygon.copy()
-    polygon_xsort.sort(key=lambda x: x[0])      # sort points by x coordinates
-    polygon_ysort = polygon.copy()
-    polygon_ysort.sort(key=lambda x: x[1])      # sort points by y coordinates
+    Args:
+        polygons (list): list of polygons. polygon: [[x_1, y_1], [x_2, y_2], ....]
+        window_num (int): 
+    
+    Return
+        list: `[x_lt_rb_list, y_lt_rb_list]` of each polygon, 
+            None if the number of points of polygon is too small.
+    """
+    results = [None for _ in polygons]
     
+    valid_idx, valid_pols = [], []
+    for i, polygon in enumerate(polygons):
+        num_points = len(polygon)
+        # skip if number of points of polygon less than `min_num_points` 
+        # or (number of points of polygon//window_num) less than `min_num_points`   
+        if num_points < min_num_points or num_points // window_num < min_num_points: continue
+        valid_idx.append(i)
+        valid_pols.append(np.asarray(polygon).reshape(-1, 2))
+    if len(valid_pols) == 0: return results
     
-    xsort_div_pol = divide_polygon(polygon_xsort, window_num, piece_point)
-    ysort_div_pol = divide_polygon(polygon_ysort, window_num, piece_point)
-
-    x_lt_rb_list, y_lt_rb_list = [], []
-    for x_pol, y_pol in zip(xsort_div_pol, ysort_div_pol):
-        x_lt_rb_list.append(get_box_from_pol(x_pol))        
-        y_lt_rb_list.append(get_box_from_pol(y_pol))
+    lengths = np.array([len(polygon) for polygon in valid_pols])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    points = np.concatenate(valid_pols)             # [total points, 2]
     
+    # start index of each window. the last window includes the remainder points
+    piece_point = lengths // window_num
+    starts = (offsets[:, None] + np.arange(window_num)[None, :] * piece_point[:, None]).reshape(-1)
     
-    return [x_lt_rb_list, y_lt_rb_list]
+    boxes = []
+    for axis in [0, 1]:
+        # sort points by x(or y) coordinates in each polygon. 
+        # sorting each polygon is faster than `lexsort` of all points with polygon ids
+        order = np.concatenate([offset + np.argsort(polygon[:, axis], kind = 'stable')
+                                for offset, polygon in zip(offsets, valid_pols)])
+        sorted_points = points[order]
+        box = np.concatenate([np.minimum.reduceat(sorted_points, starts, axis = 0),
+                              np.maximum.reduceat(sorted_points, starts, axis = 0)], axis = 1)
+        # same initial value as `get_box_from_pol`
+        box[:, :2] = np.minimum(box[:, :2], 100000)
+        box[:, 2:] = np.maximum(box[:, 2:], -1)
+        boxes.append(box.reshape(len(valid_pols), window_num, 4).tolist())
+    
+    for i, x_lt_rb_list, y_lt_rb_list in zip(valid_idx, *boxes):
+        results[i] = [x_lt_rb_list, y_lt_rb_list]
+    return results
     
     
  
@@ -99,8 +133,198 @@ def get_box_from_pol(polygon):
     return [x_min, y_min, x_max, y_max]
         
 
+_render_pool = None      # process pool for rendering and saving result images, kept between validations
+_render_pool_workers = 0  # number of workers of `_render_pool`
+
+def get_render_pool(num_workers):
+    """Process pool to render and save result images. It is kept between validations, 
+    and shut down at exit of the interpreter.
+
+    Workers are started by 'spawn', so they do not inherit CUDA context of the training process.
+    'spawn' imports the `__main__` module of the caller again in each worker, so the training script 
+    must run training under `if __name__ == '__main__':`. Otherwise set `num_render_workers = 0`.
+    """
+    global _render_pool, _render_pool_workers
+    if _render_pool is None or _render_pool_workers != num_workers:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait = True)      # images of the last validation are saved
+        _render_pool = ProcessPoolExecutor(max_workers = num_workers, 
+                                           mp_context = mp.get_context('spawn'))
+        _render_pool_workers = num_workers
+    return _render_pool
+
+
+def shutdown_render_pool(wait = True):
+    """Shut down the pool of `get_render_pool`. If `wait`, wait until pending images are saved."""
+    global _render_pool, _render_pool_workers
+    if _render_pool is not None:
+        _render_pool.shutdown(wait = wait)
+    _render_pool, _render_pool_workers = None, 0
+
+atexit.register(shutdown_render_pool)
+
+
+def _check_render_error(future):
+    if future.exception() is not None:
+        warnings.warn(f"Failed to save result image: {future.exception()}")
+
+
 def get_distance(point_1, point_2):
     return math.sqrt(math.pow(point_1[0] - point_2[0], 2) + math.pow(point_1[1] - point_2[1], 2))
+
+
+BOARD_RECORD_DTYPE = np.dtype([('key', np.int64),           # id of (type, main_text, sub_text)
+                               ('center', np.float64, (2, )),
+                               ('width', np.float64),
+                               ('height', np.float64)])
+
+
+def get_board_records(board_list, key_table):
+    """Convert boards from `Get_info.get_board_info` to a structured array.
+
+    Args:
+        board_list (list[dict]): 
+        key_table (dict): maps (type, main_text, sub_text) to int id. 
+            new texts are added, so the same table must be shared by all compared records.
+    Returns:
+        ndarray: structured array with `BOARD_RECORD_DTYPE`
+    """
+    records = np.zeros(len(board_list), dtype = BOARD_RECORD_DTYPE)
+    for i, board in enumerate(board_list):
+        text_key = (board['type'], tuple(board['main_text']), tuple(board['sub_text']))
+        records[i] = (key_table.setdefault(text_key, len(key_table)), board['board_center_p'], 
+                      board['width'], board['height'])
+    return records
+
+
+def count_board_matchs(records_gt, records_infer, distance_thr_rate = 0.1):
+    """Count pairs of boards that have the same texts and close enough center points.
+
+    Join on `key`, then test the distance between center points of all joined pairs at once.
+    Every pair is counted, same as comparing each gt board with each inferred board.
+    """
+    if len(records_gt) == 0 or len(records_infer) == 0: return 0
+    
+    order = np.argsort(records_infer['key'], kind = 'stable')
+    infer_keys = records_infer['key'][order]
+    lo = np.searchsorted(infer_keys, records_gt['key'], side = 'left')
+    num_pairs = np.searchsorted(infer_keys, records_gt['key'], side = 'right') - lo
+    if num_pairs.sum() == 0: return 0
+    
+    # index pairs of joined records
+    gt_idx = np.repeat(np.arange(len(records_gt)), num_pairs)
+    pair_offset = np.arange(num_pairs.sum()) - np.repeat(np.cumsum(num_pairs) - num_pairs, num_pairs)
+    infer_idx = order[np.repeat(lo, num_pairs) + pair_offset]
+    
+    # An inference can be considered correct 
+    # when the distance between the center points of the two boards is sufficiently close.
+    gt = records_gt[gt_idx]
+    length_btw_board = np.hypot(*(gt['center'] - records_infer['center'][infer_idx]).T)
+    matchs = (length_btw_board < gt['width'] * distance_thr_rate) & \
+             (length_btw_board < gt['height'] * distance_thr_rate*2)
+    return int(matchs.sum())
+
+
+def compute_iou_matrix(boxes1, boxes2, aligned = False):
+    """IoU between boxes. same as `compute_iou` in `Evaluate.get_num_pred_truth`
+
+    Args:
+        boxes1 (ndarray): [n, 4], [x_min, y_min, x_max, y_max]
+        boxes2 (ndarray): [m, 4]
+        aligned (bool): If True, compute IoU between boxes1[i] and boxes2[i] (n == m)
+
+    Returns:
+        ndarray: [n, m], or [n] if `aligned`
+    """
+    boxes1 = np.asarray(boxes1, dtype = np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype = np.float64).reshape(-1, 4)
+    if not aligned:
+        boxes1, boxes2 = boxes1[:, None, :], boxes2[None, :, :]
+    
+    area1 = (boxes1[..., 2] - boxes1[..., 0]) * (boxes1[..., 3] - boxes1[..., 1])
+    area2 = (boxes2[..., 2] - boxes2[..., 0]) * (boxes2[..., 3] - boxes2[..., 1])
+    w = np.maximum(0, np.minimum(boxes1[..., 2], boxes2[..., 2]) - np.maximum(boxes1[..., 0], boxes2[..., 0]))
+    h = np.maximum(0, np.minimum(boxes1[..., 3], boxes2[..., 3]) - np.maximum(boxes1[..., 1], boxes2[..., 1]))
+    inter = w * h
+    outer = area1 + area2 - inter
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(outer == 0, 1.0, inter / outer)
+
+
+def match_detections(iou, det_labels, gt_labels, iou_threshold, valid = None):
+    """Greedy matching of detections to ground truths in one image. 
+
+    Detections must be sorted by score in descending order.
+    Each detection is matched to the unmatched ground truth of the same label with the highest IoU.
+
+    Args:
+        iou (ndarray): [num_det, num_gt]
+        det_labels (ndarray): [num_det]
+        gt_labels (ndarray): [num_gt]
+        iou_threshold (float): 
+        valid (ndarray, optional): [num_det, num_gt] bool, additional condition of matching
+
+    Returns:
+        ndarray: [num_det] bool, whether each detection is true positive
+    """
+    num_det, num_gt = iou.shape
+    tp = np.zeros(num_det, dtype = bool)
+    if num_det == 0 or num_gt == 0: return tp
+    
+    candidate = (iou >= iou_threshold) & (det_labels[:, None] == gt_labels[None, :])
+    if valid is not None: candidate &= valid
+    iou = np.where(candidate, iou, -1)
+    
+    matched_gt = np.zeros(num_gt, dtype = bool)
+    for det_i in np.nonzero(candidate.any(axis = 1))[0]:
+        gt_iou = np.where(matched_gt, -1, iou[det_i])
+        gt_i = gt_iou.argmax()
+        if gt_iou[gt_i] < 0: continue
+        matched_gt[gt_i] = tp[det_i] = True
+    return tp
+
+
+def average_precision(scores, tp, num_gt, mode = 'coco'):
+    """Exact interpolated average precision of one class.
+
+    Detections of all images are sorted by score once, 
+    and precision, recall are computed by cumulative sum of TP and FP.
+
+    Args:
+        scores (ndarray): [num_det] 
+        tp (ndarray): [num_det] bool
+        num_gt (int): number of ground truth
+        mode (str): 'coco': 101 recall points interpolation
+                    'area': area under the interpolated precision-recall curve (all points)
+
+    Returns:
+        tuple: ap, precision [num_det], recall [num_det], scores [num_det](sorted)
+    """
+    if mode not in ['coco', 'area']:
+        raise ValueError(f"mode must be one of 'coco' and 'area', but got {mode}")
+    order = np.argsort(-np.asarray(scores), kind = 'mergesort')
+    scores = np.asarray(scores)[order]
+    tp = np.asarray(tp, dtype = np.float64)[order]
+    
+    tp_cum = np.cumsum(tp)
+    fp_cum = np.cumsum(1 - tp)
+    recall = tp_cum / max(num_gt, 1)
+    precision = tp_cum / np.maximum(tp_cum + fp_cum, np.finfo(np.float64).eps)
+    if len(tp) == 0 or num_gt == 0: 
+        return 0., precision, recall, scores
+    
+    # interpolated precision: max precision at recall >= r
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    if mode == 'area':
+        ap = np.sum(np.diff(np.concatenate([[0], recall])) * envelope)
+    else:
+        recall_thrs = np.linspace(0, 1, 101)
+        inds = np.searchsorted(recall, recall_thrs, side = 'left')
+        interpolated = np.zeros(len(recall_thrs))
+        exist = inds < len(recall)
+        interpolated[exist] = envelope[inds[exist]]
+        ap = interpolated.mean()
+    return float(ap), precision, recall, scores
                 
 
 class Evaluate():
@@ -114,9 +338,24 @@ class Evaluate():
         self.output_path = output_path
         self.plot_dir = "plots"
         self.img_result_dir = "images"
+        
+        # 'threshold': sweep score thresholds and compute area of PR curve
+        # 'coco': match detections sorted by score and compute exact interpolated AP
+        # 'both': report both side by side
+        self.ap_engine = self.cfg.get('ap_engine', 'both')
+        if self.ap_engine not in ['threshold', 'coco', 'both']:
+            raise ValueError(f"ap_engine must be one of 'threshold', 'coco' and 'both', but got {self.ap_engine}")
+        self.ap_mode = self.cfg.get('ap_mode', 'coco')
+        self.detections = {class_name: dict(scores = [], tp = [], dv_tp = []) for class_name in self.classes}
+        self.num_gts = {class_name: 0 for class_name in self.classes}
+        
+        # for EIR: boards of gt and inference are matched by id of their texts
+        self.board_key_table = dict()
+        self.total_matchs_count = self.total_num_board_gt = 0
 
-        self.set_treshold()
-        self.create_confusion_matrix()
+        if self.ap_engine != 'coco':
+            self.set_treshold()
+            self.create_confusion_matrix()
     
     def check_memory_usage(self):
         memory_usage = psutil.virtual_memory().percent
@@ -423,9 +662,16 @@ class Evaluate():
             
                 
 
-    def get_mAP(self):  
+    def get_mAP(self, compare_board = False, save_result = False):  
+        """
+        Args:
+            compare_board (bool): compute EIR in the same inference pass. added to summary as 'EIR'
+            save_result (bool): draw inference results on images and save them in the same inference pass
+        """
         model = self.model
         dataloader = self.dataloader
+        if save_result and not self.start_render():
+            save_result = False
         for i, val_data_batch in enumerate(dataloader):    
             if not self.check_memory_usage(): return None
                  
@@ -448,28 +694,28 @@ class Evaluate():
             for ground_truths, results, file_path in zip(batch_gts, batch_results, batch_filepath):
                 infer_bboxes, infer_labels, infer_masks = parse_inference_result(results) 
                 gt_bboxes, gt_labels, gt_masks = ground_truths
+                if save_result and infer_masks is not None:
+                    self.save_result_img(file_path, infer_bboxes, infer_labels, infer_masks)
+                if compare_board:
+                    self.accumulate_board_info(infer_bboxes, infer_labels, infer_masks, 
+                                               gt_bboxes, gt_labels, filepath = file_path)
+                
                 if infer_masks is not None:
                     show_score_thr = self.cfg.get('show_score_thr', 0)
                 
                     assert infer_bboxes is not None and infer_bboxes.shape[1] == 5
-                    scores = infer_bboxes[:, -1]
-                    if show_score_thr > 0:
-                        inds = scores > show_score_thr
-                    else:
-                        inds = scores > 0.5
-                    infer_bboxes = infer_bboxes[inds, :]
-                    infer_labels = infer_labels[inds]
-                    if infer_masks is not None:
-                        infer_masks = infer_masks[inds, ...]
-                    
                     infer_scores = infer_bboxes[:, -1]      # [num_instance]
                     infer_bboxes = infer_bboxes[:, :4]      # [num_instance, [x_min, y_min, x_max, y_max]]
-
                     infer_polygons = mask_to_polygon(infer_masks)
                     gt_polygons = mask_to_polygon(gt_masks.masks)
+                    
+                    # the threshold sweep only counts detections over the display threshold
+                    inds = np.nonzero(infer_scores > (show_score_thr if show_score_thr > 0 else 0.5))[0]
                 else:   # detected nothing
                     infer_scores = infer_bboxes = infer_polygons = gt_polygons = []
+                    inds = []
                     
+                # all detections: the PR curve of exact AP is not truncated at the display threshold
                 infer_dict = dict(bboxes = infer_bboxes,
                                   polygons = infer_polygons,
                                   labels = infer_labels,
@@ -478,10 +724,104 @@ class Evaluate():
                                polygons = gt_polygons,
                                labels = gt_labels)
                 
-                self.get_num_pred_truth(gt_dict, infer_dict, num_window = self.cfg.num_window, img = cv2.imread(file_path))
+                if self.ap_engine != 'threshold':
+                    self.accumulate_detections(gt_dict, infer_dict, num_window = self.cfg.num_window)
+                if self.ap_engine != 'coco':
+                    shown_infer_dict = infer_dict
+                    if len(inds) < len(infer_scores):
+                        shown_infer_dict = dict(bboxes = infer_bboxes[inds],
+                                                polygons = [infer_polygons[i] for i in inds],
+                                                labels = infer_labels[inds],
+                                                score = infer_scores[inds])
+                    self.get_num_pred_truth(gt_dict, shown_infer_dict, num_window = self.cfg.num_window, img = cv2.imread(file_path))
+        
+        if self.ap_engine == 'coco':
+            summary_dict = self.compute_exact_mAP()
+        else:
+            self.compute_precision_recall()
+            summary_dict = self.compute_mAP()
+            if self.ap_engine == 'both':
+                exact_summary = self.compute_exact_mAP()
+                summary_dict['coco'] = exact_summary['normal']
+                summary_dict['dv_coco'] = exact_summary['dv']
+        
+        if compare_board:
+            summary_dict['EIR'] = self.compute_EIR()
+        return summary_dict
+    
+    
+    def accumulate_detections(self, gt_dict, infer_dict, num_window = 3):
+        """Match detections of one image to ground truths, and record scores and TP of each class.
+
+        Matching by divided polygons(dv) requires IoU of every window of divided polygon 
+        to be over `iou_threshold` as well as IoU of bbox.
+        """
+        gt_labels = np.asarray(gt_dict['labels'], dtype = np.int64).reshape(-1)
+        for gt_label in gt_labels:
+            self.num_gts[self.classes[gt_label]] +=1
+        
+        scores = np.asarray(infer_dict['score'], dtype = np.float64).reshape(-1)
+        if len(scores) == 0: return
+        det_labels = np.asarray(infer_dict['labels'], dtype = np.int64).reshape(-1)
+        order = np.argsort(-scores, kind = 'mergesort')
+        
+        iou = compute_iou_matrix(np.asarray(infer_dict['bboxes'])[order], gt_dict['bboxes'])
+        tp = match_detections(iou, det_labels[order], gt_labels, self.iou_threshold)
+        
+        # condition of divided polygons, only for pairs that can be matched by bbox
+        dv_valid = np.zeros(iou.shape, dtype = bool)
+        pairs = np.nonzero((iou >= self.iou_threshold) & (det_labels[order][:, None] == gt_labels[None, :]))
+        if len(pairs[0]) > 0:
+            inf_dv_bbox_lists = get_divided_polygons([infer_dict['polygons'][i] for i in order], num_window)
+            gt_dv_bbox_lists = get_divided_polygons(gt_dict['polygons'], num_window)
+            for inf_i, gt_i in zip(*pairs):
+                inf_dv_bbox_list, gt_dv_bbox_list = inf_dv_bbox_lists[inf_i], gt_dv_bbox_lists[gt_i]
+                if inf_dv_bbox_list is None or gt_dv_bbox_list is None: continue
+                window_iou = compute_iou_matrix(np.asarray(inf_dv_bbox_list).reshape(-1, 4),
+                                                np.asarray(gt_dv_bbox_list).reshape(-1, 4), aligned = True)
+                dv_valid[inf_i, gt_i] = (window_iou >= self.iou_threshold).all()
+        dv_tp = match_detections(iou, det_labels[order], gt_labels, self.iou_threshold, valid = dv_valid)
+        
+        for det_i, det_label in enumerate(det_labels[order]):
+            detection = self.detections[self.classes[det_label]]
+            detection['scores'].append(scores[order][det_i])
+            detection['tp'].append(tp[det_i])
+            detection['dv_tp'].append(dv_tp[det_i])
+    
+    
+    def compute_exact_mAP(self):
+        """AP of each class computed from the detections accumulated by `accumulate_detections`.
+
+        Returns: 
+            dict: same format as `compute_mAP`
+        """
+        summary_dict = dict(normal = dict(), dv = dict())
+        PR_curve_values = dict()
+        for class_name, detection in self.detections.items():
+            num_gt = self.num_gts[class_name]
+            # if number of ground truth is 0, continue
+            if num_gt == 0: continue
+            
+            ap, precision, recall, scores = average_precision(detection['scores'], detection['tp'], num_gt, self.ap_mode)
+            dv_ap, dv_precision, dv_recall, _ = average_precision(detection['scores'], detection['dv_tp'], num_gt, self.ap_mode)
+            summary_dict['normal'][f'{class_name} AP'] = round(ap, 4)
+            summary_dict['dv'][f'{class_name} AP'] = round(dv_ap, 4)
+            
+            PR_curve_values[class_name] = dict(PR_list = list(zip(scores, precision, recall)),
+                                               dv_PR_list = list(zip(scores, dv_precision, dv_recall)),
+                                               ap_area = round(ap, 4),
+                                               dv_ap_area = round(dv_ap, 4))
+        
+        for key in ['normal', 'dv']:
+            class_ap = list(summary_dict[key].values())
+            summary_dict[key]['mAP'] = round(sum(class_ap) / len(class_ap), 4) if len(class_ap) > 0 else 0.
+        
+        if self.ap_engine == 'coco' and (self.cfg.get('save_plot', False)) and (self.output_path is not None):
+            self.PR_curve_values = PR_curve_values
+            plot_dir = osp.join(self.output_path, self.plot_dir)
+            os.makedirs(plot_dir, exist_ok = True)
+            self.save_PR_curve(plot_dir)
         
-        self.compute_precision_recall()
-        summary_dict = self.compute_mAP()
         return summary_dict
     
 
@@ -520,6 +860,9 @@ class Evaluate():
         
         inf_bboxes = infer_dict['bboxes']                 
         gt_bboxes = gt_dict['bboxes']
+        # divided polygons are computed once for all pairs and score thresholds
+        inf_dv_bbox_lists = get_divided_polygons(infer_dict['polygons'], num_window)
+        gt_dv_bbox_lists = get_divided_polygons(gt_dict['polygons'], num_window)
         for score_thrs_idx, score_threshold in enumerate(self.score_threshold):
             for inf_i, inf_bbox in enumerate(inf_bboxes):
                 inf_object_name = self.classes[infer_dict['labels'][inf_i]]
@@ -547,10 +890,8 @@ class Evaluate():
 
                     ## Compute iou using divided polygon into slices. 
                     # polygons : [[x_1, y_1], [x_2, y_2], ..., [x_n, y_n]]
-                    inf_polygons, gt_polygons = infer_dict['polygons'][inf_i], gt_dict['polygons'][gt_i]
-
-                    gt_dv_bbox_list = get_divided_polygon(gt_polygons, num_window)
-                    inf_dv_bbox_list = get_divided_polygon(inf_polygons, num_window)
+                    gt_dv_bbox_list = gt_dv_bbox_lists[gt_i]
+                    inf_dv_bbox_list = inf_dv_bbox_lists[inf_i]
                     if gt_dv_bbox_list is None or inf_dv_bbox_list is None:
                         continue    # Cannot be divided polygon cause the number of points is too small.          
                     
@@ -576,18 +917,67 @@ class Evaluate():
         self.confusion_matrix = confusion_matrix
 
 
-    def run_inference(self, compare_board):
+    def start_render(self):
+        """Prepare saving result images. 
+        
+        Result images are drawn and saved by worker processes while inference continues.
+        Workers import `__main__` of the caller again. See `get_render_pool`.
+        Returns:
+            bool: False if `output_path` is None
+        """
         # If self.output_path is None then the directory does not yet exist.
-        if self.output_path is not None:
-            img_result_dir = osp.join(self.output_path, self.img_result_dir)
-            os.makedirs(img_result_dir, exist_ok = True)
-        else: 
+        if self.output_path is None:
             print(f"Attributes: output_path is None")
-            return None
+            return False
+        
+        self.img_result_path = osp.join(self.output_path, self.img_result_dir)
+        os.makedirs(self.img_result_path, exist_ok = True)
+        if getattr(self, 'render_in_flight', None):
+            self.wait_render()      # images of the last pass are still being saved
+        
+        # 0: draw and save in this process
+        num_render_workers = self.cfg.get('num_render_workers', 2)
+        self.render_pool = get_render_pool(num_render_workers) if num_render_workers > 0 else None
+        self.max_render_in_flight = self.cfg.get('max_render_in_flight', num_render_workers * 4)      # bound memory of pending results
+        self.render_in_flight = deque()
+        return True
+    
+    
+    def save_result_img(self, filepath, bboxes, labels, masks):
+        # Save the image with the inference result drawn
+        # send polygons instead of masks to workers
+        score_thr = self.cfg.get('show_score_thr', 0.5)
+        inds = bboxes[:, -1] > score_thr if score_thr > 0 else np.ones(len(bboxes), dtype = bool)
+        render_cfg = dict(filepath = filepath,
+                          out_file = osp.join(self.img_result_path, osp.basename(filepath)),
+                          bboxes = bboxes[inds],
+                          labels = labels[inds],
+                          polygons = mask_to_polygon(masks[inds]),
+                          class_names = list(self.classes))
+        if self.render_pool is None:
+            render_result(**render_cfg)       # Draw bbox, seg, label and save drawn_img
+        else:
+            while len(self.render_in_flight) >= self.max_render_in_flight:
+                self.render_in_flight.popleft().exception()      # wait for the oldest one. errors are reported by callback
+            future = self.render_pool.submit(render_result, **render_cfg)
+            future.add_done_callback(_check_render_error)
+            self.render_in_flight.append(future)
+    
+    
+    def wait_render(self):
+        while len(self.render_in_flight) > 0:
+            self.render_in_flight.popleft().exception()
+    
+    
+    def run_inference(self, compare_board):
+        """Save result images, and compute EIR if `compare_board`.
+        
+        `get_mAP(compare_board = True, save_result = True)` does the same in the inference pass of mAP.
+        """
+        if not self.start_render(): return None
 
         dataloader = self.dataloader
         model = self.model
-        total_matchs_count = total_num_board_gt = 0
         for i, val_data_batch in enumerate(dataloader):
             if not self.check_memory_usage(): return None
             
@@ -595,16 +985,6 @@ class Evaluate():
             batch_gt_bboxes = val_data_batch['gt_bboxes'].data[0]
             batch_gt_labels = val_data_batch['gt_labels'].data[0]
             
-            batch_gts = []
-            for gt_bboxes, gt_labels in zip(batch_gt_bboxes, batch_gt_labels):
-                # append score
-                gt_bboxes_scores = []
-                for gt_bboxe in gt_bboxes.tolist():
-                    gt_bboxe.append(100.)
-                    gt_bboxes_scores.append(gt_bboxe)
-                
-                batch_gts.append((np.array(gt_bboxes_scores), gt_labels.numpy()))
-            
             batch_filepath = []
             for img_meta in val_data_batch['img_metas'].data[0]:
                 batch_filepath.append(img_meta['file_path'])
@@ -615,50 +995,58 @@ class Evaluate():
                                               imgs_path = batch_filepath)
                 batch_results = inference_detector(**inference_detector_cfg)  
 
-            no_mask = False
-            for filepath, results, ground_truths in zip(batch_filepath, batch_results, batch_gts):
+            for filepath, results, gt_bboxes, gt_labels in zip(batch_filepath, batch_results, 
+                                                               batch_gt_bboxes, batch_gt_labels):
                 bboxes, labels, masks = parse_inference_result(results) 
+                if masks is not None:       # When nothing is detected, nothing to draw
+                    self.save_result_img(filepath, bboxes, labels, masks)
 
-                if masks is None: 
-                    no_mask = True
-                    continue      # When nothing is detected: continue
-
-                # Save the image with the inference result drawn
-                img = cv2.imread(filepath)
-                draw_cfg = dict(img = img,
-                                bboxes = bboxes,
-                                labels = labels,
-                                masks = masks,
-                                class_names = self.classes.copy(),
-                                score_thr = self.cfg.get('show_score_thr', 0.5))
-                img = draw_to_img(**draw_cfg)       # Draw bbox, seg, label and save drawn_img
-
-                out_file = osp.join(img_result_dir, osp.basename(filepath))
-                cv2.imwrite(out_file, img) 
-
-                # Compute the ratio of how accurately the board's information was inferred 
-                # by comparing the ground truth and the inference results.
                 if compare_board: 
-                    bboxes_gt, labels_gt = ground_truths 
-                    matchs_count, num_board_gt = self.compare_board_info(bboxes, labels, bboxes_gt, labels_gt, 
-                                                                     filepath = filepath)
-                    total_matchs_count += matchs_count
-                    total_num_board_gt += num_board_gt
+                    self.accumulate_board_info(bboxes, labels, masks, gt_bboxes, gt_labels, 
+                                               filepath = filepath)
+        # images are still saved by workers while training is resumed
         
         if not compare_board: return None
-
-        if no_mask:
+        return self.compute_EIR()
+    
+    
+    def accumulate_board_info(self, bboxes_infer, labels_infer, masks_infer, bboxes_gt, labels_gt, filepath = None):
+        """Compare boards of an image and accumulate the count for EIR.
+        
+        When nothing is detected(`masks_infer` is None), all boards of the image are counted as missed.
+        """
+        if masks_infer is None: 
+            bboxes_infer = labels_infer = None
+        
+        # append score
+        bboxes_gt = bboxes_gt.numpy() if isinstance(bboxes_gt, torch.Tensor) else np.asarray(bboxes_gt)
+        bboxes_gt = np.concatenate([bboxes_gt, np.full((len(bboxes_gt), 1), 100.)], axis = 1)
+        labels_gt = labels_gt.numpy() if isinstance(labels_gt, torch.Tensor) else np.asarray(labels_gt)
+        
+        # Compute the ratio of how accurately the board's information was inferred 
+        # by comparing the ground truth and the inference results.
+        matchs_count, num_board_gt = self.compare_board_info(bboxes_infer, labels_infer, bboxes_gt, labels_gt, 
+                                                             filepath = filepath)
+        self.total_matchs_count += matchs_count
+        self.total_num_board_gt += num_board_gt
+    
+    
+    def compute_EIR(self):
+        if self.total_num_board_gt == 0:
             return 0.0
-        return total_matchs_count/total_num_board_gt
+        return self.total_matchs_count/self.total_num_board_gt
 
 
     
     def compare_board_info(self, bboxes_infer, labels_infer, bboxes_gt, labels_gt, 
                            distance_thr_rate = 0.1, filepath = None):    
-        get_info_infer = Get_info(bboxes_infer, labels_infer,
-                                  self.classes.copy(),
-                                  score_thr = self.cfg.get('show_score_thr', 0.5))
-        license_board_infer_list = get_info_infer.get_board_info()
+        if bboxes_infer is None:        # nothing is detected
+            license_board_infer_list = []
+        else:
+            get_info_infer = Get_info(bboxes_infer, labels_infer,
+                                      self.classes.copy(),
+                                      score_thr = self.cfg.get('show_score_thr', 0.5))
+            license_board_infer_list = get_info_infer.get_board_info()
         
         get_info_gt = Get_info(bboxes_gt, labels_gt,
                                self.classes.copy(), 
@@ -673,25 +1061,8 @@ class Evaluate():
               
         if len(license_board_infer_list) == 0: return 0.0, num_board_gt
      
-        matchs_count = 0
-        for info_gt in license_board_gt_list:
-            board_center_p_gt = info_gt.pop('board_center_p')
-            board_width_p_gt = info_gt.pop('width')
-            board_height_p_gt = info_gt.pop('height')
-            for info_infer in license_board_infer_list:
-                info_infer_ = info_infer.copy()
-                board_center_p_infer = info_infer_.pop('board_center_p')
-                board_width_p_infer = info_infer_.pop('width')
-                board_height_p_infer = info_infer_.pop('height')
-
-                if info_gt == info_infer_ :
-                    # An inference can be considered correct 
-                    # when the distance between the center points of the two boards is sufficiently close.
-                    length_btw_board = get_distance(board_center_p_gt, board_center_p_infer) 
-                    if length_btw_board < board_width_p_gt * distance_thr_rate and \
-                       length_btw_board < board_height_p_gt * distance_thr_rate*2:
-                       matchs_count+=1
+        records_gt = get_board_records(license_board_gt_list, self.board_key_table)
+        records_infer = get_board_records(license_board_infer_list, self.board_key_table)
+        matchs_count = count_board_matchs(records_gt, records_infer, distance_thr_rate = distance_thr_rate)
         
         return matchs_count, num_board_gt
-
-                
\ No newline at end of file
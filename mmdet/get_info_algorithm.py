@@ -1,5 +1,9 @@
+import time
+import numpy as np
+import torch
+
 from sub_module.mmdet.visualization import mask_to_polygon
-from sub_module.mmdet.inference import parse_inference_result
+from sub_module.mmdet.inference import inference_detector, parse_inference_result
 
 class Get_info():
     def __init__(self, 
@@ -40,15 +44,16 @@ class Get_info():
         scores = bboxes[:, -1]      # [num_instance]
         bboxes = bboxes[:, :4]      # [num_instance, [x_min, y_min, x_max, y_max]]
         
-        for bbox, label in zip (bboxes, labels):
-            bbox_int = []
-            for ele in bbox:
-                bbox_int.append(int(ele))
-
-            self.bboxes_list.append(bbox_int)
-            self.labels_list.append(self.classes[label])
-
-    def get_board_info(self, check =False):
+        # same as int() of each element: truncate toward zero
+        self.bboxes_list = np.asarray(bboxes).astype(np.int64).tolist()
+        self.scores_list = np.asarray(scores).tolist()
+        self.labels_list = [self.classes[label] for label in labels]
+
+    def get_board_info(self, check =False, with_box = False):
+        """
+        Args:
+            with_box (bool): add `box` ([x_min, y_min, x_max, y_max]) and `confidence` of each board
+        """
         board_type = ['r_board', 'l_board']
         number_box = ['r_m_n', 'r_s_n', 'l_m_n', 'l_s_n']
 
@@ -63,65 +68,94 @@ class Get_info():
             else:
                 text_idx_list.append(i)
 
-        return self.get_numberboard_info(board_idx_list, number_box_idx_list, text_idx_list, check = False)
+        return self.get_numberboard_info(board_idx_list, number_box_idx_list, text_idx_list, check = False, with_box = with_box)
 
 
-    def get_numberboard_info(self, board_idx_list, number_box_idx_list, text_idx_list, check = False):   
+    def get_numberboard_info(self, board_idx_list, number_box_idx_list, text_idx_list, check = False, with_box = False):   
         # `check` is for checking gt data
+        bboxes = np.asarray(self.bboxes_list, dtype = np.int64).reshape(-1, 4)
+        centers = self.compute_center_points(bboxes)
+        
+        # containment of all pairs at once. [num_board, num_number_box], [num_number_box, num_text]
+        number_box_in_board = self.check_in_bboxes(bboxes[board_idx_list], centers[number_box_idx_list])
+        text_in_number_box = self.check_in_bboxes(bboxes[number_box_idx_list], centers[text_idx_list])
+        
+        # text list of each number box, sorted by x center (stable, same as `list.sort`)
+        text_lists = []
+        text_idx_array = np.asarray(text_idx_list, dtype = np.int64)
+        for n_i in range(len(number_box_idx_list)):
+            inner_text_idx = text_idx_array[text_in_number_box[n_i]]
+            inner_text_idx = inner_text_idx[np.argsort(centers[inner_text_idx, 0], kind = 'stable')]
+            text_lists.append([[self.bboxes_list[text_idx], self.labels_list[text_idx], int(centers[text_idx, 0])]
+                               for text_idx in inner_text_idx])
+        
         number_board_list = []
-        for board_idx in board_idx_list:
+        for b_i, board_idx in enumerate(board_idx_list):
             board_bbox = self.bboxes_list[board_idx]
             board_dict = dict(type = self.labels_list[board_idx],
                               board_center_p = self.compute_center_point(board_bbox),
                               width = self.compute_width_height(board_bbox)[0],
                               height = self.compute_width_height(board_bbox)[1])
+            if with_box:
+                board_dict['box'] = board_bbox
+                board_dict['confidence'] = self.scores_list[board_idx]
 
-            for number_box_idx in number_box_idx_list:
-                number_box_bbox = self.bboxes_list[number_box_idx]
-        
-                if self.check_in_bbox(board_bbox, number_box_bbox):
-                    
-                    text_list = []
-                    for text_idx in text_idx_list:
-                        text_bbox = self.bboxes_list[text_idx]
-                        # Check if text is located inside the number_box_bbox
-                        if self.check_in_bbox(number_box_bbox, text_bbox):
-                            x_center, _ = self.compute_center_point(text_bbox)
-                            text_list.append([text_bbox, self.labels_list[text_idx], x_center])
-
-                    if self.labels_list[number_box_idx] in ['l_s_n', 'r_s_n']:     
-                        text_list.sort(key =lambda x: x[-1])
-                        if check:
-                            print(f"check sub_text")
-                            for text in text_list:
-                                print(f"{text}")
-
-                        if len(text_list) !=3: continue  
-                        if text_list[-1][1].isdigit(): continue
-                        
-                        board_dict['sub_text'] = [i[1] for i in text_list]
-
-                    elif self.labels_list[number_box_idx] in ['l_m_n', 'r_m_n']:
-                        text_list.sort(key =lambda x: x[-1])
-                        if check:
-                            print(f"check main_text")
-                            for text in text_list:
-                                print(f"{text}")
+            for n_i in np.nonzero(number_box_in_board[b_i])[0]:
+                number_box_label = self.labels_list[number_box_idx_list[n_i]]
+                text_list = text_lists[n_i]
+                
+                if number_box_label in ['l_s_n', 'r_s_n']:     
+                    if check:
+                        print(f"check sub_text")
+                        for text in text_list:
+                            print(f"{text}")
+
+                    if len(text_list) !=3: continue  
+                    if text_list[-1][1].isdigit(): continue
                     
-                        if len(text_list) !=4: continue 
-                        isdigit = True
+                    board_dict['sub_text'] = [i[1] for i in text_list]
+
+                elif number_box_label in ['l_m_n', 'r_m_n']:
+                    if check:
+                        print(f"check main_text")
                         for text in text_list:
-                            if not text[1].isdigit(): 
-                                isdigit == False
-                                break
-                        if not isdigit: continue
-                        board_dict['main_text'] = [i[1] for i in text_list]
+                            print(f"{text}")
+                
+                    if len(text_list) !=4: continue 
+                    board_dict['main_text'] = [i[1] for i in text_list]
 
             if board_dict.get('main_text', None) is not None and\
                 board_dict.get('sub_text', None):
                 number_board_list.append(board_dict)
         
         return number_board_list
+    
+    
+    def compute_center_points(self, bboxes):
+        """`compute_center_point` of each bbox. 
+        
+        Args:
+            bboxes (ndarray): [n, 4]
+        Returns:
+            ndarray: [n, 2], (x_center, y_center)
+        """
+        centers = np.stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, (bboxes[:, 1] + bboxes[:, 3]) / 2], axis = 1)
+        return np.trunc(centers).astype(np.int64)
+    
+    
+    def check_in_bboxes(self, out_boxes, in_centers):
+        """`check_in_bbox` of all pairs with `box_inner_ratio = 0.0`
+
+        Args:
+            out_boxes (ndarray): [n, 4]
+            in_centers (ndarray): [m, 2], center points of inner boxes
+        Returns:
+            ndarray: [n, m] bool
+        """
+        out_boxes, in_centers = out_boxes.reshape(-1, 4), in_centers.reshape(-1, 2)
+        x_center, y_center = in_centers[None, :, 0], in_centers[None, :, 1]
+        return (out_boxes[:, 0:1] <= x_center) & (out_boxes[:, 1:2] <= y_center) &\
+               (out_boxes[:, 2:3] >= x_center) & (out_boxes[:, 3:4] >= y_center)
                
             
     def check_in_bbox(self, out_box, in_box, box_inner_ratio = 0.0):
@@ -147,4 +181,62 @@ class Get_info():
 
         x_center, y_center = int((x_min + x_max)/2), int((y_min + y_max)/2)
 
-        return x_center, y_center
\ No newline at end of file
+        return x_center, y_center
+
+
+
+def read_plates(model, images, score_thr = 0.5, batch_size = None):
+    """Read license plates of images.
+
+    Only bboxes and labels are used, so the mask branch of the model is skipped.
+    Runs with `inference_detector`, so the model must be on a CUDA device.
+
+    Args:
+        model (nn.Module): The loaded detector. `model.CLASSES` must be set.
+        images (str/ndarray or list[str/ndarray]): image files or loaded images(BGR, e.g. frames read by cv2)
+        score_thr (float): minimum score of instances
+        batch_size (int, optional): number of images for one forward. default: all images at once
+
+    Returns:
+        plates (list[list[dict]]): plates of each image. each plate has keys
+            `type`, `main_text`, `sub_text`, `box`, `confidence`
+            empty list if `images` is empty
+        timing (dict): seconds spent at each stage. `inference`, `parse`, `read`, `total`
+    """
+    if not isinstance(images, (list, tuple)):
+        images = [images]
+    plates = []
+    timing = dict(inference = 0., parse = 0., read = 0.)
+    if len(images) == 0:
+        timing['total'] = 0.
+        return plates, timing
+    batch_size = len(images) if batch_size is None else batch_size
+    classes = list(model.CLASSES)
+    
+    for start in range(0, len(images), batch_size):
+        t_start = time.perf_counter()
+        with torch.no_grad():
+            batch_results = inference_detector(model, list(images[start:start + batch_size]), with_mask = False)
+        t_inference = time.perf_counter()
+        
+        batch_bboxes_labels = []
+        for result in batch_results:
+            bboxes, labels, _ = parse_inference_result(result)
+            batch_bboxes_labels.append((bboxes, labels))
+        t_parse = time.perf_counter()
+        
+        for bboxes, labels in batch_bboxes_labels:
+            board_list = Get_info(bboxes, labels, classes, score_thr = score_thr).get_board_info(with_box = True)
+            plates.append([dict(type = board['type'],
+                                main_text = board['main_text'],
+                                sub_text = board['sub_text'],
+                                box = board['box'],
+                                confidence = board['confidence']) for board in board_list])
+        t_read = time.perf_counter()
+        
+        timing['inference'] += t_inference - t_start
+        timing['parse'] += t_parse - t_inference
+        timing['read'] += t_read - t_parse
+    
+    timing['total'] = sum(timing.values())
+    return plates, timing
@@ -1,11 +1,13 @@
 from .checkpoint import CheckpointHook
 from .custom import Validation_Hook, Check_Hook
+from .decodedcache import DecodedCacheHook
 from .hook import Hook
 from .itertime import IterTimerHook
 from .logger import LoggerHook
 from .optimizer import OptimizerHook
+from .paddingstats import PaddingStatsHook
 from .steplrupdater import StepLrUpdaterHook
 
 __all__ = [
-    'CheckpointHook', "Validation_Hook", "Check_Hook", "Hook", "IterTimerHook", "LoggerHook", "OptimizerHook", "StepLrUpdaterHook"
+    'CheckpointHook', "Validation_Hook", "Check_Hook", "DecodedCacheHook", "Hook", "IterTimerHook", "LoggerHook", "OptimizerHook", "PaddingStatsHook", "StepLrUpdaterHook"
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@
 import os, os.path as osp
 
 from sub_module.mmdet.hooks.hook import Hook, HOOK
+from sub_module.mmdet.dist_utils import master_only
 
 @HOOK.register_module()
 class CheckpointHook(Hook):
@@ -113,6 +114,7 @@ class CheckpointHook(Hook):
        
   
             
+    @master_only
     def save_checkpoint_hook(self, runner):
         """Save the current checkpoint and delete unwanted checkpoint."""
         # save meta, parameters of model, optimazers 
@@ -3,10 +3,10 @@ import time
 import logging
 import re
 from torch.utils.data import DataLoader
-from torch.utils.tensorboard import SummaryWriter
 
 from sub_module.mmdet.hooks.hook import Hook, HOOK
-from sub_module.mmdet.eval import Evaluate
+from sub_module.mmdet.dist_utils import master_only, barrier
+from sub_module.mmdet.modules.dataparallel import MMDistributedDataParallel
 
 @HOOK.register_module()
 class Validation_Hook(Hook):
@@ -47,21 +47,22 @@ class Validation_Hook(Hook):
             self.iter_count +=1
             if self.unit == 'iter' and\
                 self.every_n_inner_iters():
-                
-                result = self.validation(runner)
-                if result is None: 
-                    print(f"Memory usage is over. Validation is canceled")
-                runner.val_result.append(result)           
+                self.run_validation(runner)
     
     def after_train_epoch(self, runner) -> None: 
         if self.run_val: 
             if self.unit == 'epoch' and\
                 self.every_n_epochs(runner, self.val_timing):
-                
-                result = self.validation(runner)
-                if result is None: 
-                    print(f"Memory usage is over. Validation is canceled")
-                runner.val_result.append(result)
+                self.run_validation(runner)
+    
+    def run_validation(self, runner):
+        # validation runs only on rank 0, and other ranks wait until it is done
+        if runner.rank == 0:
+            result = self.validation(runner)
+            if result is None: 
+                print(f"Memory usage is over. Validation is canceled")
+            runner.val_result.append(result)
+        barrier()
     
     def save_best_model(self, result: dict = None, runner = None, init = False):
         model_cfg = self.kwargs.get('model_cfg', None)
@@ -123,7 +124,12 @@ class Validation_Hook(Hook):
         
         
     def validation(self, runner):
+        from sub_module.mmdet.eval import Evaluate      # imported at first use. eval imports cv2 and visualization
+        
         model = runner.model
+        if isinstance(model, MMDistributedDataParallel):
+            # forward of DistributedDataParallel communicates with other ranks
+            model = model.module
         val_dataloader = self.val_dataloader
         
         # Check if the directory path to save exists.
@@ -138,29 +144,35 @@ class Validation_Hook(Hook):
                         output_path = output_path)  
         
         eval_ = Evaluate(**eval_cfg) 
-        summary = eval_.get_mAP()  
+        # result images and EIR are computed in the same inference pass of mAP
+        run_infer = self.infer_cfg.get('run', False)
+        summary = eval_.get_mAP(compare_board = run_infer and self.infer_cfg.get('compare_board', False),
+                                save_result = run_infer)  
         if summary is None: return None
-
-        if self.infer_cfg.get('run', False):
-            correct_inference_rate = eval_.run_inference(compare_board = self.infer_cfg.get('compare_board', False))
-            if correct_inference_rate is not None:
-                summary['EIR'] = correct_inference_rate
         
         model.train()
         log_dict_loss = dict(**runner.log_buffer.get_last())        
         if log_dict_loss.get("data_time", None) is not None: del log_dict_loss['data_time']
         if log_dict_loss.get("time", None) is not None: del log_dict_loss['time']
 
+        # exact AP computed by matching, reported side by side when `ap_engine` is 'both' 
+        exact_mAP = dict()
+        if summary.get('coco', None) is not None:
+            exact_mAP = dict(coco_mAP = summary['coco']['mAP'],
+                             dv_coco_mAP = summary['dv_coco']['mAP'])
+        
         result = dict(epoch = runner.epoch, 
                       inner_iter = f"[{runner.inner_iter}/{runner._iterd_per_epochs}]",
                       mAP = summary['normal']['mAP'],
                       dv_mAP = summary['dv']['mAP'],
+                      **exact_mAP,
                       EIR = summary.get('EIR', None),
                       **log_dict_loss)
  
         # To write tensorboard
         runner.log_buffer.update_tensorboard(vars = dict(mAP = summary['normal']['mAP'],
                                                     dv_mAP = summary['dv']['mAP'],
+                                                    **exact_mAP,
                                                     EIR = summary.get('EIR', None),
                                                     **log_dict_loss))
         
@@ -210,7 +222,7 @@ class TensorBoard_Hook(Hook):
                  interval = ['iter', 50]):
         self.unit, self.timing = interval[0], interval[1]
         self.pvc_dir = pvc_dir
-        self.writer_result_dir = SummaryWriter(log_dir = out_dir)    
+        self.out_dir = out_dir
         self.categories = categories
 
     def after_train_iter(self, runner) -> None: 
@@ -231,6 +243,7 @@ class TensorBoard_Hook(Hook):
         self.writer_result_dir.add_scalar(board_path, value, runner._iter)
             
             
+    @master_only
     def write_to_board(self, runner):    
         categories = self.categories   
         categories_list = list(categories.keys())
@@ -282,12 +295,18 @@ class TensorBoard_Hook(Hook):
                 self.writer_meta(f"else/{name}", item, runner)
                          
     
+    @master_only
     def before_run(self, runner):
+        # writers are created only on rank 0
+        from torch.utils.tensorboard import SummaryWriter       # imported at first use. importing tensorboard is slow
+        
+        self.writer_result_dir = SummaryWriter(log_dir = self.out_dir)    
         if runner.in_pipeline: 
             if not osp.isdir(self.pvc_dir):
                 os.makedirs(self.pvc_dir, exist_ok=True)
             self.writer_pvc = SummaryWriter(log_dir = self.pvc_dir)
                 
+    @master_only
     def after_run(self, runner):
         if runner.in_pipeline: 
             self.writer_pvc.close()
@@ -0,0 +1,28 @@
+from sub_module.mmdet.hooks.hook import Hook, HOOK
+from sub_module.mmdet.dist_utils import master_only
+
+
+@HOOK.register_module()
+class DecodedCacheHook(Hook):
+    """Log the statistics of `DecodedCache` of train dataset at the end of each epoch.
+
+    hit rate is computed with the counts of the epoch, so it is close to 1 after the first epoch 
+    if all samples fit in the cache.
+    """
+    def __init__(self):
+        self.last_stats = None
+
+    @master_only
+    def after_train_epoch(self, runner):
+        decoded_cache = getattr(runner.train_dataloader.dataset, 'decoded_cache', None)
+        if decoded_cache is None: return
+        stats = decoded_cache.stats()
+        last_stats = self.last_stats if self.last_stats is not None else dict(hits = 0, misses = 0, evictions = 0)
+        self.last_stats = stats
+
+        hits, misses = stats['hits'] - last_stats['hits'], stats['misses'] - last_stats['misses']
+        hit_rate = hits / (hits + misses) if hits + misses > 0 else 0.
+        runner.logger.info(f"decoded cache [hit rate: {hit_rate:.3f},  hits: {hits},  misses: {misses},  "
+                           f"evictions: {stats['evictions'] - last_stats['evictions']},  "
+                           f"cached: {stats['num_cached']}/{decoded_cache.num_samples},  "
+                           f"used: {stats['used_bytes'] / 1024**2:.1f}/{decoded_cache.capacity_bytes / 1024**2:.1f}MB]")
@@ -8,6 +8,7 @@ from collections import OrderedDict
 
 from sub_module.utils.utils import is_list_of, is_tuple_of, dict_to_pretty
 from sub_module.mmdet.hooks.hook import Hook, HOOK
+from sub_module.mmdet.dist_utils import master_only
 from typing import Optional, Dict
 
 @HOOK.register_module()
@@ -96,6 +97,7 @@ class LoggerHook(Hook):
     
     
     
+    @master_only
     def _log_info(self, log_dict: Dict, runner) -> None:
         # print exp name for users to distinguish experiments
         # at every ``interval_exp_name`` iterations and the end of each epoch
@@ -172,6 +174,7 @@ class LoggerHook(Hook):
         
         runner.logger.info(log_str)
         
+    @master_only
     def write_log(self, status, log_):    
         # dump log in .log format
 
@@ -0,0 +1,16 @@
+from sub_module.mmdet.hooks.hook import Hook, HOOK
+from sub_module.mmdet.dist_utils import master_only
+
+
+@HOOK.register_module()
+class PaddingStatsHook(Hook):
+    """Log the ratio of padded pixels in batches of the last epoch of train dataloader.
+
+    Statistics are computed by the sampler when `bucket` is set in config of train dataloader.
+    """
+    @master_only
+    def after_train_epoch(self, runner):
+        stats = getattr(runner.train_dataloader.sampler, 'padding_stats', None)
+        if stats is None: return
+        runner.logger.info(f"padding [waste: {stats['padding_waste']:.3f},  "
+                           f"repeated samples: {stats['num_repeated']}]")
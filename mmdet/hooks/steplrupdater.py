@@ -12,7 +12,8 @@ class StepLrUpdaterHook(Hook):
                  warmup: Optional[str] = None,
                  warmup_iters: int = 0,
                  warmup_ratio: float = 0.1,
-                 warmup_by_epoch: bool = False  # TODO : apply warmup
+                 warmup_by_epoch: bool = False,  # TODO : apply warmup
+                 by_epoch: bool = True          # False: `step` is counted in iteration units
                  ) -> None:
         if isinstance(step, list):
             for s in step:
@@ -23,6 +24,7 @@ class StepLrUpdaterHook(Hook):
         else:
             raise TypeError('"step" must be a list or integer')
         self.step = step
+        self.by_epoch = by_epoch
         self.gamma = gamma      
         self.min_lr = min_lr
         
@@ -54,7 +56,7 @@ class StepLrUpdaterHook(Hook):
         
 
     def get_lr(self, runner , base_lr: float):
-        progress = runner.epoch
+        progress = runner.epoch if self.by_epoch else runner.iter
         
         # calculate exponential term
         if isinstance(self.step, int):
@@ -99,6 +101,19 @@ class StepLrUpdaterHook(Hook):
         self.base_lr = [group['initial_lr'] for group in runner.optimizer.param_groups]
         
     
+    def state_dict(self):
+        # saved in checkpoint to resume the learning rate schedule
+        return dict(base_lr = self.base_lr,
+                    regular_lr = self.regular_lr,
+                    warmup_iters = self.warmup_iters)
+    
+    
+    def load_state_dict(self, state_dict):
+        self.base_lr = state_dict['base_lr']
+        self.regular_lr = state_dict['regular_lr']
+        self.warmup_iters = state_dict['warmup_iters']
+    
+    
     def before_train_epoch(self, runner):
         if self.warmup_iters is None:
             epoch_len = len(runner.train_dataloader)  # type: ignore
@@ -110,8 +125,12 @@ class StepLrUpdaterHook(Hook):
     
     def before_train_iter(self, runner):
         cur_iter = runner.iter
+        if not self.by_epoch:
+            self.regular_lr = self.get_regular_lr(runner)
 
         if self.warmup is None or cur_iter > self.warmup_iters:
+            if not self.by_epoch:
+                self._set_lr(runner, self.regular_lr)
             return
         elif cur_iter == self.warmup_iters:
             self._set_lr(runner, self.regular_lr)
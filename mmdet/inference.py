@@ -1,3 +1,4 @@
+import copy
 import numpy as np
 import torch
 import itertools
@@ -96,14 +97,17 @@ def load_state_dict(model: torch.nn.Module, state_dict, device = 'cuda:0',  logg
     model.eval()
     return model
 
-def inference_detector(model, imgs_path, **kwargs):
+def inference_detector(model, imgs_path, with_mask = True, **kwargs):
     """Inference image(s) with the detector.
 
     Args:
         model (nn.Module): The loaded detector.
         imgs_path (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
            Either image files or loaded images.
+           Loaded images are read by `LoadImageFromWebcam` instead of the first transform of pipeline.
         val: run infernce in validation mode
+        with_mask (bool): If False, skip the mask branch of the model. 
+            results have only bbox results, same as the model without mask branch.
 
     Returns:
         If imgs is a list or tuple, the same length list type results
@@ -130,6 +134,12 @@ def inference_detector(model, imgs_path, **kwargs):
         pipeline_cfg = cfg.val_infer_pipeline
     else: raise ValueError("val or test config must be specific, but both got None")
 
+    is_loaded = isinstance(imgs_path[0], np.ndarray)
+    if is_loaded:
+        # images are already loaded (e.g. frames of video)
+        pipeline_cfg = copy.deepcopy(pipeline_cfg)
+        pipeline_cfg[0] = dict(pipeline_cfg[0], type='LoadImageFromWebcam')
+    
     re_pipeline_cfg  = replace_ImageToTensor(pipeline_cfg)
     pipeline = Compose(re_pipeline_cfg)
     
@@ -137,7 +147,10 @@ def inference_detector(model, imgs_path, **kwargs):
 
     for img_path in imgs_path:
         # prepare data
-        data = dict(img_info=dict(file_name=img_path), img_prefix=None)
+        if is_loaded:
+            data = dict(img=img_path)
+        else:
+            data = dict(img_info=dict(file_name=img_path), img_prefix=None)
         # build the data pipeline
         data = pipeline(data)
         datas.append(data)
@@ -158,7 +171,7 @@ def inference_detector(model, imgs_path, **kwargs):
 
     # forward the model
     with torch.no_grad():
-        results = model(return_loss=False, rescale=True, **data)        # call model.forward
+        results = model(return_loss=False, rescale=True, with_mask=with_mask, **data)        # call model.forward
     
     torch.cuda.empty_cache()  
 
@@ -1,18 +1,38 @@
-from .dataparallel import build_dp, DataParallel
-from .register_module import *
+import importlib
+
+# Submodules are imported at the first access of their attributes (PEP 562). see `sub_module/mmdet/__init__.py`
+_submodule_attrs = {
+    '.dataparallel': ["build_dp", "build_ddp", "DataParallel", "MMDistributedDataParallel"],
+    '.register_module': ["BACKBONES", "NECKS", "RPN_HEADS", "ROI_HEADS"],
+
+    '.base.module': ["BaseModule", "ModuleList"],
+    '.base.initialization.constant': ["constant_init"],
+    '.base.initialization.initialize': ["initialize"],
+    '.base.initialization.kaiming': ["kaiming_init"],
+    '.base.initialization.normal': ["NormalInit", "trunc_normal_init"],
+    '.base.initialization.utils': ["BaseInit", "update_init_info", "_no_grad_trunc_normal_"],
+    '.base.initialization.xavier': ["XavierInit"],
+
+    '.detector.maskrcnn': ["MaskRCNN"],
+}
+_attr_to_submodule = {attr: submodule for submodule, attrs in _submodule_attrs.items() for attr in attrs}
+
+
+def __getattr__(name):
+    if name not in _attr_to_submodule:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_attr_to_submodule[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_attr_to_submodule))
 
-from .base.module import BaseModule, ModuleList
-from .base.initialization.constant import constant_init
-from .base.initialization.initialize import initialize
-from .base.initialization.kaiming import kaiming_init
-from .base.initialization.normal import NormalInit, trunc_normal_init
-from .base.initialization.utils import BaseInit, update_init_info, _no_grad_trunc_normal_
-from .base.initialization.xavier import XavierInit
 
-from .detector.maskrcnn import MaskRCNN
 
 __all__ = [
-    "build_dp", "DataParallel",
+    "build_dp", "build_ddp", "DataParallel", "MMDistributedDataParallel",
     
     "BaseModule", "ModuleList",
     "initialize", 
@@ -20,4 +40,4 @@ __all__ = [
     "BaseInit", "update_init_info", "_no_grad_trunc_normal_", "trunc_normal_init",
     
     "MaskRCNN"
-]
\ No newline at end of file
+]
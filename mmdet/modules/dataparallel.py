@@ -1,6 +1,7 @@
 
 from itertools import chain
-from torch.nn.parallel import DataParallel
+import torch
+from torch.nn.parallel import DataParallel, DistributedDataParallel
 from sub_module.mmdet.scatter import scatter_inputs
 
 def build_dp(model, cfg = None, device='cuda', dim=0, **kwargs):
@@ -17,6 +18,35 @@ def build_dp(model, cfg = None, device='cuda', dim=0, **kwargs):
     if cfg is not None:
         model.cfg = cfg     # used for validation and inference
     return model
+
+
+def build_ddp(model, cfg = None, device='cuda', **kwargs):
+    """Wrap model with MMDistributedDataParallel. The process group must be initialized.
+
+    Args:
+        device (str): 'cuda': model is assigned to the current device of this process
+                      'cpu': run on CPU. (e.g. with 'gloo' backend)
+    """
+    if device == 'cuda':
+        model = model.cuda()
+        device_ids = [torch.cuda.current_device()]
+    else:
+        device_ids = None
+    
+    if kwargs.get('classes', None) is not None:
+        model.CLASSES = kwargs['classes']
+    if cfg is not None:
+        model.cfg = cfg     # validation runs with the module which is not wrapped
+    
+    model = MMDistributedDataParallel(model, 
+                                      device_ids = device_ids,
+                                      broadcast_buffers = kwargs.get('broadcast_buffers', False),
+                                      find_unused_parameters = kwargs.get('find_unused_parameters', False))
+    if kwargs.get('classes', None) is not None:
+        model.CLASSES = kwargs['classes']
+    if cfg is not None:
+        model.cfg = cfg
+    return model
     
     
 class MMDataParallel(DataParallel):
@@ -74,4 +104,23 @@ class MMDataParallel(DataParallel):
         """
         # kwargs.keys = ['return_loss', 'rescale', 'img_metas', 'img']
         
-        return super().forward(*inputs, **kwargs)
\ No newline at end of file
+        return super().forward(*inputs, **kwargs)
+
+
+
+class MMDistributedDataParallel(DistributedDataParallel):
+    """The DistributedDataParallel module that supports DataContainer.
+
+    `train_step` scatters `DataContainer` to the device of this process 
+    (or unwraps it on CPU when `device_ids` is None), then runs the forward of the module 
+    with `DistributedDataParallel.forward`, which prepares all-reduce of gradients for `backward`.
+    Losses are parsed by `_parse_losses` of the module as its `train_step` does.
+    """
+    def train_step(self, *inputs):
+        # inputs[0]: data_batch, dict
+        # inputs[1]: optimizer
+        target_devices = self.device_ids if self.device_ids else [-1]
+        data = scatter_inputs(inputs, target_devices)[0][0]
+        losses = self(**data)
+        loss, log_vars = self.module._parse_losses(losses)
+        return dict(loss=loss, log_vars=log_vars, num_samples=len(data['img_metas']))
@@ -364,7 +364,8 @@ class StandardRoIHead(BaseRoIHead, BBoxTestMixin_ROI, MaskTestMixin_ROI):
                     proposal_list,
                     img_metas,
                     proposals=None,
-                    rescale=False):
+                    rescale=False,
+                    with_mask=True):
         """Test without augmentation.
 
         Args:
@@ -376,6 +377,8 @@ class StandardRoIHead(BaseRoIHead, BBoxTestMixin_ROI, MaskTestMixin_ROI):
             img_metas (list[dict]): Meta information of images.
             rescale (bool): Whether to rescale the results to
                 the original image. Default: True.
+            with_mask (bool): If False, skip the mask branch and return
+                bbox results only, as if there is no mask branch.
 
         Returns:
             list[list[np.ndarray]] or list[tuple]: When no mask branch,
@@ -398,7 +401,7 @@ class StandardRoIHead(BaseRoIHead, BBoxTestMixin_ROI, MaskTestMixin_ROI):
             for i in range(len(det_bboxes))
         ]
 
-        if not self.with_mask:
+        if not (self.with_mask and with_mask):
             return bbox_results
         else:
             segm_results = self.simple_test_mask(
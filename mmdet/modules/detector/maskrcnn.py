@@ -2,6 +2,7 @@
 from sub_module.mmdet.modules.base.module import BaseModule
 from sub_module.mmdet.registry import build_from_cfg
 from sub_module.mmdet.modules.register_module import BACKBONES, NECKS, RPN_HEADS, ROI_HEADS
+from sub_module.mmdet.utils import normalize_batch
 
 import torch
 
@@ -31,10 +32,16 @@ class MaskRCNN(BaseModule):
         and List[dict]), and when ``resturn_loss=False``, img and img_meta
         should be double nested (i.e.  List[Tensor], List[List[dict]]), with
         the outer list indicating test time augmentations.
+        uint8 images(`Normalize` is deferred in pipeline) are normalized here at once.
         """
         if return_loss:
+            if img.dtype == torch.uint8:
+                img = normalize_batch(img, img_metas)
             return self.forward_train(img, img_metas, **kwargs)
         else:
+            if isinstance(img, list) and isinstance(img_metas, list):
+                img = [normalize_batch(aug_img, aug_img_metas) if aug_img.dtype == torch.uint8 else aug_img
+                       for aug_img, aug_img_metas in zip(img, img_metas)]
             return self.forward_test(img, img_metas, **kwargs)  
     
 
@@ -47,6 +54,8 @@ class MaskRCNN(BaseModule):
             img_metas (List[List[dict]]): the outer list indicates test-time
                 augs (multiscale, flip, etc.) and the inner list indicates
                 images in a batch.
+            with_mask (bool, optional): If False, the mask branch is skipped and
+                only bbox results are returned. Default: True
         """
         
         
@@ -90,7 +99,8 @@ class MaskRCNN(BaseModule):
 
             # len: batch_size
             # result[n].size: (6, 6)
-            results = self.roi_head.simple_test(x, proposal_list, img_meta, rescale=kwargs.get("rescale", False))               
+            results = self.roi_head.simple_test(x, proposal_list, img_meta, rescale=kwargs.get("rescale", False),
+                                                with_mask=kwargs.get("with_mask", True))               
         
             return results
         
@@ -1,6 +1,7 @@
 import os, os.path as osp
 import copy
 import time
+import random
 import logging
 import numpy as np
 import torch
@@ -8,11 +9,13 @@ from torch.optim import Optimizer
 
 
 from sub_module.mmdet.utils import get_host_info, compute_sec_to_h_d
-from sub_module.mmdet.eval import Evaluate
 
 from sub_module.mmdet.registry import build_from_cfg
 from sub_module.mmdet.hooks.hook import Hook, HOOK
 from sub_module.mmdet.checkpoint import save_checkpoint as sc_save_checkpoint 
+from sub_module.mmdet.checkpoint import load_checkpoint
+from sub_module.mmdet.data.dataloader import IterLoader
+from sub_module.mmdet.dist_utils import get_dist_info, master_only
 
 priority_dict = {'HIGHEST' : 0,
                  'VERY_HIGH' : 10,
@@ -53,6 +56,12 @@ class Runner:
             Defaults to None.
         max_epochs (int, optional): Total training epochs.
         max_iters (int, optional): Total training iterations.
+        collect_hook_time (bool, optional): Whether to measure the time taken
+            by each hook at each stage. The result is written to the log at
+            the end of running. Defaults to False.
+        resume_from (str, optional): Path of checkpoint to resume training from.
+            The weights, optimizer, iteration counters, states of hooks, random
+            states and the order of data are restored. Defaults to None.
     """
     def __init__(self,
                  model,
@@ -93,6 +102,8 @@ class Runner:
         
         self.batch_size = kwargs.get('batch_size', None)
         self.katib = kwargs.get('katib', False)
+        self.collect_hook_time = kwargs.get('collect_hook_time', False)     # measure time taken by each hook
+        self.resume_from = kwargs.get('resume_from', None)
             
         self.model = model
         self.in_pipeline = in_pipeline
@@ -109,13 +120,22 @@ class Runner:
         else:
             self._model_name = self.model.__class__.__name__
         
-        self._rank, self._world_size = 0, 1
+        self._rank, self._world_size = get_dist_info()
+        if self._rank != 0:
+            # only rank 0 writes log
+            self.logger.setLevel(logging.ERROR)
         self.timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime())
         self.val_result = []    # will be appended when run Validation_Hook
         self._hooks = []    
+        self._stage_hooks = {stage: [] for stage in Hook.stages}   # only hooks that override each stage
+        self._hook_time = dict()    # {stage: {hook class name: [total time, number of calls]}}
         self._epoch = 1         # current epoch during training
         self._iter = 1          # current iter during training
         self._inner_iter = 0    # current iter during epoch
+        self._hook_stage = None # stage of hooks currently running
+        self._resume_sampler_state = None
+        self._resume_inner_iter = 0     # number of iterations already done in the epoch to resume
+        self._resume_hook_states = None
         
         self._iterd_per_epochs = iterd_per_epochs
         if max_epochs is not None and max_iters is not None:
@@ -130,8 +150,8 @@ class Runner:
             self._max_iters = self._max_epochs * self._iterd_per_epochs            
         else: 
             self._by_epoch = False
-            self._max_epochs = self._max_iters // self._iterd_per_epochs
-            raise ValueError(f"training in iteration units is not yet implemented.")
+            # epoch is counted virtually every `iterd_per_epochs` iterations
+            self._max_epochs = int(np.ceil(self._max_iters / self._iterd_per_epochs))
   
         
         self.log_buffer = LogBuffer()
@@ -149,6 +169,9 @@ class Runner:
                 running 2 epochs for training and 1 epoch for validation,
                 iteratively.
         """
+        if self.resume_from is not None:
+            self.resume(self.resume_from)
+        
         if self._by_epoch: self.logger.info(f'Training in epoch units.   max epochs: {self._max_epochs}')
         else: self.logger.info(f'Training in iteration units.   max iters: {self._max_iters}')       
         self.logger.info(f'Start running, host: {get_host_info()}, work_dir: {self.work_dir}')
@@ -156,17 +179,22 @@ class Runner:
         
         
         self.call_hook('before_run')
+        self._load_hook_states()        # after `before_run` so that the resumed states are not overwritten
         self.start_time = time.time()
-        if self._by_epoch:        
-            while self._epoch < self._max_epochs + 1:        # Training in epochs unit
-                self.train(train_dataloader, **kwargs)
-        else:   
-            while self._iter < self._max_iters + 1:
-                # self.train(train_dataloader, **kwargs)
-                
-                pass
+        try:
+            if self._by_epoch:        
+                while self._epoch < self._max_epochs + 1:        # Training in epochs unit
+                    self.train(train_dataloader, **kwargs)
+            else:                                               # Training in iterations unit
+                self.train_by_iter(train_dataloader, **kwargs)
+        finally:
+            # release the shared memory of decoded images even if training is stopped by an error
+            decoded_cache = getattr(train_dataloader.dataset, 'decoded_cache', None)
+            if decoded_cache is not None: decoded_cache.close()
         time.sleep(1)  # wait for some hooks like loggers to finish
         self.call_hook('after_run')
+        if self.collect_hook_time:
+            self.logger.info(f'Time taken by hooks at each stage:\n{self.get_hook_time_info()}')
         
     def run_iter(self, data_batch):
 
@@ -189,10 +217,19 @@ class Runner:
     def train(self, train_dataloader, **kwargs):
         self.train_dataloader = train_dataloader
         self.model.train()
+        sampler = getattr(train_dataloader, 'sampler', None)
+        if hasattr(sampler, 'set_epoch'):
+            sampler.set_epoch(self._epoch)
+        skip_iters = self._get_skip_iters(sampler)
         self.call_hook('before_train_epoch')
         time.sleep(2)  # Prevent possible deadlock during epoch transition
         
-        for i, data_batch in enumerate(train_dataloader):
+        data_iter = iter(train_dataloader)
+        if skip_iters > 0 and not hasattr(sampler, 'set_start_iter'):
+            # the sampler can not skip. consume the batches already used
+            for _ in range(skip_iters): next(data_iter)
+        
+        for i, data_batch in enumerate(data_iter, start = skip_iters):
             # data_batch: data of passed by pipelines in dataset and collate train_dataloader
             # data_batch.keys() = ['img_metas', 'img', 'gt_bboxes', 'gt_labels', 'gt_masks']    
             self._inner_iter = i+1
@@ -210,10 +247,116 @@ class Runner:
             torch.cuda.empty_cache()    # delete cache data of GPU 
         self.call_hook('after_train_epoch')
         self._epoch += 1
+        
+    
+    def _get_skip_iters(self, sampler):
+        """Restore the sampler of the epoch interrupted and get the number of iterations to skip."""
+        skip_iters, self._resume_inner_iter = self._resume_inner_iter, 0
+        sampler_state, self._resume_sampler_state = self._resume_sampler_state, None
+        if skip_iters == 0:
+            # the order of new epoch follows the restored random state
+            return 0
+        
+        if sampler_state is not None and hasattr(sampler, 'load_state_dict'):
+            sampler.load_state_dict(sampler_state)
+        if hasattr(sampler, 'set_start_iter'):
+            sampler.set_start_iter(skip_iters)
+        self.logger.info(f'skip {skip_iters} iterations already done in epoch {self._epoch}')
+        return skip_iters
+        
+    
+    def train_by_iter(self, train_dataloader, **kwargs):
+        """Train until `max_iters` without rebuilding the iterator of `train_dataloader`.
+        
+        `epoch` and `inner_iter` are computed from `iter`, and the epoch stages of hooks are 
+        called at every `iterd_per_epochs` iterations, so hooks working in epoch units still work. 
+        """
+        self.train_dataloader = train_dataloader
+        sampler = getattr(train_dataloader, 'sampler', None)
+        if self._resume_sampler_state is not None and hasattr(sampler, 'load_state_dict'):
+            sampler.load_state_dict(self._resume_sampler_state)
+        self._resume_sampler_state = None
+        done_iters, loader_epoch = self._iter - 1, 0
+        if not getattr(sampler, 'infinite', False):
+            # the iterator of a finite sampler is rebuilt at every `len(train_dataloader)` iterations
+            loader_epoch, done_iters = divmod(done_iters, len(train_dataloader))
+            if hasattr(sampler, 'set_epoch'):
+                sampler.set_epoch(loader_epoch)
+        if hasattr(sampler, 'set_start_iter'):
+            # skip the data already used before resuming
+            sampler.set_start_iter(done_iters)
+        iter_loader = IterLoader(train_dataloader, epoch = loader_epoch)
+        self.model.train()
+        
+        start_iter = self._iter
+        while self._iter < self._max_iters + 1:
+            self._epoch = (self._iter - 1) // self._iterd_per_epochs + 1
+            self._inner_iter = (self._iter - 1) % self._iterd_per_epochs + 1
+            if self._inner_iter == 1 or self._iter == start_iter:
+                self.call_hook('before_train_epoch')
+            
+            data_batch = next(iter_loader)
+            self.call_hook('before_train_iter')
+            self.run_iter(data_batch)
+            del data_batch         # delete training data for preventing memory leaks
+            self.call_hook('after_train_iter')
+            
+            self._iter += 1
+            # same as epoch units, `iter` is already increased at `after_train_epoch`
+            if self._inner_iter == self._iterd_per_epochs or self._iter == self._max_iters + 1:
+                self.call_hook('after_train_epoch')
+            torch.cuda.empty_cache()    # delete cache data of GPU 
+    
+    
+    def resume(self, checkpoint_path, map_location='cpu', resume_optimizer=True):
+        """Resume training from checkpoint.
+        
+        Restore the model weights, optimizer, iteration counters, random states,
+        states of hooks(e.g. learning rate updater) and the state of sampler.
+        When resuming at the middle of an epoch, the iterations already done are skipped
+        with the same order of data.
+
+        Args:
+            checkpoint_path (str): path of checkpoint saved by `save_checkpoint`
+            map_location (str): Same as :func:`torch.load`.
+            resume_optimizer (bool): Whether to resume the state of optimizer.
+        """
+        checkpoint = load_checkpoint(checkpoint_path, 
+                                     current_dir = osp.basename(os.getcwd()),
+                                     map_location = map_location, 
+                                     logger = self.logger)
+        model = self.model.module if hasattr(self.model, 'module') else self.model
+        model.load_state_dict(checkpoint['state_dict'])
+        
+        if resume_optimizer and 'optimizer' in checkpoint:
+            if isinstance(self.optimizer, Optimizer):
+                self.optimizer.load_state_dict(checkpoint['optimizer'])
+            elif isinstance(self.optimizer, dict):
+                for name, optim in self.optimizer.items():
+                    optim.load_state_dict(checkpoint['optimizer'][name])
+            else:
+                raise TypeError(f'optimizer should be an Optimizer or dict, but got {type(self.optimizer)}')
+        
+        meta = checkpoint['meta']
+        if meta.get('resume', None) is None:
+            raise KeyError(f"checkpoint: {checkpoint_path} has no state to resume.")
+        self._iter = meta['resume']['iter']
+        if self._by_epoch:
+            self._epoch = meta['resume']['epoch']
+        else:
+            self._epoch = (self._iter - 1) // self._iterd_per_epochs + 1
+        self._resume_inner_iter = meta['resume'].get('inner_iter', 0) if self._by_epoch else 0
+        
+        self._resume_sampler_state = meta.get('sampler', None)
+        self._resume_hook_states = meta.get('hook_states', None)
+        if meta.get('rng_state', None) is not None:
+            self._set_rng_state(meta['rng_state'])
+        self.logger.info(f'resumed from {checkpoint_path}, epoch: {self._epoch}, iter: {self._iter}')
+        return checkpoint
             
     
     def call_hook(self, fn_name):
-        """Call all hooks.
+        """Call all hooks which override the stage `fn_name`.
 
         Args:
             fn_name (str): The function name in each hook to be called
@@ -228,9 +371,56 @@ class Runner:
                 "after_run"
                 
         """
-        for hook in self._hooks:
-            getattr(hook, fn_name)(self)   
+        self._hook_stage = fn_name
+        # hooks that only inherit the empty method of `Hook` are not called
+        hooks = self._stage_hooks.get(fn_name, self._hooks)
+        if not self.collect_hook_time:
+            for hook in hooks:
+                getattr(hook, fn_name)(self)
+            return
+        
+        stage_time = self._hook_time.setdefault(fn_name, dict())
+        for hook in hooks:
+            t = time.time()
+            getattr(hook, fn_name)(self)
+            taken_time = time.time() - t
+            
+            classname = hook.__class__.__name__
+            if classname not in stage_time:
+                stage_time[classname] = [0., 0]
+            stage_time[classname][0] += taken_time
+            stage_time[classname][1] += 1
  
+    
+    def _build_stage_hooks(self):
+        """Build the dispatch table of `call_hook`.
+        
+        `self._stage_hooks[stage]` keeps the priority order of `self._hooks`
+        """
+        stage_hooks = {stage: [] for stage in Hook.stages}
+        for hook in self._hooks:
+            for trigger_stage in hook.get_triggered_stages():
+                stage_hooks[trigger_stage].append(hook)
+        self._stage_hooks = stage_hooks
+        
+    
+    def get_hook_time_info(self):
+        # Get time taken by each hook in each stage
+        stage_time_infos = []
+        for stage in Hook.stages:
+            stage_time = self._hook_time.get(stage, None)
+            if not stage_time: continue
+            
+            info = f'{stage}:\n'
+            hook_infos = []
+            for classname, (total_time, count) in stage_time.items():
+                hook_infos.append(f'{classname:<35} total: {total_time:.4f}s,   '
+                                  f'calls: {count},   avg: {total_time/count*1000:.3f}ms')
+            info += '\n'.join(hook_infos)
+            info += '\n -------------------- '
+            stage_time_infos.append(info)
+        return '\n'.join(stage_time_infos)
+    
        
     def register_hook(self, hook, priority='NORMAL'):
         """Register a hook into the hook list.
@@ -266,6 +456,8 @@ class Runner:
                 break
         if not inserted:
             self._hooks.insert(0, hook)
+        
+        self._build_stage_hooks()
          
     
     def register_training_hooks(self, hook_cfg_list):
@@ -281,15 +473,14 @@ class Runner:
     def get_hook_info(self):
         # Get hooks info in each stage
         stage_hook_map = {stage: [] for stage in Hook.stages}
-        for hook in self.hooks:
-            try:
-                priority = priority_dict[f'{hook.priority}']
-            except ValueError:
-                priority = hook.priority
-            classname = hook.__class__.__name__
-            hook_info = f'({priority:<12}) {classname:<35}'
-            for trigger_stage in hook.get_triggered_stages():
-                stage_hook_map[trigger_stage].append(hook_info)
+        for stage, hooks in self._stage_hooks.items():
+            for hook in hooks:
+                try:
+                    priority = priority_dict[f'{hook.priority}']
+                except ValueError:
+                    priority = hook.priority
+                classname = hook.__class__.__name__
+                stage_hook_map[stage].append(f'({priority:<12}) {classname:<35}')
 
  
         stage_hook_infos = []
@@ -356,6 +547,7 @@ class Runner:
         return momentums
     
     
+    @master_only
     def save_checkpoint(self,
                         out_dir,
                         filename_tmpl='epoch_{}.pth',
@@ -391,7 +583,15 @@ class Runner:
             meta.update(model_cfg = model_cfg)
             
         meta.update(epoch=self._epoch, 
-                    iter=self._iter)
+                    iter=self._iter,
+                    resume=self._get_resume_state(),
+                    hook_states=self._get_hook_states(),
+                    rng_state=self._get_rng_state())
+        
+        # state of sampler to restore the order of data when resuming
+        sampler = getattr(self.get('train_dataloader'), 'sampler', None)
+        if hasattr(sampler, 'state_dict'):
+            meta.update(sampler=sampler.state_dict())
         
         # set dir to save
         if val_mode:    # During validation to save best model 
@@ -415,6 +615,52 @@ class Runner:
         sc_save_checkpoint(**checkpoint_cfg)
 
     
+    def _get_resume_state(self):
+        """Get the epoch and iteration from which training restarts when resuming."""
+        if self._hook_stage == 'after_train_iter':
+            # the current iteration is done but `iter` is not increased yet 
+            return dict(epoch = self._epoch, iter = self._iter + 1, inner_iter = self._inner_iter)
+        elif self._hook_stage == 'after_train_epoch' and self._by_epoch:
+            return dict(epoch = self._epoch + 1, iter = self._iter, inner_iter = 0)
+        return dict(epoch = self._epoch, iter = self._iter, inner_iter = self._inner_iter)
+    
+    
+    def _get_hook_states(self):
+        # states of hooks which have `state_dict`. (e.g. learning rate updater)
+        hook_states = dict()
+        for hook in self._hooks:
+            if hasattr(hook, 'state_dict'):
+                hook_states[hook.__class__.__name__] = hook.state_dict()
+        return hook_states
+    
+    
+    def _load_hook_states(self):
+        if self._resume_hook_states is None: return
+        for hook in self._hooks:
+            state = self._resume_hook_states.get(hook.__class__.__name__, None)
+            if state is not None and hasattr(hook, 'load_state_dict'):
+                hook.load_state_dict(state)
+        self._resume_hook_states = None
+    
+    
+    def _get_rng_state(self):
+        # random states of main process. (workers of DataLoader are seeded by `worker_init_fn`)
+        rng_state = dict(python = random.getstate(),
+                         numpy = np.random.get_state(),
+                         torch = torch.get_rng_state())
+        if torch.cuda.is_available():
+            rng_state['cuda'] = torch.cuda.get_rng_state_all()
+        return rng_state
+    
+    
+    def _set_rng_state(self, rng_state):
+        random.setstate(rng_state['python'])
+        np.random.set_state(rng_state['numpy'])
+        torch.set_rng_state(rng_state['torch'].cpu())
+        if rng_state.get('cuda', None) is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all([state.cpu() for state in rng_state['cuda']])
+        
+    
     def get(self, att_name: str):
         try:
             return getattr(self, att_name)
@@ -165,6 +165,33 @@ def auto_scale_lr(cfg, logger, num_gpus = 1):
                     f'will not scaling the LR ({cfg.optimizer.lr}).') 
         
         
+def normalize_batch(img, img_metas):
+    """Normalize a batch of uint8 images on its device, when `Normalize` is deferred.
+
+    Same result as `Normalize` followed by `Pad`: 
+    the padded area of each image is filled with the padding value after normalization.
+
+    Args:
+        img (Tensor): uint8 (N, C, H, W) of BGR order
+        img_metas (list[dict]): must have `img_norm_cfg` and `img_shape`
+    Returns:
+        Tensor: float32 (N, C, H, W)
+    """
+    norm_cfg = img_metas[0]['img_norm_cfg']
+    if norm_cfg['to_rgb']:
+        img = img.flip(1)
+    mean = torch.as_tensor(np.asarray(norm_cfg['mean'], dtype=np.float32), device=img.device)
+    stdinv = torch.as_tensor((1 / np.float64(norm_cfg['std'])).astype(np.float32), device=img.device)
+    img = img.float().sub_(mean.view(1, -1, 1, 1)).mul_(stdinv.view(1, -1, 1, 1))
+    
+    pad_val = norm_cfg.get('pad_val', 0)
+    for i, img_meta in enumerate(img_metas):
+        h, w = img_meta['img_shape'][:2]
+        img[i, :, h:, :] = pad_val
+        img[i, :, :h, w:] = pad_val
+    return img
+    
+    
 def get_host_info():
     """Get hostname and username.
 
@@ -3,8 +3,6 @@ import cv2
 import random
 import math
 
-import matplotlib.pyplot as plt
-
 
 def mask_to_polygon(masks):
     polygons = []
@@ -50,7 +48,8 @@ def bitmap_to_polygon(bitmap):
 
 def draw_to_img(img, bboxes, labels, masks,
                 class_names,
-                score_thr=0.3): 
+                score_thr=0.3,
+                polygons=None): 
     """Draw `result` over `img`.
 
     Args:
@@ -61,6 +60,8 @@ def draw_to_img(img, bboxes, labels, masks,
         mask (ndarray | None): Masks, shaped (n,h,w) or None.
         class_names (list[str]): Names of each classes.
         score_thr (float): Minimum score of bboxes to be shown. Default: 0.
+        polygons (list[ndarray], optional): polygons of each instance. 
+            If given, used instead of `masks`.
 
     """
     assert bboxes is None or bboxes.ndim == 2, \
@@ -73,6 +74,8 @@ def draw_to_img(img, bboxes, labels, masks,
         'labels.shape[0] should not be less than bboxes.shape[0].'
     assert masks is None or masks.shape[0] == labels.shape[0], \
         'masks.shape[0] and labels.shape[0] should have the same length.'
+    assert polygons is None or len(polygons) == labels.shape[0], \
+        'len(polygons) and labels.shape[0] should have the same length.'
     assert masks is not None or bboxes is not None, \
         'masks and bboxes should not be None at the same time.'    
     
@@ -84,6 +87,8 @@ def draw_to_img(img, bboxes, labels, masks,
         labels = labels[inds]
         if masks is not None:
             masks = masks[inds, ...]
+        if polygons is not None:
+            polygons = [polygons[i] for i in np.nonzero(inds)[0]]
             
     
     scores = bboxes[:, -1]      # [num_instance]
@@ -97,41 +102,88 @@ def draw_to_img(img, bboxes, labels, masks,
     # object_labels len: num_instance,  each type: str,     e.g. object 34%
 
     # len(polygons) : num_instance,     len(polygons[n]): num_points of polygon
-    polygons = mask_to_polygon(masks)
-    
-    org_img = img.astype(np.uint8)
-    sub_img = np.zeros_like(org_img, dtype= np.uint8)   
-    img_dict = dict(box = sub_img.copy(),
-                    polygon = sub_img.copy(),
-                    mask = sub_img.copy())
+    if polygons is None:
+        polygons = mask_to_polygon(masks)
     
+    out_img = img.astype(np.uint8)      # the only full-frame buffer
     colors = get_colors(len(object_labels))
-    img_dict['box'] = draw_box(img_dict['box'], bboxes, colors) 
-    img_dict['polygon'] = draw_polygon(img_dict['polygon'], polygons, colors)
-    img_dict['mask'] = draw_mask(img_dict['mask'], polygons, colors)    
     
-    return draw_by_projecting(org_img, img_dict, object_labels, bboxes, colors)
+    # layers are drawn and blended only within the region of instances
+    roi = get_roi(out_img.shape, bboxes, polygons)
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        sub_img = np.zeros((y1 - y0, x1 - x0) + out_img.shape[2:], dtype= np.uint8)   
+        img_dict = dict(box = draw_box(sub_img.copy(), bboxes, colors, offset = (x0, y0)),
+                        polygon = draw_polygon(sub_img.copy(), polygons, colors, offset = (x0, y0)),
+                        mask = draw_mask(sub_img.copy(), polygons, colors, offset = (x0, y0)))
+        out_img = composite_layers(out_img, img_dict, roi)
+    
+    return put_text(out_img, object_labels, bboxes, colors)
+
+
+def get_roi(img_shape, bboxes, polygons, margin = 4):
+    """Union rectangle of bboxes and polygons, clipped to image. 
+    
+    `margin` covers the thickness of lines drawn at the edges.
 
+    Returns:
+        list | None: [x_min, y_min, x_max, y_max] (x_max, y_max are exclusive), None if nothing to draw
+    """
+    height, width = img_shape[:2]
+    x_list, y_list = [], []
+    for bbox in bboxes:
+        x_min, y_min, x_max, y_max = bbox
+        x_list += [int(x_min), int(x_max)]
+        y_list += [int(y_min), int(y_max)]
+    for polygon in polygons:
+        if len(polygon) == 0: continue
+        polygon = np.asarray(polygon).reshape(-1, 2)
+        x_list += [int(polygon[:, 0].min()), int(polygon[:, 0].max())]
+        y_list += [int(polygon[:, 1].min()), int(polygon[:, 1].max())]
+    if len(x_list) == 0: return None
+    
+    x0, y0 = max(min(x_list) - margin, 0), max(min(y_list) - margin, 0)
+    x1, y1 = min(max(x_list) + margin + 1, width), min(max(y_list) + margin + 1, height)
+    if x0 >= x1 or y0 >= y1: return None
+    return [x0, y0, x1, y1]
 
-def draw_by_projecting(org_img, img_dict, object_labels, bboxes, colors):
-    for key in img_dict.keys():
+
+def composite_layers(out_img, img_dict, roi):
+    """Blend each layer of `img_dict` into `out_img` within `roi`.
+    
+    Same result as blending full-frame layers over the whole image, 
+    because pixels where layers are not drawn are left unchanged.
+    """
+    x0, y0, x1, y1 = roi
+    roi_img = np.ascontiguousarray(out_img[y0:y1, x0:x1])
+    for key, layer in img_dict.items():
         if key == 'box': beta_1, beta_2 = 0.35, 0.5
-        elif key == 'text':  
-            org_img[img_dict[key] !=0] = 0
-            continue
         elif key == "polygon":  beta_1, beta_2 = 0.4, 0.4
         elif key == "mask":  beta_1, beta_2 = 0.3, 0.4
         
+        drawn = layer != 0
+        tmp_img = roi_img.copy()
+        tmp_img[~drawn] = 0
+        roi_img[drawn] = 0
         
-        tmp_img = org_img.copy()
-        tmp_img[img_dict[key] ==0] = 0
-        org_img[img_dict[key] !=0] = 0
-        
-        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = tmp_img, beta=beta_1, gamma = 0)
-        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = img_dict[key], beta=beta_2, gamma = 0)
+        roi_img = cv2.addWeighted(src1 = roi_img, alpha = 1.0, src2 = tmp_img, beta=beta_1, gamma = 0)
+        roi_img = cv2.addWeighted(src1 = roi_img, alpha = 1.0, src2 = layer, beta=beta_2, gamma = 0)
+    
+    out_img[y0:y1, x0:x1] = roi_img
+    return out_img
+
+
+def render_result(filepath, out_file, bboxes, labels, polygons, class_names, score_thr = 0):
+    """Read image, draw inference result and save it. 
+
+    Runs in worker processes of `Evaluate.run_inference`, so it takes only compact results.
+    """
+    img = cv2.imread(filepath)
+    img = draw_to_img(img, bboxes, labels, None, class_names, 
+                      score_thr = score_thr, polygons = polygons)
+    cv2.imwrite(out_file, img)
+    return out_file
 
-    org_img = put_text(org_img, object_labels, bboxes, colors)
-    return org_img
 
 def get_colors(num_instance):
     colors = []
@@ -143,14 +195,24 @@ def get_colors(num_instance):
     
     return colors
 
-def draw_mask(img, polygons, colors):
+def _shift_polygon(polygon, offset):
+    if offset == (0, 0) or len(polygon) == 0: return polygon
+    return np.asarray(polygon, dtype = np.int32) - np.array(offset, dtype = np.int32)
+
+
+def draw_mask(img, polygons, colors, offset = (0, 0)):
+    """
+        offset (tuple): (x, y) of the top left of `img` in the original image
+    """
     for polygon, color in zip(polygons, colors):
+        polygon = _shift_polygon(polygon, offset)
         cv2.fillPoly(img, [polygon], color = color)            
     return img
 
 
-def draw_polygon(img, polygons, colors):
+def draw_polygon(img, polygons, colors, offset = (0, 0)):
     for polygon, color in zip(polygons, colors):
+        polygon = _shift_polygon(polygon, offset)
         cv2.polylines(img, 
                         [polygon], 
                         isClosed = True, 
@@ -160,11 +222,11 @@ def draw_polygon(img, polygons, colors):
     return img
     
 
-def draw_box(img, bboxes, colors, thickness= 2, lineType= cv2.LINE_4):
+def draw_box(img, bboxes, colors, thickness= 2, lineType= cv2.LINE_4, offset = (0, 0)):
     for bbox, edge_color in zip(bboxes, colors):
         x_min, y_min, x_max, y_max = bbox
         cv2.rectangle(img, 
-                    (int(x_min), int(y_min)), (int(x_max), int(y_max)),
+                    (int(x_min) - offset[0], int(y_min) - offset[1]), (int(x_max) - offset[0], int(y_max) - offset[1]),
                     edge_color, 
                     lineType = lineType, 
                     thickness = thickness)
@@ -197,6 +259,8 @@ def put_text(img, object_labels, bboxes, colors, fontface = cv2.FONT_HERSHEY_SIM
 
 
 def draw_PR_curve(output_path, class_name, PR_list, ap_area, dv_flag = False, show_plot = False):
+    import matplotlib.pyplot as plt     # imported at first use. importing matplotlib is slow
+    
     precision_list, recall_list = [], []
     fig, ax = plt.subplots(figsize = (10, 5))
     for PR in PR_list:
@@ -0,0 +1,62 @@
+import os, os.path as osp
+import time
+
+from sub_module.configs.config import Config
+
+
+def write(path, text):
+    os.makedirs(osp.dirname(path), exist_ok = True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def count_parsing(monkeypatch):
+    # filenames parsed by `_file2dict`, including `_base_` files
+    calls = []
+    file2dict = Config._file2dict
+    def counting_file2dict(*args, **kwargs):
+        calls.append(args[0])
+        return file2dict(*args, **kwargs)
+    monkeypatch.setattr(Config, '_file2dict', staticmethod(counting_file2dict))
+    return calls
+
+
+
+def test_no_cache_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr('sub_module.configs.config.CONFIG_CACHE_DIR', str(tmp_path / 'cache'))
+    write(str(tmp_path / 'a.py'), "lr = 0.01\n")
+    assert Config.fromfile(str(tmp_path / 'a.py')).lr == 0.01
+    assert not osp.exists(tmp_path / 'cache')
+
+
+def test_cache_hit_and_base_change(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    write(str(tmp_path / 'base.py'), "lr = 0.01\nepochs = 10\n")
+    write(str(tmp_path / 'a.py'), "_base_ = ['base.py']\nepochs = 20\n")
+    calls = count_parsing(monkeypatch)
+
+    cfg = Config.fromfile(str(tmp_path / 'a.py'), use_cache = True, cache_dir = cache_dir)
+    assert (cfg.lr, cfg.epochs, len(calls)) == (0.01, 20, 2)
+    cached = Config.fromfile(str(tmp_path / 'a.py'), use_cache = True, cache_dir = cache_dir)
+    assert (cached.lr, cached.epochs, len(calls)) == (0.01, 20, 2)
+    assert cached.text == cfg.text
+
+    # changing `_base_` file invalidates the cache
+    time.sleep(0.01)
+    write(str(tmp_path / 'base.py'), "lr = 0.02\nepochs = 10\n")
+    cfg = Config.fromfile(str(tmp_path / 'a.py'), use_cache = True, cache_dir = cache_dir)
+    assert (cfg.lr, len(calls)) == (0.02, 4)
+
+
+def test_same_content_at_different_paths(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    text = "_base_ = ['base.py']\nepochs = 20\n"
+    for name, lr in [('first', 0.01), ('second', 0.1)]:
+        write(str(tmp_path / name / 'base.py'), f"lr = {lr}\n")
+        write(str(tmp_path / name / 'a.py'), text)
+
+    for name, lr in [('first', 0.01), ('second', 0.1)] * 2:
+        filename = str(tmp_path / name / 'a.py')
+        cfg = Config.fromfile(filename, use_predefined_variables = False, use_cache = True, cache_dir = cache_dir)
+        assert cfg.lr == lr
+        assert str(tmp_path / name / 'base.py') in cfg.text
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from sub_module.mmdet.data import decodedcache
+from sub_module.mmdet.data.decodedcache import DecodedCache
+
+
+MiB = 1024**2
+
+
+
+def test_put_and_get():
+    cache = DecodedCache(4, capacity_bytes = MiB)
+    try:
+        img = np.arange(30 * 20 * 3, dtype = np.uint8).reshape(30, 20, 3)
+        assert cache.get(1) is None
+        cache.put(1, dict(img = img, img_shape = img.shape))
+        results = cache.get(1)
+        assert np.array_equal(results['img'], img)
+        assert results['img_shape'] == img.shape
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+        del results
+    finally:
+        cache.close()
+
+
+def test_capacity_is_clamped_to_free_shm(monkeypatch):
+    # e.g. docker default: 64MB of /dev/shm
+    monkeypatch.setattr(decodedcache, '_shm_free_bytes', lambda: 64 * MiB)
+    with pytest.warns(UserWarning, match = 'free space of /dev/shm'):
+        cache = DecodedCache(100, capacity_bytes = 4 * 1024**3)
+    try:
+        assert cache.capacity_bytes <= 64 * MiB - 100 * decodedcache.SLOT_DTYPE.itemsize
+        assert cache.capacity_bytes > 63 * MiB
+        assert cache.capacity_bytes % decodedcache.ALIGN == 0
+    finally:
+        cache.close()
+
+
+def test_no_free_shm(monkeypatch):
+    monkeypatch.setattr(decodedcache, '_shm_free_bytes', lambda: 16)
+    with pytest.raises(RuntimeError, match = 'No space'):
+        DecodedCache(100, capacity_bytes = MiB)
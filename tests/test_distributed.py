@@ -0,0 +1,89 @@
+import copy
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from sub_module.mmdet.data.datacontainer import DataContainer
+from sub_module.mmdet.data.sampler import DistributedGroupSampler
+from sub_module.mmdet.modules.dataparallel import build_ddp
+
+
+WORLD_SIZE, BATCH_SIZE = 2, 2
+
+
+
+class ToyDataset:
+    def __init__(self, num_samples):
+        self.flag = np.array([i % 2 for i in range(num_samples)], dtype = np.uint8)
+
+    def __len__(self):
+        return len(self.flag)
+
+
+
+class ToyDetector(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(4, 1)
+
+    def forward(self, img, img_metas, return_loss = True, **kwargs):
+        assert len(img_metas) == len(img)
+        return dict(loss_toy = self.linear(img).pow(2).mean())
+
+    def _parse_losses(self, losses):
+        loss = sum(value for key, value in losses.items() if 'loss' in key)
+        return loss, dict(loss = loss.item())
+
+
+
+def _get_data_batch(rank):
+    img = torch.arange(BATCH_SIZE * 4, dtype = torch.float32).view(BATCH_SIZE, 4) * (rank + 1)
+    img_metas = [dict(rank = rank, idx = i) for i in range(BATCH_SIZE)]
+    return dict(img = DataContainer([img], stack = True, pad_dims = None),
+                img_metas = DataContainer([img_metas], cpu_only = True))
+
+
+
+def _run(rank, init_file, num_samples):
+    dist.init_process_group('gloo', init_method = f'file://{init_file}', rank = rank, world_size = WORLD_SIZE)
+    try:
+        # sharding: every rank gets the same number of batches and all samples are used
+        sampler = DistributedGroupSampler(ToyDataset(num_samples), BATCH_SIZE, seed = 0)
+        sampler.set_epoch(1)
+        indices = list(sampler)
+        all_indices = [None] * WORLD_SIZE
+        dist.all_gather_object(all_indices, indices)
+        assert len(indices) == len(sampler) and len(indices) % BATCH_SIZE == 0
+        assert all(len(rank_indices) == len(indices) for rank_indices in all_indices)
+        assert set(sum(all_indices, [])) == set(range(num_samples))
+        flag = sampler.flag
+        for i in range(0, len(indices), BATCH_SIZE):
+            assert len(set(flag[indices[i:i + BATCH_SIZE]])) == 1       # one group in a batch
+
+        # gradients are averaged over ranks
+        torch.manual_seed(0)
+        module = ToyDetector()
+        reference = copy.deepcopy(module)
+        model = build_ddp(module, device = 'cpu')
+        data_batch = _get_data_batch(rank)
+        outputs = model.train_step(data_batch, None)
+        assert outputs['num_samples'] == BATCH_SIZE
+        outputs['loss'].backward()
+
+        local_loss = reference(data_batch['img'].data[0], data_batch['img_metas'].data[0])['loss_toy']
+        local_loss.backward()
+        for param, ref_param in zip(model.module.parameters(), reference.parameters()):
+            expected = ref_param.grad.clone()
+            dist.all_reduce(expected)
+            expected /= WORLD_SIZE
+            assert torch.allclose(param.grad, expected)
+            assert not torch.allclose(param.grad, ref_param.grad)
+    finally:
+        dist.destroy_process_group()
+
+
+
+def test_distributed_sampler_and_gradient_sync(tmp_path):
+    mp.spawn(_run, args = (str(tmp_path / 'init'), 11), nprocs = WORLD_SIZE, join = True)
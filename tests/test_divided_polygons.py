@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from sub_module.mmdet.eval import get_divided_polygon, get_divided_polygons, divide_polygon, get_box_from_pol
+
+
+def scalar_divided_polygon(polygon, window_num, min_num_points = 10):
+    # `get_divided_polygon` before it was vectorized
+    if isinstance(polygon, np.ndarray): polygon = polygon.tolist()
+    if len(polygon) < min_num_points: return None
+    if len(polygon) // window_num < min_num_points: return None
+    piece_point = int(len(polygon)/window_num)
+
+    polygon_xsort = polygon.copy()
+    polygon_xsort.sort(key=lambda x: x[0])
+    polygon_ysort = polygon.copy()
+    polygon_ysort.sort(key=lambda x: x[1])
+
+    x_lt_rb_list, y_lt_rb_list = [], []
+    for x_pol, y_pol in zip(divide_polygon(polygon_xsort, window_num, piece_point),
+                            divide_polygon(polygon_ysort, window_num, piece_point)):
+        x_lt_rb_list.append(get_box_from_pol(x_pol))
+        y_lt_rb_list.append(get_box_from_pol(y_pol))
+    return [x_lt_rb_list, y_lt_rb_list]
+
+
+def random_polygons(rng, num_polygons, dtype):
+    polygons = []
+    for _ in range(num_polygons):
+        num_points = int(rng.randint(1, 120))
+        if dtype == 'int':
+            # few distinct values, so the order of equal keys matters
+            polygon = rng.randint(0, 20, (num_points, 2))
+        else:
+            polygon = rng.rand(num_points, 2) * 1000
+        polygons.append(polygon if rng.rand() < 0.5 else polygon.tolist())
+    return polygons
+
+
+
+@pytest.mark.parametrize('dtype', ['int', 'float'])
+@pytest.mark.parametrize('window_num', [1, 2, 3, 5])
+def test_same_as_scalar(dtype, window_num):
+    rng = np.random.RandomState(window_num)
+    polygons = random_polygons(rng, 200, dtype)
+    expected = [scalar_divided_polygon(polygon, window_num) for polygon in polygons]
+    assert any(result is not None for result in expected)
+
+    results = get_divided_polygons(polygons, window_num)
+    # `repr` also compares types of values (e.g. 1 and 1.0)
+    assert repr(results) == repr(expected)
+    for polygon, result in zip(polygons, expected):
+        assert repr(get_divided_polygon(polygon, window_num)) == repr(result)
@@ -0,0 +1,78 @@
+import os, os.path as osp
+import hashlib
+import json
+import pytest
+import yaml
+
+from sub_module.cloud.google.dvc import DatasetCache, LocalRemote
+
+
+def put_object(remote, content, suffix = ""):
+    md5 = hashlib.md5(content).hexdigest() + suffix
+    object_path = osp.join(remote, "files", "md5", md5[:2], md5[2:])       # layout of dvc >= 3.0
+    os.makedirs(osp.dirname(object_path), exist_ok = True)
+    with open(object_path, "wb") as f:
+        f.write(content)
+    return md5
+
+
+def push_version(remote, dvc_file_path, files):
+    """push `files` (dict of relpath: content) to `remote` as a directory, and write the `.dvc` file"""
+    entries = [dict(md5 = put_object(remote, content), relpath = relpath) for relpath, content in sorted(files.items())]
+    dir_md5 = put_object(remote, json.dumps(entries).encode(), suffix = ".dir")
+    with open(dvc_file_path, "w") as f:
+        yaml.safe_dump(dict(outs = [dict(md5 = dir_md5, nfiles = len(files), path = "dataset")]), f)
+
+
+def read_dir(data_root):
+    files = dict()
+    for root, _, file_names in os.walk(data_root):
+        for file_name in file_names:
+            with open(osp.join(root, file_name), "rb") as f:
+                files[osp.relpath(osp.join(root, file_name), data_root)] = f.read()
+    return files
+
+
+
+def test_materialize(tmp_path):
+    remote, data_root, dvc_file_path = str(tmp_path / "remote"), str(tmp_path / "dataset"), str(tmp_path / "dataset.dvc")
+    v1 = {"train/a.jpg": b"a" * 100, "train/b.jpg": b"b" * 200, "ann.json": b"{}"}
+    push_version(remote, dvc_file_path, v1)
+    dataset_cache = DatasetCache(str(tmp_path / "cache"), LocalRemote(remote), num_workers = 2)
+
+    stats = dataset_cache.materialize(dvc_file_path, data_root)
+    assert not stats['skipped']
+    assert (stats['num_files'], stats['num_fetched'], stats['bytes_fetched']) == (3, 3, 302)
+    assert read_dir(data_root) == v1
+
+    # same version: nothing is done
+    assert dataset_cache.materialize(dvc_file_path, data_root)['skipped']
+
+    # new version drops `train/b.jpg` and `ann.json`, and adds `val/c.jpg`
+    v2 = {"train/a.jpg": b"a" * 100, "val/c.jpg": b"c" * 50}
+    push_version(remote, dvc_file_path, v2)
+    stats = dataset_cache.materialize(dvc_file_path, data_root)
+    assert (stats['num_fetched'], stats['bytes_fetched'], stats['bytes_cached']) == (1, 50, 100)
+    assert stats['num_removed'] == 2
+    assert read_dir(data_root) == v2
+
+    # switch back to the first version from cache
+    push_version(remote, dvc_file_path, v1)
+    stats = dataset_cache.materialize(dvc_file_path, data_root)
+    assert stats['num_fetched'] == 0
+    assert read_dir(data_root) == v1
+    assert not osp.exists(osp.join(data_root, "val"))
+
+
+def test_corrupted_object(tmp_path):
+    remote, data_root, dvc_file_path = str(tmp_path / "remote"), str(tmp_path / "dataset"), str(tmp_path / "dataset.dvc")
+    push_version(remote, dvc_file_path, {"a.jpg": b"a" * 100})
+    md5 = hashlib.md5(b"a" * 100).hexdigest()
+    with open(osp.join(remote, "files", "md5", md5[:2], md5[2:]), "wb") as f:
+        f.write(b"broken")
+    dataset_cache = DatasetCache(str(tmp_path / "cache"), LocalRemote(remote))
+
+    with pytest.raises(OSError, match = md5):
+        dataset_cache.materialize(dvc_file_path, data_root)
+    assert not osp.exists(dataset_cache.object_path(md5))
+    assert os.listdir(osp.dirname(dataset_cache.object_path(md5))) == []
@@ -0,0 +1,161 @@
+import os, os.path as osp
+import threading
+import time
+import cv2
+import numpy as np
+import torch.multiprocessing as mp
+
+from sub_module.mmdet.data.fileclient import DiskBackend, CachedBackend
+from sub_module.mmdet.data.transforms.loadimagefronfile import LoadImageFromFile
+
+
+FILE_BYTES = 1024
+
+
+
+class CountingBackend(DiskBackend):
+    # local directory as a stand-in of remote storage, which counts fetches
+    def __init__(self, root):
+        super().__init__(root = root)
+        self.num_gets = 0
+
+    def get(self, filepath):
+        self.num_gets += 1
+        return super().get(filepath)
+
+
+
+def make_remote(root, num_files, prefix = 'file'):
+    os.makedirs(root, exist_ok = True)
+    filepaths = []
+    for i in range(num_files):
+        filepath = f"{prefix}_{i}.bin"
+        with open(osp.join(root, filepath), 'wb') as f:
+            f.write(bytes([i % 256]) * FILE_BYTES)
+        filepaths.append(filepath)
+    return filepaths
+
+
+def cache_files(cache_dir):
+    return [name for name in os.listdir(cache_dir)
+            if not name.startswith('.') and not name.endswith(('.tmp', '.inflight'))]
+
+
+def cache_bytes(cache_dir):
+    return sum(osp.getsize(osp.join(cache_dir, name)) for name in cache_files(cache_dir))
+
+
+
+def test_get_through_cache(tmp_path):
+    filepaths = make_remote(str(tmp_path / 'remote'), 3)
+    backend = CountingBackend(str(tmp_path / 'remote'))
+    client = CachedBackend(backend, str(tmp_path / 'cache'))
+
+    for _ in range(2):
+        for i, filepath in enumerate(filepaths):
+            assert client.get(filepath) == bytes([i]) * FILE_BYTES
+    assert backend.num_gets == len(filepaths)
+
+
+def test_readahead(tmp_path):
+    filepaths = make_remote(str(tmp_path / 'remote'), 8)
+    backend = CountingBackend(str(tmp_path / 'remote'))
+    client = CachedBackend(backend, str(tmp_path / 'cache'), num_readahead_workers = 4)
+
+    client.readahead(filepaths)
+    client._executor.shutdown(wait = True)
+    assert backend.num_gets == len(filepaths)
+    for filepath in filepaths:
+        client.get(filepath)
+    assert backend.num_gets == len(filepaths)
+
+
+def test_evict_least_recently_used(tmp_path):
+    filepaths = make_remote(str(tmp_path / 'remote'), 10)
+    cache_dir = str(tmp_path / 'cache')
+    client = CachedBackend(DiskBackend(str(tmp_path / 'remote')), cache_dir, max_cache_bytes = 5 * FILE_BYTES)
+
+    client.get(filepaths[0])
+    for filepath in filepaths[1:5]:
+        time.sleep(0.01)
+        client.get(filepath)
+    time.sleep(0.01)
+    client.get(filepaths[0])            # recently used
+    client.get(filepaths[5])            # exceeds the limit
+
+    assert cache_bytes(cache_dir) <= 5 * FILE_BYTES
+    assert osp.isfile(client._cache_path(filepaths[0]))
+    assert not osp.isfile(client._cache_path(filepaths[1]))
+    with open(osp.join(cache_dir, '.size')) as f:
+        assert int(f.read()) == cache_bytes(cache_dir)
+
+
+
+def _fetch_worker(rank, remote, cache_dir, filepaths, max_cache_bytes):
+    client = CachedBackend(DiskBackend(remote), cache_dir, max_cache_bytes = max_cache_bytes)
+    for filepath in filepaths[rank::3]:
+        client.get(filepath)
+
+
+def test_size_limit_across_processes(tmp_path):
+    remote, cache_dir = str(tmp_path / 'remote'), str(tmp_path / 'cache')
+    filepaths = make_remote(remote, 60)
+    max_cache_bytes = 20 * FILE_BYTES
+    os.makedirs(cache_dir)
+
+    mp.spawn(_fetch_worker, args = (remote, cache_dir, filepaths, max_cache_bytes), nprocs = 3)
+    assert cache_bytes(cache_dir) <= max_cache_bytes
+    with open(osp.join(cache_dir, '.size')) as f:
+        assert int(f.read()) == cache_bytes(cache_dir)
+
+
+
+def test_wait_for_inflight_fetch(tmp_path):
+    filepaths = make_remote(str(tmp_path / 'remote'), 1)
+    backend = CountingBackend(str(tmp_path / 'remote'))
+    client = CachedBackend(backend, str(tmp_path / 'cache'))
+    cache_path = client._cache_path(filepaths[0])
+
+    # other process is fetching the file
+    open(f"{cache_path}.inflight", 'w').close()
+    def finish_fetch():
+        time.sleep(0.1)
+        with open(cache_path, 'wb') as f:
+            f.write(b'fetched by other process')
+        os.remove(f"{cache_path}.inflight")
+    thread = threading.Thread(target = finish_fetch)
+    thread.start()
+
+    assert client.get(filepaths[0]) == b'fetched by other process'
+    thread.join()
+    assert backend.num_gets == 0
+
+
+def test_stale_inflight_marker(tmp_path):
+    filepaths = make_remote(str(tmp_path / 'remote'), 1)
+    backend = CountingBackend(str(tmp_path / 'remote'))
+    client = CachedBackend(backend, str(tmp_path / 'cache'), inflight_timeout = 1)
+    marker_path = f"{client._cache_path(filepaths[0])}.inflight"
+
+    # left by a dead process
+    open(marker_path, 'w').close()
+    os.utime(marker_path, (time.time() - 10, time.time() - 10))
+
+    assert client.get(filepaths[0]) == bytes([0]) * FILE_BYTES
+    assert backend.num_gets == 1
+    assert not osp.exists(marker_path)
+
+
+
+def test_load_image_from_cache(tmp_path):
+    remote = tmp_path / 'remote'
+    os.makedirs(remote)
+    img = np.random.RandomState(0).randint(0, 256, (16, 24, 3), dtype = np.uint8)
+    cv2.imwrite(str(remote / 'img.png'), img)
+
+    load = LoadImageFromFile(file_client_args = dict(backend = 'disk', root = str(remote),
+                                                     cache_dir = str(tmp_path / 'cache')))
+    results = load(dict(img_prefix = None, img_info = dict(file_name = 'img.png')))
+    assert np.array_equal(results['img'], img)
+    assert isinstance(load.file_client, CachedBackend)
+    assert len(cache_files(str(tmp_path / 'cache'))) == 1
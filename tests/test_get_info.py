@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from sub_module.mmdet.get_info_algorithm import Get_info
+
+
+CLASSES = ['r_board', 'l_board', 'r_m_n', 'r_s_n', 'l_m_n', 'l_s_n'] + [str(i) for i in range(10)] + ['a', 'b', 'c']
+
+
+
+class ScalarGetInfo(Get_info):
+    # `get_numberboard_info` before containment was vectorized: every pair is checked by `check_in_bbox`
+    def get_numberboard_info(self, board_idx_list, number_box_idx_list, text_idx_list, check = False, with_box = False):
+        number_board_list = []
+        for board_idx in board_idx_list:
+            board_bbox = self.bboxes_list[board_idx]
+            board_dict = dict(type = self.labels_list[board_idx],
+                              board_center_p = self.compute_center_point(board_bbox),
+                              width = self.compute_width_height(board_bbox)[0],
+                              height = self.compute_width_height(board_bbox)[1])
+            if with_box:
+                board_dict['box'] = board_bbox
+                board_dict['confidence'] = self.scores_list[board_idx]
+
+            for number_box_idx in number_box_idx_list:
+                number_box_bbox = self.bboxes_list[number_box_idx]
+                if not self.check_in_bbox(board_bbox, number_box_bbox): continue
+
+                text_list = []
+                for text_idx in text_idx_list:
+                    text_bbox = self.bboxes_list[text_idx]
+                    if self.check_in_bbox(number_box_bbox, text_bbox):
+                        x_center, _ = self.compute_center_point(text_bbox)
+                        text_list.append([text_bbox, self.labels_list[text_idx], x_center])
+                text_list.sort(key = lambda x: x[-1])
+
+                if self.labels_list[number_box_idx] in ['l_s_n', 'r_s_n']:
+                    if len(text_list) != 3: continue
+                    if text_list[-1][1].isdigit(): continue
+                    board_dict['sub_text'] = [i[1] for i in text_list]
+                elif self.labels_list[number_box_idx] in ['l_m_n', 'r_m_n']:
+                    if len(text_list) != 4: continue
+                    board_dict['main_text'] = [i[1] for i in text_list]
+
+            if board_dict.get('main_text', None) is not None and board_dict.get('sub_text', None):
+                number_board_list.append(board_dict)
+        return number_board_list
+
+
+
+def random_scene(rng, num_plates, num_noise):
+    """plates of a board, a main and a sub number box and texts in them, and boxes of random labels at random positions.
+    some boxes of plates are under `score_thr`"""
+    bboxes, labels = [], []
+    def add(box, label, min_score = 0.45):
+        bboxes.append(list(box) + [rng.uniform(min_score, 1.0)])
+        labels.append(CLASSES.index(label))
+
+    for _ in range(num_plates):
+        side = rng.choice(['r', 'l'])
+        x0, y0 = rng.uniform(0, 1500), rng.uniform(0, 900)
+        add((x0, y0, x0 + 300, y0 + 120), f'{side}_board')
+        add((x0 + 10, y0 + 60, x0 + 290, y0 + 115), f'{side}_m_n')
+        add((x0 + 10, y0 + 5, x0 + 200, y0 + 55), f'{side}_s_n')
+        for i in range(rng.choice([3, 4, 4, 5])):      # main text
+            add((x0 + 15 + 55 * i, y0 + 62, x0 + 60 + 55 * i, y0 + 112), str(rng.randint(10)))
+        num_sub_text = rng.choice([2, 3, 3])
+        for i in range(num_sub_text):                  # sub text. mostly a letter at last
+            label = rng.choice(CLASSES[-3:]) if i == num_sub_text - 1 and rng.rand() < 0.8 else rng.choice(CLASSES[6:])
+            add((x0 + 15 + 60 * i, y0 + 8, x0 + 65 + 60 * i, y0 + 52), label)
+    for _ in range(num_noise):
+        x0, y0 = rng.uniform(-50, 1800), rng.uniform(-50, 1000)
+        add((x0, y0, x0 + rng.uniform(5, 400), y0 + rng.uniform(5, 200)), rng.choice(CLASSES), min_score = 0.3)
+
+    order = rng.permutation(len(bboxes))
+    return np.array(bboxes, dtype = np.float32).reshape(-1, 5)[order], np.array(labels, dtype = np.int64)[order]
+
+
+
+@pytest.mark.parametrize('num_plates, num_noise', [(0, 0), (1, 0), (3, 5), (8, 30)])
+def test_same_as_scalar_containment(num_plates, num_noise):
+    rng = np.random.RandomState(num_plates * 100 + num_noise)
+    num_boards = 0
+    for _ in range(20):
+        bboxes, labels = random_scene(rng, num_plates, num_noise)
+        expected = ScalarGetInfo(bboxes, labels, CLASSES, score_thr = 0.5).get_board_info(with_box = True)
+        assert Get_info(bboxes, labels, CLASSES, score_thr = 0.5).get_board_info(with_box = True) == expected
+        num_boards += len(expected)
+    if num_plates > 0:
+        assert num_boards > 0
@@ -0,0 +1,31 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+
+PACKAGES = ['sub_module.mmdet', 'sub_module.mmdet.data', 'sub_module.mmdet.modules']
+
+
+
+@pytest.mark.parametrize('package', PACKAGES)
+def test_all_names_are_lazy_attributes(package):
+    module = importlib.import_module(package)
+    assert len(module.__all__) == len(set(module.__all__))
+    assert [name for name in module.__all__ if name not in module._attr_to_submodule] == []
+
+
+@pytest.mark.parametrize('package', PACKAGES)
+def test_import_star(package):
+    namespace = dict()
+    exec(f"from {package} import *", namespace)
+    assert set(importlib.import_module(package).__all__) <= set(namespace)
+
+
+def test_submodule_import_does_not_load_package():
+    # run in new process: other tests have already imported torch
+    code = ("import sys, sub_module.mmdet, sub_module.mmdet.data.sampler;"
+            "assert 'sub_module.mmdet.eval' not in sys.modules;"
+            "assert 'sub_module.mmdet.modules.detector.maskrcnn' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], check = True)
@@ -0,0 +1,20 @@
+import numpy as np
+
+from sub_module.mmdet.data.transforms.compose import Compose
+from sub_module.mmdet.get_info_algorithm import read_plates
+
+
+def test_read_plates_empty():
+    plates, timing = read_plates(None, [])
+    assert plates == []
+    assert timing['total'] == 0.
+
+
+def test_load_image_from_webcam():
+    # loaded images are routed through `LoadImageFromWebcam` by `inference_detector`
+    img = np.random.RandomState(0).randint(0, 256, (20, 30, 3), dtype = np.uint8)
+    pipeline = Compose([dict(type = 'LoadImageFromWebcam'),
+                        dict(type = 'Resize', img_scale = (60, 40), keep_ratio = True)])
+    results = pipeline(dict(img = img))
+    assert results['ori_shape'] == (20, 30, 3)
+    assert results['img'].shape == (40, 60, 3)
@@ -0,0 +1,131 @@
+import logging
+import numpy as np
+import torch
+import torch.nn as nn
+import pytest
+
+from sub_module.mmdet.data.dataset import CustomDataset
+from sub_module.mmdet.data.dataloader import build_dataloader
+from sub_module.mmdet.data.sampler import SeedSampler
+from sub_module.mmdet.data.transforms.compose import Compose
+from sub_module.mmdet.hooks.hook import Hook
+from sub_module.mmdet.hooks.optimizer import OptimizerHook
+from sub_module.mmdet.runner import Runner
+
+
+NUM_SAMPLES, BATCH_SIZE = 12, 2     # 2 groups of 6 samples
+ITERS_PER_EPOCH = NUM_SAMPLES // BATCH_SIZE
+
+
+
+def random_augment(results):
+    # the result depends on the random state of the process which loads the sample
+    idx = results['img_info']['id']
+    x = np.full(4, idx / NUM_SAMPLES, dtype = np.float32) + np.random.randn(4).astype(np.float32)
+    return dict(x = torch.from_numpy(x))
+
+
+
+class ToyDataset(CustomDataset):
+    def __init__(self):
+        super().__init__()
+        self.data_infos = [dict(id = i) for i in range(NUM_SAMPLES)]
+        self.img_prefix = ''
+        self.pipeline = Compose([random_augment])
+        self.flag = np.array([i % 2 for i in range(NUM_SAMPLES)], dtype = np.uint8)
+
+    def get_ann_info(self, idx):
+        return dict()
+
+
+
+class ToyModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(4, 1)
+
+    def train_step(self, data, optimizer):
+        loss = self.linear(data['x']).pow(2).mean()
+        return dict(loss = loss, log_vars = dict(loss = loss.item()), num_samples = len(data['x']))
+
+
+
+class ToyWrapper(nn.Module):
+    # checkpoints are saved from `model.module` as with `MMDataParallel`
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+
+    def train_step(self, data, optimizer):
+        return self.module.train_step(data, optimizer)
+
+
+
+class Interrupt(Exception):
+    pass
+
+
+
+class RecordHook(Hook):
+    """Record the loss of each iteration, and save a checkpoint and stop at `stop_iter`."""
+    def __init__(self, losses, stop_iter = None, out_dir = None):
+        self.losses = losses
+        self.stop_iter = stop_iter
+        self.out_dir = out_dir
+
+    def after_train_iter(self, runner):
+        self.losses.append(runner.outputs['loss'].item())
+        if runner.iter == self.stop_iter:
+            runner.save_checkpoint(self.out_dir, filename_tmpl = 'resume.pth')
+            raise Interrupt
+
+
+
+def train(work_dir, by_epoch, infinite, stop_iter = None, resume_from = None):
+    torch.manual_seed(0)
+    model = ToyWrapper(ToyModel())
+    optimizer = torch.optim.SGD(model.parameters(), lr = 0.01, momentum = 0.9)
+    train_dataloader, _ = build_dataloader(num_workers = 2, seed = 0,
+                                           train_dataset = ToyDataset(), train_batch_size = BATCH_SIZE,
+                                           infinite = infinite)
+    max_length = dict(max_epochs = 3) if by_epoch else dict(max_iters = 3 * ITERS_PER_EPOCH)
+    runner = Runner(model, ITERS_PER_EPOCH, optimizer = optimizer, work_dir = str(work_dir),
+                    logger = logging.getLogger('test_resume'), resume_from = resume_from, **max_length)
+    losses = []
+    runner.register_hook(OptimizerHook(), priority = 'HIGH')
+    runner.register_hook(RecordHook(losses, stop_iter, str(work_dir)), priority = 'LOW')
+    try:
+        runner.run(train_dataloader)
+    except Interrupt:
+        pass
+    return losses
+
+
+
+@pytest.mark.parametrize('by_epoch, infinite', [(True, False), (False, False), (False, True)])
+def test_resume_reproduces_loss_curve(tmp_path, by_epoch, infinite):
+    stop_iter = ITERS_PER_EPOCH + 2         # at the middle of the second epoch
+    full_losses = train(tmp_path / 'full', by_epoch, infinite)
+    first_losses = train(tmp_path / 'interrupted', by_epoch, infinite, stop_iter = stop_iter)
+    resumed_losses = train(tmp_path / 'resumed', by_epoch, infinite,
+                           resume_from = str(tmp_path / 'interrupted' / 'resume' / 'resume.pth'))
+
+    assert len(full_losses) == 3 * ITERS_PER_EPOCH
+    assert first_losses == full_losses[:stop_iter]
+    assert resumed_losses == full_losses[stop_iter:]
+
+
+
+def test_sample_seed_keeps_process_random_state():
+    # with num_workers = 0 samples are loaded in the main process
+    train_dataloader, val_dataloader = build_dataloader(num_workers = 0, seed = 0,
+                                                        train_dataset = ToyDataset(), train_batch_size = BATCH_SIZE,
+                                                        val_dataset = ToyDataset(), val_batch_size = BATCH_SIZE)
+    assert isinstance(train_dataloader.sampler, SeedSampler)
+    assert not isinstance(val_dataloader.sampler, SeedSampler)
+
+    np.random.seed(1)
+    expected = np.random.rand(4)
+    np.random.seed(1)
+    next(iter(train_dataloader))
+    assert np.array_equal(np.random.rand(4), expected)
@@ -0,0 +1,79 @@
+import os.path as osp
+import pickle
+import cv2
+import numpy as np
+import pycocotools.mask as maskUtils
+
+from sub_module.mmdet.data.dataset import CustomDataset
+from sub_module.mmdet.data.shard import pack_dataset, ShardDataset
+from sub_module.mmdet.data.transforms.loadimagefronfile import LoadImageFromFile
+
+
+NUM_IMAGES = 7
+
+
+
+class ImageDataset(CustomDataset):
+    # image files and polygon annotations without annotation file
+    CLASSES = ('board', 'text')
+
+    def __init__(self, img_dir):
+        super().__init__()
+        rng = np.random.RandomState(0)
+        self.img_prefix = str(img_dir)
+        self.data_infos = []
+        for i in range(NUM_IMAGES):
+            height, width = rng.randint(40, 80, 2)
+            cv2.imwrite(osp.join(self.img_prefix, f"{i}.png"), rng.randint(0, 256, (height, width, 3), dtype = np.uint8))
+            self.data_infos.append(dict(id = i, file_name = f"{i}.png", height = int(height), width = int(width)))
+
+    def get_ann_info(self, idx):
+        i = self.data_infos[idx]['id']
+        return dict(bboxes = np.array([[1, 2, 20, 30]], dtype = np.float32) + i,
+                    labels = np.array([i % 2], dtype = np.int64),
+                    masks = [[[1 + i, 2, 20 + i, 2, 20 + i, 30, 1 + i, 30]]])
+
+
+
+def test_pack_and_read(tmp_path):
+    img_dir = tmp_path / 'images'
+    img_dir.mkdir()
+    dataset = ImageDataset(img_dir)
+    # a small shard size splits images into several shards
+    index_path = pack_dataset(dataset, str(tmp_path / 'shards'), shard_bytes = 30000)
+
+    shard_dataset = ShardDataset(index_path, pipeline = [dict(type = 'LoadImageFromFile')])
+    assert len(shard_dataset) == NUM_IMAGES
+    assert shard_dataset.CLASSES == list(dataset.CLASSES)
+    assert len(shard_dataset.file_client.shards) > 1
+
+    load = LoadImageFromFile()
+    for idx, img_info in enumerate(dataset.data_infos):
+        with open(osp.join(dataset.img_prefix, img_info['file_name']), 'rb') as f:
+            assert shard_dataset.file_client.get(img_info['file_name']) == f.read()
+        results = shard_dataset.pipeline(dict(img_info = shard_dataset.data_infos[idx], img_prefix = '',
+                                              file_client = shard_dataset.file_client))
+        expected = load(dict(img_info = img_info, img_prefix = dataset.img_prefix))
+        assert np.array_equal(results['img'], expected['img'])
+
+        ann, shard_ann = dataset.get_ann_info(idx), shard_dataset.get_ann_info(idx)
+        assert np.array_equal(shard_ann['bboxes'], ann['bboxes'])
+        assert np.array_equal(shard_ann['labels'], ann['labels'])
+        # polygons are stored as RLE of the same mask
+        rle = maskUtils.merge(maskUtils.frPyObjects(ann['masks'][0], img_info['height'], img_info['width']))
+        assert np.array_equal(maskUtils.decode(shard_ann['masks'][0]), maskUtils.decode(rle))
+
+
+def test_reader_after_pickle(tmp_path):
+    # dataloader workers get the reader by pickle. file descriptors are opened again
+    img_dir = tmp_path / 'images'
+    img_dir.mkdir()
+    dataset = ImageDataset(img_dir)
+    shard_dataset = ShardDataset(pack_dataset(dataset, str(tmp_path / 'shards')), pipeline = [])
+    reader = shard_dataset.file_client
+    expected = reader.read(3)
+    assert len(reader._fds) == 1
+
+    copied = pickle.loads(pickle.dumps(reader))
+    assert copied._fds == dict()
+    assert copied.read(3) == expected
@@ -0,0 +1,83 @@
+import functools
+import sqlite3
+import time
+import pytest
+
+from sub_module.database.sink import ConnectionPool, ResultSink
+
+
+SCHEMA = "CREATE TABLE plate_result (file_name TEXT, main_text TEXT, sub_text TEXT)"
+COLUMNS = ['file_name', 'main_text', 'sub_text']
+
+
+
+def make_pool(db_path):
+    # the timer thread of ResultSink uses the connections
+    return ConnectionPool(functools.partial(sqlite3.connect, db_path, check_same_thread = False))
+
+
+def read_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT file_name, main_text, sub_text FROM plate_result ORDER BY rowid").fetchall()
+    conn.close()
+    return rows
+
+
+def make_rows(num_rows):
+    return [(f"{i}.jpg", f"main_{i}", f"sub_{i}") for i in range(num_rows)]
+
+
+
+def test_round_trip(tmp_path):
+    db_path = str(tmp_path / 'result.db')
+    pool = make_pool(db_path)
+    rows = make_rows(20)
+    with ResultSink(pool, 'plate_result', COLUMNS, schema = SCHEMA, batch_size = 10,
+                    flush_interval = 60, dialect = 'sqlite') as sink:
+        sink.write_many([dict(zip(COLUMNS, row)) for row in rows[:12]])     # dict rows
+        assert len(read_rows(db_path)) == 12        # flushed by `batch_size`
+        sink.write_many(rows[12:17])
+        for row in rows[17:]:
+            sink.write(row)
+        assert len(read_rows(db_path)) == 12
+    assert read_rows(db_path) == rows               # flushed by `close`
+    assert sink.num_written == len(rows)
+    pool.close()
+
+
+def test_flush_on_deadline(tmp_path):
+    db_path = str(tmp_path / 'result.db')
+    pool = make_pool(db_path)
+    sink = ResultSink(pool, 'plate_result', COLUMNS, schema = SCHEMA, batch_size = 100,
+                      flush_interval = 0.2, dialect = 'sqlite')
+    rows = make_rows(3)
+    sink.write_many(rows)
+    assert read_rows(db_path) == []
+
+    # flushed by the timer without a next write
+    deadline = time.monotonic() + 5
+    while read_rows(db_path) == [] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert read_rows(db_path) == rows
+    sink.close()
+    pool.close()
+
+
+def test_missing_table(tmp_path):
+    pool = make_pool(str(tmp_path / 'result.db'))
+    with pytest.raises(RuntimeError, match = 'plate_result'):
+        ResultSink(pool, 'plate_result', COLUMNS, dialect = 'sqlite')
+    pool.close()
+
+
+def test_table_checked_per_pool(tmp_path):
+    # a new pool of another database must check the table again
+    for name in ['first.db', 'second.db']:
+        db_path = str(tmp_path / name)
+        pool = make_pool(db_path)
+        with ResultSink(pool, 'plate_result', COLUMNS, schema = SCHEMA, dialect = 'sqlite') as sink:
+            sink.write(make_rows(1)[0])
+        assert read_rows(db_path) == make_rows(1)
+        assert pool.checked_tables == {'plate_result'}
+        pool.close()
+        del pool, sink
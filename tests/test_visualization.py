@@ -0,0 +1,77 @@
+import random
+import cv2
+import numpy as np
+import pytest
+
+from sub_module.mmdet.visualization import draw_to_img, mask_to_polygon, get_colors, put_text
+
+
+CLASS_NAMES = ['plate', 'number', 'text']
+
+
+
+def full_frame_draw_to_img(img, bboxes, labels, masks, class_names, score_thr):
+    # `draw_to_img` before drawing only within the region of instances: 
+    # three full-frame layers are blended over the whole image
+    inds = bboxes[:, -1] > score_thr
+    bboxes, labels, masks = bboxes[inds], labels[inds], masks[inds]
+    scores, bboxes = bboxes[:, -1], bboxes[:, :4]
+    object_labels = [f"{class_names[label]} {int(round(score, 2)*100)}%" for label, score in zip(labels, scores)]
+    polygons = mask_to_polygon(masks)
+
+    org_img = img.astype(np.uint8)
+    colors = get_colors(len(object_labels))
+    img_dict = dict(box = np.zeros_like(org_img), polygon = np.zeros_like(org_img), mask = np.zeros_like(org_img))
+    for bbox, color in zip(bboxes, colors):
+        cv2.rectangle(img_dict['box'], (int(bbox[0]), int(bbox[1])), (int(bbox[2]), int(bbox[3])),
+                      color, lineType = cv2.LINE_4, thickness = 2)
+    for polygon, color in zip(polygons, colors):
+        cv2.polylines(img_dict['polygon'], [polygon], isClosed = True, color = color, thickness = 2)
+        cv2.fillPoly(img_dict['mask'], [polygon], color = color)
+
+    for key, (beta_1, beta_2) in [('box', (0.35, 0.5)), ('polygon', (0.4, 0.4)), ('mask', (0.3, 0.4))]:
+        tmp_img = org_img.copy()
+        tmp_img[img_dict[key] == 0] = 0
+        org_img[img_dict[key] != 0] = 0
+        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = tmp_img, beta = beta_1, gamma = 0)
+        org_img = cv2.addWeighted(src1 = org_img, alpha = 1.0, src2 = img_dict[key], beta = beta_2, gamma = 0)
+    return put_text(org_img, object_labels, bboxes, colors)
+
+
+def random_instances(rng, height, width, num_instances):
+    bboxes, masks = [], np.zeros((num_instances, height, width), dtype = bool)
+    for i in range(num_instances):
+        # some instances touch the border of image
+        w, h = rng.randint(8, width // 2), rng.randint(8, height // 2)
+        x0, y0 = rng.randint(-w // 2, width - w // 2), rng.randint(-h // 2, height - h // 2)
+        x1, y1 = min(x0 + w, width - 1), min(y0 + h, height - 1)
+        x0, y0 = max(x0, 0), max(y0, 0)
+        cv2.ellipse(masks[i].view(np.uint8), ((x0 + x1) // 2, (y0 + y1) // 2), (max((x1 - x0) // 2, 1), max((y1 - y0) // 2, 1)),
+                    0, 0, 360, 1, -1)
+        bboxes.append([x0, y0, x1, y1, rng.rand()])
+    labels = rng.randint(0, len(CLASS_NAMES), num_instances)
+    return np.array(bboxes, dtype = np.float32), labels, masks
+
+
+
+@pytest.mark.parametrize('num_instances', [0, 1, 3, 8])
+def test_same_as_full_frame(num_instances):
+    rng = np.random.RandomState(num_instances)
+    height, width = 120, 160
+    for _ in range(5):
+        img = rng.randint(0, 256, (height, width, 3), dtype = np.uint8)
+        bboxes, labels, masks = random_instances(rng, height, width, num_instances)
+        if num_instances == 0:
+            bboxes, labels, masks = np.zeros((0, 5), np.float32), np.zeros(0, np.int64), np.zeros((0, height, width), bool)
+
+        random.seed(0)      # colors
+        expected = full_frame_draw_to_img(img.copy(), bboxes, labels, masks, CLASS_NAMES, 0.3)
+        random.seed(0)
+        result = draw_to_img(img.copy(), bboxes, labels, masks, CLASS_NAMES, score_thr = 0.3)
+        assert np.array_equal(result, expected)
+
+        # polygons computed in advance
+        random.seed(0)
+        result = draw_to_img(img.copy(), bboxes, labels, None, CLASS_NAMES, score_thr = 0.3,
+                             polygons = mask_to_polygon(masks))
+        assert np.array_equal(result, expected)